@@ -96,6 +96,53 @@ class Config(object):
     def as_dict(self):
         return self.config
     
+class BaseEnumMeta(type):
+    """
+    Metaclass for BaseEnum.  The values of an enum class are collected the
+    first time they are asked for and kept in the class, so list, dict and
+    has do not walk dir(cls) on every call.  Setting or deleting an
+    attribute of an enum clears the values kept for it and for every enum
+    derived from it.
+    """
+    def __setattr__(cls, name, value):
+        super(BaseEnumMeta, cls).__setattr__(name, value)
+        if not name.startswith('__'):
+            cls._clear_enum_values()
+
+    def __delattr__(cls, name):
+        super(BaseEnumMeta, cls).__delattr__(name)
+        if not name.startswith('__'):
+            cls._clear_enum_values()
+
+    def _clear_enum_values(cls):
+        type.__setattr__(cls, '__enum_values__', None)
+        for subclass in type.__subclasses__(cls):
+            subclass._clear_enum_values()
+
+    def _enum_values(cls):
+        """
+        @retval A tuple of the values in attribute name order, a dict of
+        attribute name to value and a frozenset of the values, or None if
+        some value can not be hashed
+        """
+        values = cls.__dict__.get('__enum_values__')
+        if values is None:
+            items = []
+            for attr in dir(cls):
+                value = getattr(cls, attr)
+                if not callable(value) and not attr.startswith('__'):
+                    items.append((attr, value))
+
+            value_list = tuple(value for (attr, value) in items)
+            try:
+                value_set = frozenset(value_list)
+            except TypeError:
+                value_set = None
+
+            values = (value_list, dict(items), value_set)
+            type.__setattr__(cls, '__enum_values__', values)
+        return values
+
 class BaseEnum(object):
     """Base class for enums.
     
@@ -115,21 +162,17 @@ class BaseEnum(object):
     are quicker to execute and more compartmentalized so that code can be
     re-used more easily outside of a capability container as needed.
     """
+    __metaclass__ = BaseEnumMeta
     
     @classmethod
     def list(cls):
         """List the values of this enum."""
-        return [getattr(cls,attr) for attr in dir(cls) if\
-                not callable(getattr(cls,attr)) and not attr.startswith('__')]
+        return list(cls._enum_values()[0])
 
     @classmethod
     def dict(cls):
         """Return a dict representation of this enum."""
-        result = {}
-        for attr in dir(cls):
-            if not callable(getattr(cls,attr)) and not attr.startswith('__'):
-                result[attr] = getattr(cls,attr)
-        return result
+        return dict(cls._enum_values()[1])
 
     @classmethod
     def has(cls, item):
@@ -144,7 +187,13 @@ class BaseEnum(object):
         @retval True if one of the class attributes has value item, false
         otherwise.
         """
-        return item in cls.list()
+        (value_list, value_dict, value_set) = cls._enum_values()
+        if value_set is not None:
+            try:
+                return item in value_set
+            except TypeError:
+                pass
+        return item in value_list
 
 class EventKey(BaseEnum):
     """Keys to the event dictionary fields as used by the InstrumentProtocol
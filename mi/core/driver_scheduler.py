@@ -123,6 +123,7 @@ __author__ = 'Bill French'
 __license__ = 'Apache 2.0'
 
 import inspect
+import itertools
 
 from mi.core.log import get_logger; log = get_logger()
 
@@ -175,8 +176,14 @@ class DriverScheduler(object):
     Class to facilitate event scheduling in drivers.
     jobs.
     """
+    # Set by a process hosting many drivers, so their schedulers share one
+    # PolledScheduler and thread pool instead of each starting their own.
+    use_shared_scheduler = False
 
-    def __init__(self, config = None):
+    # numbers the schedulers sharing the process scheduler
+    _shared_count = itertools.count()
+
+    def __init__(self, config = None, shared = None):
         """
         config structure:
         {
@@ -186,8 +193,24 @@ class DriverScheduler(object):
             }
         }
         @param config: job configuration structure.
+        @param shared: schedule jobs on the scheduler shared by the process
+                       rather than one of our own, use_shared_scheduler if None.
         """
-        self._scheduler = PolledScheduler()
+        if(shared == None):
+            shared = self.use_shared_scheduler
+
+        if(shared):
+            self._scheduler = PolledScheduler.instance()
+            # polled job names only need to be unique within a driver
+            self._name_prefix = "%s:" % next(self._shared_count)
+        else:
+            self._scheduler = PolledScheduler()
+            self._name_prefix = ""
+        self._shared = shared
+
+        # the jobs added here, unscheduled on shutdown
+        self._jobs = []
+
         if(config):
             self.add_config(config)
 
@@ -198,7 +221,7 @@ class DriverScheduler(object):
         @param name: name of the job
         @raise LookupError if we fail to find the job
         """
-        return self._scheduler.run_polled_job(name)
+        return self._scheduler.run_polled_job(self._name_prefix + name)
 
     def add_config(self, config):
         """
@@ -232,6 +255,23 @@ class DriverScheduler(object):
 
     def remove_job(self, callback):
         self._scheduler.unschedule_func(callback)
+        self._jobs = [job for job in self._jobs if job.func != callback]
+
+    def shutdown(self):
+        """
+        Unschedule every job added here.  A scheduler of our own is shut
+        down too, the shared one keeps running the jobs of other drivers.
+        """
+        for job in self._jobs:
+            try:
+                self._scheduler.unschedule_job(job)
+            except KeyError:
+                # finished date jobs are already gone
+                pass
+        self._jobs = []
+
+        if(not self._shared):
+            self._scheduler.shutdown(wait=False)
     
     def _add_job(self, name, config):
         """
@@ -310,7 +350,7 @@ class DriverScheduler(object):
         if(dt == None):
             raise SchedulerException("trigger missing parameter: %s" % DriverSchedulerConfigKey.DATE)
 
-        self._scheduler.add_date_job(callback, dt)
+        self._jobs.append(self._scheduler.add_date_job(callback, dt))
 
     def _add_job_cron(self, name, config):
         """
@@ -338,8 +378,9 @@ class DriverScheduler(object):
            day_of_week==None and hour==None and minute==None and second==None):
             raise SchedulerException("at least one cron parameter required!")
 
-        self._scheduler.add_cron_job(callback, year=year, month=month, day=day, week=week,
-                                     day_of_week=day_of_week, hour=hour, minute=minute, second=second)
+        self._jobs.append(self._scheduler.add_cron_job(callback, year=year, month=month, day=day, week=week,
+                                                       day_of_week=day_of_week, hour=hour, minute=minute,
+                                                       second=second))
 
     def _add_job_interval(self, name, config):
         """
@@ -363,8 +404,8 @@ class DriverScheduler(object):
         if(not (weeks or days or hours or minutes or seconds)):
             raise SchedulerException("at least interval parameter required!")
 
-        self._scheduler.add_interval_job(callback, weeks=weeks, days=days, hours=hours,
-                                                   minutes=minutes, seconds=seconds)
+        self._jobs.append(self._scheduler.add_interval_job(callback, weeks=weeks, days=days, hours=hours,
+                                                           minutes=minutes, seconds=seconds))
 
     def _add_job_polled_interval(self, name, config):
         """
@@ -412,7 +453,8 @@ class DriverScheduler(object):
             if(max_weeks or max_days or max_hours or max_minutes or max_seconds):
                 max_interval_obj = self._scheduler.interval(max_weeks, max_days, max_hours, max_minutes, max_seconds)
 
-        self._scheduler.add_polled_job(callback, name, min_interval_obj, max_interval_obj)
+        self._jobs.append(self._scheduler.add_polled_job(callback, self._name_prefix + name,
+                                                         min_interval_obj, max_interval_obj))
 
 
 
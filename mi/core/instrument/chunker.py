@@ -11,10 +11,177 @@
 __author__ = 'Steve Foley'
 __license__ = 'Apache 2.0'
 
+import re
+from collections import deque
+
 from mi.core.log import get_logger ; log = get_logger()
 
 from mi.core.exceptions import SampleException
 
+class SieveResult(list):
+    """
+    The list of (start, end) tuples returned by a resumable sieve function.
+    Besides the data blocks it carries a resume index, the offset into the
+    sieved data before which no further (incomplete) data block can start.
+    The chunker keeps that offset as a cursor so the next add_chunk only
+    sieves from there instead of rescanning a waiting fragment from its
+    start. A plain list returned by a sieve means "not resumable" and the
+    chunker keeps sieving from the end of the last data block.
+
+    When the sieve knows how long the waiting fragment is going to be it can
+    also report a minimum end offset, the length the sieved data has to
+    reach before the fragment can be complete. The chunker does not call
+    the sieve again until that much data has arrived.
+    """
+    def __init__(self, data_list=None, resume_index=None, min_end=None):
+        """
+        @param data_list The list of (start, end) tuples the sieve found
+        @param resume_index The offset in the sieved data that the next sieve
+            pass can start from. None means the sieve is not resumable.
+        @param min_end The offset in the sieved data the data has to reach
+            before sieving again can find anything new. None if not known.
+        """
+        list.__init__(self, data_list or [])
+        self.resume_index = resume_index
+        self.min_end = min_end
+
+# A backslash (not itself escaped) followed by a digit or a (?P=name) is a
+# group reference, which cannot survive combining patterns.
+GROUP_REFERENCE = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]|\(\?P=')
+
+def uncapture_pattern(pattern):
+    """
+    Turn the capturing groups of a regex pattern, named or not, into non
+    capturing groups. Particle regexes can then share group names in a
+    combined pattern without running into the limit of 100 groups.
+    @param pattern A regex pattern without group references
+    @retval The pattern with every group made non capturing
+    """
+    result = []
+    index = 0
+    in_class = False
+    while index < len(pattern):
+        char = pattern[index]
+        token = char
+        if char == '\\':
+            token = pattern[index:index + 2]
+        elif in_class:
+            in_class = (char != ']')
+        elif char == '[':
+            in_class = True
+            # a ] first in a set is a literal
+            for prefix in ('[]', '[^]'):
+                if pattern.startswith(prefix, index):
+                    token = prefix
+        elif pattern.startswith('(?P<', index):
+            token = pattern[index:pattern.index('>', index) + 1]
+            result.append('(?:')
+            index += len(token)
+            continue
+        elif char == '(' and not pattern.startswith('(?', index):
+            result.append('(?:')
+            index += 1
+            continue
+
+        result.append(token)
+        index += len(token)
+    return ''.join(result)
+
+class RegexSieve(object):
+    """
+    A sieve compiled from a list of particle regexes. The regexes are
+    joined once into a single alternation with a named group per regex so
+    the buffer is scanned in one pass, and each block found carries the
+    particle class of the regex that matched it. At any position the first
+    regex in the list that matches wins, so blocks never overlap.
+
+    Regexes that cannot be joined (different flags or back references) are
+    run one after another like regex_sieve_function does.
+
+    An instance can be used directly as a chunker sieve function:
+        SIEVE = RegexSieve([(SampleParticle.regex_compiled(), SampleParticle),
+                            (StatusParticle.regex_compiled(), StatusParticle)])
+        self._chunker = StringChunker(SIEVE)
+    and _got_chunk can look up the particle class of a chunk with
+    SIEVE.classify(chunk).
+    """
+    def __init__(self, matchers):
+        """
+        @param matchers A list of (compiled regex, particle class) tuples. The
+            particle class can be any value the caller wants reported for
+            blocks matching the regex.
+        """
+        self._matchers = list(matchers)
+        self._combined = None
+
+        flags = set(regex.flags for (regex, particle_class) in self._matchers)
+        if len(flags) != 1 or \
+           [regex for (regex, particle_class) in self._matchers
+            if GROUP_REFERENCE.search(regex.pattern)]:
+            return
+        flags = flags.pop()
+
+        # a verbose pattern may end in a comment
+        end = ')'
+        if flags & re.VERBOSE:
+            end = '\n)'
+
+        # group n + 1 of the combined pattern is matcher n
+        patterns = []
+        for (index, (regex, particle_class)) in enumerate(self._matchers):
+            patterns.append('(?P<_sieve%d>%s%s' % (index, uncapture_pattern(regex.pattern), end))
+
+        try:
+            self._combined = re.compile('|'.join(patterns), flags)
+        except (re.error, AssertionError) as e:
+            # too many regexes for one pattern
+            log.debug("Sieve regexes could not be combined, searching them one at a time: %s", e)
+
+    def __call__(self, raw_data):
+        """
+        Sieve function interface.
+        @param raw_data The raw data to search for data blocks
+        @retval A list of (start, end) tuples for each block found
+        """
+        return [(start, end) for (start, end, particle_class) in self.sieve(raw_data)]
+
+    def sieve(self, raw_data):
+        """
+        Find the data blocks in raw data.
+        @param raw_data The raw data to search for data blocks
+        @retval A list of (start, end, particle_class) tuples for each block
+            found, in order
+        """
+        if self._combined is None:
+            return_list = []
+            for (regex, particle_class) in self._matchers:
+                for match in regex.finditer(raw_data):
+                    return_list.append((match.start(), match.end(), particle_class))
+            return_list.sort()
+            return return_list
+
+        matchers = self._matchers
+        return [(match.start(), match.end(), matchers[match.lastindex - 1][1])
+                for match in self._combined.finditer(raw_data)]
+
+    def classify(self, chunk):
+        """
+        Look up the particle class of a data block found by this sieve.
+        @param chunk A data block produced by the chunker
+        @retval The particle class of the first regex matching at the start
+            of the chunk, or None if no regex matches
+        """
+        if self._combined is None:
+            for (regex, particle_class) in self._matchers:
+                if regex.match(chunk):
+                    return particle_class
+            return None
+
+        match = self._combined.match(chunk)
+        if match is None:
+            return None
+        return self._matchers[match.lastindex - 1][1]
+
 class Chunker(object):
     """
     A great big buffer that ingests incoming data from an instrument, then
@@ -38,13 +205,21 @@ class Chunker(object):
             buffer[start_index:end_index] to properly describe the data block.
             If no data is present, return and empty list. If multiple data
             blocks are found, the returned list will contain multiple tuples,
-            IN SEQUENTIAL ORDER and WITHOUT OVERLAP.
+            IN SEQUENTIAL ORDER and WITHOUT OVERLAP. The sieve may return a
+            SieveResult with a resume_index to make the sieving incremental,
+            and a min_end to skip sieving until a fragment can be complete.
         """
         self.sieve = data_sieve_fn
         
         self.raw_chunk_list = []
         self.data_chunk_list = []
         self.nondata_chunk_list = []
+
+        # Buffer index the next sieve pass starts from, maintained only for
+        # resumable sieves. 0 means sieve from the end of the last data chunk.
+        self.sieve_cursor = 0
+        # Buffer length a waiting fragment needs before it is sieved again
+        self.sieve_min_end = 0
         
         """ To be filled out by the subclass """
         self.buffer = None
@@ -60,29 +235,64 @@ class Chunker(object):
         @param timestamp The time (in NTP4 float format) that the data was
             collected at the port agent
         """
+        self.add_chunks([(raw_data, timestamp)])
+
+    def add_chunks(self, chunk_list):
+        """
+        Adds several chunks of data to the end of the buffer, each with its
+        own entry in the raw_chunk_list, then sieves them in one pass.
+
+        @param chunk_list A list of (raw_data, timestamp) tuples as passed to
+            add_chunk
+        """
         assert isinstance(self.buffer, str) or isinstance(self.buffer, list)
-        assert isinstance(timestamp, float)
-        # Append raw
-        start_index = len(self.buffer)
-        
+        if not chunk_list:
+            return
+
         if self.data_chunk_list == []:
             last_data_index = 0
         else:
             last_data_index = self.data_chunk_list[-1][1] 
-        end_index = start_index + len(raw_data)
-        
-        if isinstance(self.buffer, str):
-            self.buffer += raw_data
-        else:
-            self.buffer.append(raw_data)
-            
-        self.raw_chunk_list.append((start_index, end_index, timestamp))
 
-        # find data
+        # Append raw
+        for (raw_data, timestamp) in chunk_list:
+            assert isinstance(timestamp, float)
+            start_index = len(self.buffer)
+            end_index = start_index + len(raw_data)
+
+            if isinstance(self.buffer, str):
+                self.buffer += raw_data
+            else:
+                self.buffer.extend(raw_data)
+
+            self.raw_chunk_list.append((start_index, end_index, timestamp))
+
+        # a waiting fragment is still short, sieving now can't find anything
+        if len(self.buffer) < self.sieve_min_end:
+            log.debug("Fragment needs %d more, not sieving",
+                      self.sieve_min_end - len(self.buffer))
+            return
+
+        # new non-data is stamped with the first chunk's time
+        timestamp = chunk_list[0][1]
+
+        # find data, skipping what a resumable sieve has already looked at
+        sieve_start = max(last_data_index, self.sieve_cursor)
         result = self._generate_data_lists(timestamp,
-                                           start_index=last_data_index)
+                                           start_index=sieve_start)
         assert result != None
-        
+
+        if result['resume_index'] is None:
+            self.sieve_cursor = 0
+        else:
+            self.sieve_cursor = result['resume_index']
+        self.sieve_min_end = result['min_end']
+
+        # Everything from the sieve start on has been sieved again, so
+        # existing non-data blocks can not reach past it.
+        self.nondata_chunk_list = self._clip_chunk_list(self.nondata_chunk_list,
+                                                        sieve_start)
+
         # rebase onto existing buffer
         for (s, e, t) in result['data_chunk_list']:
             self.data_chunk_list.append((s, e, t))
@@ -128,11 +338,16 @@ class Chunker(object):
         @param start_index The beginning index to start generating lists from.
             Default is the beginning of the buffer
         @retval A dict with keys "data_chunk_list" and "non_data_chunk_list"
-            that include the full data chunk lists for this block of data.
+            that include the full data chunk lists for this block of data,
+            "resume_index", the buffer index a resumable sieve can
+            continue from (None if the sieve is not resumable) and
+            "min_end", the buffer length needed before sieving again (0 if
+            not known).
             Indices are respect to the buffer, not the chunk
         """
         log.debug("Generating data lists with start index %s", start_index)
-        return_list = {'data_chunk_list':[], 'non_data_chunk_list':[]}
+        return_list = {'data_chunk_list':[], 'non_data_chunk_list':[],
+                       'resume_index': None, 'min_end': 0}
         result = self.sieve(self.buffer[start_index:])
         # assert no overlap!
         if (self.overlaps(result)):
@@ -140,6 +355,17 @@ class Chunker(object):
         # sort to protect us from some sloppy sieve code
         result.sort()
 
+        resume_index = getattr(result, 'resume_index', None)
+        if resume_index is not None:
+            # never resume inside a data block we just found
+            if result:
+                resume_index = max(resume_index, result[-1][1])
+            return_list['resume_index'] = start_index + resume_index
+
+            min_end = getattr(result, 'min_end', None)
+            if min_end is not None:
+                return_list['min_end'] = start_index + min_end
+
         # rebase to buffer coordinates
         return_list['data_chunk_list'] = [(s+start_index, e+start_index) for (s, e) in result]
         return_list['data_chunk_list'] = self.add_timestamps(return_list['data_chunk_list'])
@@ -161,6 +387,11 @@ class Chunker(object):
                 return_list['non_data_chunk_list'].append((previous_end, s))
                 previous_end = e
 
+        # a resumable sieve vouches there is no data up to the resume index
+        if result != [] and return_list['resume_index'] > previous_end:
+            return_list['non_data_chunk_list'].append((previous_end,
+                                                       return_list['resume_index']))
+
         return_list['non_data_chunk_list'] = self.add_timestamps(return_list['non_data_chunk_list'])
         log.debug("Generated return list: %s", return_list)
         return return_list    
@@ -266,9 +497,42 @@ class Chunker(object):
                                                          next_end)
             self.nondata_chunk_list = self._clean_chunk_list(self.nondata_chunk_list,
                                                              next_end)
+            self._rebase_sieve_cursor(next_end)
                 
         return (timestamp, next_block, next_start, next_end)
     
+    def _rebase_sieve_cursor(self, end_index):
+        """
+        Keep the resumable sieve cursor in step with a buffer cleaned up to
+        end_index. A waiting fragment that was cleaned away in part has to
+        be sieved again.
+
+        @param end_index The end index of what is being removed.
+        """
+        if self.sieve_cursor < end_index:
+            self.sieve_min_end = 0
+        else:
+            self.sieve_min_end = max(self.sieve_min_end - end_index, 0)
+        self.sieve_cursor = max(self.sieve_cursor - end_index, 0)
+
+    def _clip_chunk_list(self, list, end_index):
+        """
+        Truncate the given chunk list so no entry reaches past end_index.
+        Entries starting at or after end_index are dropped, entries spanning
+        it are shortened to end there.
+
+        @param list A list of (start, end, time) tuples of indices
+        @param end_index The index the entries have to end by
+        @retval The clipped list
+        """
+        return_list = []
+        for (s, e, time) in list:
+            if e <= end_index:
+                return_list.append((s, e, time))
+            elif s < end_index:
+                return_list.append((s, end_index, time))
+        return return_list
+
     def _clean_chunk_list(self, list, end_index):
         """
         Cleans up the given chunk list based on the start and end indexes of
@@ -365,6 +629,7 @@ class Chunker(object):
                                                          next_end)
             self.nondata_chunk_list = self._clean_chunk_list(self.nondata_chunk_list,
                                                              next_end)
+            self._rebase_sieve_cursor(next_end)
                         
         return (next_time, next_block, next_start, next_end)
 
@@ -410,6 +675,9 @@ class Chunker(object):
             self._clean_data_list(next_end)
             self.nondata_chunk_list = self._clean_chunk_list(self.nondata_chunk_list,
                                                              next_end)
+            # data chunks were dropped, so the rest has to be sieved again
+            self.sieve_cursor = 0
+            self.sieve_min_end = 0
 
         return (next_time, next_block)
 
@@ -438,6 +706,8 @@ class Chunker(object):
         pre-complete the regex list and make this look like a normal sieve
         function interface. For example, create a chunker like so:
         StringChunker(partial(self._chunker.regex_sieve_function, regex_list=[regex]))
+        Each regex scans the data on its own, so blocks matched by more than
+        one regex are all returned.  Use a RegexSieve to scan once.
         @param raw_data The raw data to run through this regex sieve
         @param regex_list a list of pre-compiled regexes that will identify some
         flavor of a pattern in the raw data for matching.
@@ -454,6 +724,124 @@ class Chunker(object):
     
         return return_list
 
+    @staticmethod
+    def resumable_regex_sieve_function(raw_data, regex_list=[], start_markers=[],
+                                       block_length=None):
+        """
+        A resumable version of regex_sieve_function for data where every
+        data block starts with one of a known set of literal markers (sync
+        bytes, "NANO,", "$GPGGA" and such). Besides the matches it reports
+        where the next sieve pass has to start: the first marker after the
+        last complete match, or the start of a marker split across the end
+        of the data. Bind the lists with functools.partial() as with
+        regex_sieve_function:
+        StringChunker(partial(Chunker.resumable_regex_sieve_function,
+                              regex_list=[regex], start_markers=['NANO,']))
+
+        When the length of a block can be told from its start, pass it as
+        block_length. The sieve then also reports how much data the waiting
+        fragment needs, so the chunker can skip sieving until it is there,
+        and a marker that starts a complete block none of the regexes match
+        is passed over as noise.
+        @param raw_data The raw data to run through this regex sieve
+        @param regex_list a list of pre-compiled regexes that will identify some
+        flavor of a pattern in the raw data for matching.
+        @param start_markers a list of strings, one of which starts every data
+        block matched by the regexes
+        @param block_length The length of every data block, or a function
+        taking the raw data and the index of a start marker and returning the
+        length of the block starting there, None if it can't tell yet
+        @retval A SieveResult of (start, end) tuples for each match the regexes
+        find, with the resume index set
+        """
+        return_list = Chunker.regex_sieve_function(raw_data, regex_list)
+
+        last_end = 0
+        for (s, e) in return_list:
+            last_end = max(last_end, e)
+
+        return Chunker.resume_at_marker(return_list, raw_data, last_end,
+                                        start_markers, block_length)
+
+    @staticmethod
+    def resume_at_marker(data_list, raw_data, start, start_markers,
+                         block_length=None):
+        """
+        Build the SieveResult for a sieve whose data blocks all start with
+        one of start_markers, resuming at the first marker found from start
+        on. See resumable_regex_sieve_function for block_length. raw_data
+        can be a string, a bytearray, a buffer or a list, with string
+        markers for a buffer and markers of the same kind otherwise.
+        @param data_list The list of (start, end) tuples the sieve found
+        @param raw_data The data that was sieved
+        @param start Offset the waiting fragment can start at, at the earliest
+        @param start_markers The markers that start every data block
+        @param block_length Block length or function, see above
+        @retval A SieveResult with the resume index and minimum end set
+        """
+        index = start
+        while True:
+            found = [(Chunker.find_marker(raw_data, marker, index), marker)
+                     for marker in start_markers]
+            found = [(i, marker) for (i, marker) in found if i >= 0]
+            if not found:
+                return SieveResult(data_list, len(raw_data))
+
+            (index, marker) = min(found)
+            if index + len(marker) > len(raw_data):
+                # the marker itself is cut off
+                return SieveResult(data_list, index, index + len(marker))
+
+            if block_length is None:
+                return SieveResult(data_list, index)
+            elif callable(block_length):
+                length = block_length(raw_data, index)
+            else:
+                length = block_length
+
+            if length is None:
+                return SieveResult(data_list, index)
+            elif index + length > len(raw_data):
+                return SieveResult(data_list, index, index + length)
+
+            # a whole block is there but nothing matched it, not a real marker
+            index += 1
+
+    @staticmethod
+    def find_marker(raw_data, marker, start=0):
+        """
+        Find the first marker in raw_data from start on, including the front
+        of a marker cut off by the end of the data. Strings and bytearrays
+        are searched with find(), buffers with a regex, other sequences such
+        as the list buffer of a BinaryChunker element by element.
+        @param raw_data The data to search
+        @param marker The marker to find, of the same kind as raw_data, or a
+        string for a buffer
+        @param start The offset to search from
+        @retval The offset of the marker, -1 if there is none
+        """
+        length = len(marker)
+        if hasattr(raw_data, 'find'):
+            index = raw_data.find(marker, start)
+            if index >= 0:
+                return index
+        elif isinstance(raw_data, buffer):
+            # buffers have no find, but regexes search them in place
+            match = re.compile(re.escape(marker)).search(raw_data, start)
+            if match:
+                return match.start()
+        else:
+            for index in xrange(start, len(raw_data) - length + 1):
+                if raw_data[index:index + length] == marker:
+                    return index
+
+        # look for the front of a marker at the very end of the data
+        for length in range(length - 1, 0, -1):
+            index = len(raw_data) - length
+            if index >= start and raw_data[index:] == marker[:length]:
+                return index
+        return -1
+
     
 class StringChunker(Chunker):
     """
@@ -473,4 +861,318 @@ class BinaryChunker(Chunker):
     def __init__(self, data_sieve_fn):
         Chunker.__init__(self, data_sieve_fn)
         self.buffer = []
-    
\ No newline at end of file
+    
+
+
+class ByteArrayChunker(Chunker):
+    """
+    A drop in replacement for StringChunker that keeps the data in a
+    bytearray and the chunk indexes in deques. Indexes are stored as absolute
+    offsets into the stream of data added, so consuming a chunk only moves
+    the start of the buffer forward instead of copying the retained tail and
+    rebasing every index. The consumed front of the bytearray is reclaimed
+    once it is larger than the data still retained, which keeps the cost of
+    consuming constant when amortized over the data added.
+
+    Data blocks are handed out as strings, just as StringChunker does. The
+    buffer and chunk list attributes of the other chunkers are available as
+    read only properties relative to the start of the buffer, but building
+    them costs a copy, so they are meant for tests and debugging.
+
+    The sieve is passed a string copy of the data not sieved yet, unless
+    buffer_sieve is set.  The sieve is then passed a read only buffer over
+    the bytearray instead, so a long fragment is not copied again with every
+    chunk added.  Regexes and the resumable sieve helpers take a buffer;
+    indexing or slicing one gives strings, but it has no string methods and
+    is only valid until the sieve returns.
+    """
+    def __init__(self, data_sieve_fn, buffer_sieve=False):
+        # The Chunker list attributes are properties here, so don't call
+        # the base class constructor
+        self.sieve = data_sieve_fn
+        self.buffer_sieve = buffer_sieve
+
+        self._data = bytearray()
+        # absolute stream offset of self._data[0]
+        self._head = 0
+        # absolute stream offset of the first byte not consumed yet
+        self._start = 0
+
+        self._raw_chunks = deque()
+        self._data_chunks = deque()
+        self._nondata_chunks = deque()
+
+        self.sieve_cursor = 0
+        self.sieve_min_end = 0
+
+    @property
+    def buffer(self):
+        return str(self._data[self._start - self._head:])
+
+    @property
+    def raw_chunk_list(self):
+        return self._relative_chunk_list(self._raw_chunks)
+
+    @property
+    def data_chunk_list(self):
+        return self._relative_chunk_list(self._data_chunks)
+
+    @property
+    def nondata_chunk_list(self):
+        return self._relative_chunk_list(self._nondata_chunks)
+
+    def _relative_chunk_list(self, chunks):
+        """
+        @param chunks A deque of (start, end, time) tuples in stream offsets
+        @retval A list of the same tuples relative to the start of the buffer
+        """
+        return [(s - self._start, e - self._start, t) for (s, e, t) in chunks]
+
+    def _end(self):
+        """
+        @retval The absolute stream offset one past the last byte added
+        """
+        return self._head + len(self._data)
+
+    def add_chunk(self, raw_data, timestamp):
+        """
+        Adds a chunk of data to the end of the buffer and sieves what has not
+        been sieved yet.
+
+        @param raw_data The bunch of raw data as a string
+        @param timestamp The time (in NTP4 float format) that the data was
+            collected at the port agent
+        """
+        self.add_chunks([(raw_data, timestamp)])
+
+    def add_chunks(self, chunk_list):
+        """
+        Adds several chunks of data to the end of the buffer, then sieves
+        them in one pass.
+
+        @param chunk_list A list of (raw_data, timestamp) tuples as passed to
+            add_chunk
+        """
+        if not chunk_list:
+            return
+
+        for (raw_data, timestamp) in chunk_list:
+            assert isinstance(timestamp, float)
+            start_index = self._end()
+            self._data.extend(raw_data)
+            self._raw_chunks.append((start_index, self._end(), timestamp))
+
+        end_index = self._end()
+        timestamp = chunk_list[0][1]
+
+        # a waiting fragment is still short, sieving now can't find anything
+        if end_index < self.sieve_min_end:
+            log.debug("Fragment needs %d more, not sieving",
+                      self.sieve_min_end - end_index)
+            return
+
+        if self._data_chunks:
+            last_data_index = self._data_chunks[-1][1]
+        else:
+            last_data_index = self._start
+        sieve_start = max(last_data_index, self.sieve_cursor)
+
+        if self.buffer_sieve:
+            raw_data = buffer(self._data, sieve_start - self._head)
+        else:
+            raw_data = str(self._data[sieve_start - self._head:])
+        result = self.sieve(raw_data)
+        if self.overlaps(result):
+            raise SampleException("Overlapping blocks in sieve list: %s" % result)
+        result.sort()
+
+        resume_index = getattr(result, 'resume_index', None)
+        self.sieve_min_end = 0
+        if resume_index is None:
+            self.sieve_cursor = self._start
+        else:
+            if result:
+                resume_index = max(resume_index, result[-1][1])
+            self.sieve_cursor = sieve_start + resume_index
+
+            min_end = getattr(result, 'min_end', None)
+            if min_end is not None:
+                self.sieve_min_end = sieve_start + min_end
+
+        # Everything from the sieve start on has been sieved again, so
+        # existing non-data blocks can not reach past it.
+        while self._nondata_chunks and self._nondata_chunks[-1][1] > sieve_start:
+            (s, e, t) = self._nondata_chunks.pop()
+            if s < sieve_start:
+                self._nondata_chunks.append((s, sieve_start, t))
+                break
+
+        previous_end = sieve_start
+        for (s, e) in result:
+            s += sieve_start
+            e += sieve_start
+            if s > previous_end:
+                self._add_nondata(previous_end, s, self._lookup_timestamp(previous_end))
+            self._data_chunks.append((s, e, self._lookup_timestamp(s)))
+            previous_end = e
+
+        if not result:
+            self._add_nondata(sieve_start, end_index, timestamp)
+        elif self.sieve_cursor > previous_end:
+            # a resumable sieve vouches there is no data up to the cursor
+            self._add_nondata(previous_end, self.sieve_cursor,
+                              self._lookup_timestamp(previous_end))
+
+        log.debug("Added chunk, data_chunk_list: %s, nondata_chunk_list: %s",
+                  self._data_chunks, self._nondata_chunks)
+
+    def _add_nondata(self, start, end, timestamp):
+        """
+        Append a non-data block, combining it with the last one if they touch
+
+        @param start Absolute stream offset of the block start
+        @param end Absolute stream offset of the block end
+        @param timestamp Timestamp to use if the block is not combined
+        """
+        if self._nondata_chunks and self._nondata_chunks[-1][1] == start:
+            (s, e, t) = self._nondata_chunks.pop()
+            self._nondata_chunks.append((s, end, t))
+        else:
+            self._nondata_chunks.append((start, end, timestamp))
+
+    def _lookup_timestamp(self, index):
+        """
+        @param index Absolute stream offset
+        @retval The timestamp of the raw chunk holding index
+        """
+        for (raw_s, raw_e, raw_t) in self._raw_chunks:
+            if index < raw_e:
+                return raw_t
+        return None
+
+    def _consume(self, end_index, chunk_lists):
+        """
+        Drop everything in front of end_index from the buffer and the given
+        chunk deques. Chunks reaching past end_index are cut down to start
+        there.
+
+        @param end_index Absolute stream offset to consume up to
+        @param chunk_lists The chunk deques to clean up
+        """
+        for chunks in chunk_lists:
+            while chunks and chunks[0][0] < end_index:
+                (s, e, t) = chunks.popleft()
+                if e > end_index:
+                    chunks.appendleft((end_index, e, t))
+                    break
+
+        self._start = end_index
+        if self.sieve_cursor < end_index:
+            # a waiting fragment was consumed in part, sieve it again
+            self.sieve_cursor = end_index
+            self.sieve_min_end = 0
+
+        # reclaim the front of the bytearray once it outweighs the rest
+        consumed = self._start - self._head
+        if consumed and consumed >= len(self._data) - consumed:
+            del self._data[:consumed]
+            self._head = self._start
+
+    def _next_chunk(self, chunks, clean):
+        """
+        Get the next chunk from one of the chunk deques
+
+        @param chunks The chunk deque to take the chunk from
+        @param clean Remove the buffer contents up to the end of the chunk
+        @retval A tuple of (timestamp, block, start, end) with start and end
+            relative to the buffer, (None, None, None, None) if there is none
+        """
+        if not chunks:
+            return (None, None, None, None)
+
+        (next_start, next_end, next_time) = chunks[0]
+        next_block = str(self._data[next_start - self._head:next_end - self._head])
+        result = (next_time, next_block,
+                  next_start - self._start, next_end - self._start)
+
+        if clean:
+            self._consume(next_end, (self._raw_chunks, self._data_chunks,
+                                     self._nondata_chunks))
+        return result
+
+    def get_next_data_with_index(self, clean=True):
+        """
+        Get the next chunk of data from the buffer. By default, it clears all
+        that comes before it. This method returns the start and end indices in
+        the resulting tuple.
+
+        @param clean If set to false, do not clear the buffer when fetching the
+            data, but simply return the data block and make no further changes.
+        @return A tuple of (timestamp, data_chunk, start_index, end_index),
+            (None, None, None, None) if no data
+        """
+        return self._next_chunk(self._data_chunks, clean)
+
+    def get_next_non_data_with_index(self, clean=True):
+        """
+        Get the next chunk of non-data from the buffer, clearing all that comes
+        before it. Default behavior is to clear the buffer before and including
+        this data.
+
+        @param clean Remove the buffer contents before and including this data
+        @return A tuple of (timestamp, data_chunk, next_start, next_end),
+            (None, None, None, None) if no data
+        """
+        return self._next_chunk(self._nondata_chunks, clean)
+
+    def get_next_raw(self, clean=True):
+        """
+        Get the next chunk of raw characters from the buffer, clearing all
+        that comes before it. A data block that is only partially consumed
+        this way is turned into non-data.
+
+        @param clean Remove the buffer contents before and including this data
+        @return A tuple of (timestamp, data_chunk), (None, None) if empty
+        """
+        if not self._raw_chunks:
+            return (None, None)
+
+        (next_start, next_end, next_time) = self._raw_chunks[0]
+        next_block = str(self._data[next_start - self._head:next_end - self._head])
+
+        if clean:
+            cut_chunk = None
+            while self._data_chunks and self._data_chunks[0][0] < next_end:
+                (s, e, t) = self._data_chunks.popleft()
+                if e > next_end:
+                    cut_chunk = (next_end, e, t)
+            self._consume(next_end, (self._raw_chunks, self._nondata_chunks))
+
+            # a data block cut in half is not data any more
+            if cut_chunk is not None:
+                self._nondata_chunks.appendleft(cut_chunk)
+                self._merge_leading_nondata()
+
+        return (next_time, next_block)
+
+    def _merge_leading_nondata(self):
+        """
+        After a data block was turned into non-data at the front of the
+        non-data deque, combine it with the block that follows if they touch.
+        """
+        if len(self._nondata_chunks) > 1:
+            (s1, e1, t1) = self._nondata_chunks[0]
+            (s2, e2, t2) = self._nondata_chunks[1]
+            if e1 == s2:
+                self._nondata_chunks.popleft()
+                self._nondata_chunks.popleft()
+                self._nondata_chunks.appendleft((s1, e2, t1))
+
+    def clean_all_chunks(self):
+        """
+        Clean all data out of the non_data, raw, and data lists
+        """
+        self._raw_chunks.clear()
+        self._data_chunks.clear()
+        self._nondata_chunks.clear()
+        self._consume(self._end(), ())
@@ -103,6 +103,9 @@ class DataParticle(object):
 
         self.raw_data = raw_data
 
+        # The result of generate_dict, kept until a value is set
+        self._generated_dict = None
+
     def __eq__(self, arg):
         """
         Quick equality check for testing purposes. If they have the same raw
@@ -149,6 +152,7 @@ class DataParticle(object):
         #    raise InstrumentParameterException("invalid timestamp")
 
         self.contents[DataParticleKey.INTERNAL_TIMESTAMP] = float(timestamp)
+        self._generated_dict = None
 
     def set_value(self, id, value):
         """
@@ -160,6 +164,7 @@ class DataParticle(object):
         """
         if (id == DataParticleKey.INTERNAL_TIMESTAMP) and (self._check_timestamp(value)):
             self.contents[DataParticleKey.INTERNAL_TIMESTAMP] = value
+            self._generated_dict = None
         else:
             raise ReadOnlyException("Parameter %s not able to be set to %s after object creation!" %
                                     (id, value))
@@ -192,9 +197,16 @@ class DataParticle(object):
         going to JSON. This is useful for the times when JSON is not needed to
         go across an interface. There are times when particles are used
         internally to a component/process/module/etc.
+
+        The values are parsed once; later calls return the same dictionary
+        until the internal timestamp is set again, so callers must not
+        modify it.
         @retval A python dictionary with the proper timestamps and data values
         @throws InstrumentDriverException if there is a problem wtih the inputs
         """
+        if self._generated_dict is not None:
+            return self._generated_dict
+
         # Do we wan't downstream processes to check this?
         #for time in [DataParticleKey.INTERNAL_TIMESTAMP,
         #             DataParticleKey.DRIVER_TIMESTAMP,
@@ -214,6 +226,7 @@ class DataParticle(object):
         result[DataParticleKey.VALUES] = values
 
         #log.debug("Serialize result: %s", result)
+        self._generated_dict = result
         return result
         
     def generate(self, sorted=False):
@@ -392,3 +405,158 @@ class RawDataParticle(DataParticle):
         ]
 
         return result
+
+class ParticleBatch(object):
+    """
+    Records of one stream held as columns instead of one particle per
+    record.  Parsers that decode many records at once, for instance with
+    numpy, can keep each parameter in a numpy array, array.array or list,
+    and the header fields shared by every record are stored once.  The
+    legacy particles are only built when a record is asked for.
+    """
+    def __init__(self, stream_name, columns,
+                 port_timestamp=None,
+                 internal_timestamps=None,
+                 preferred_timestamp=DataParticleKey.PORT_TIMESTAMP,
+                 quality_flag=DataParticleValue.OK,
+                 new_sequence=None):
+        """
+        @param stream_name The data particle type of every record
+        @param columns A list of (value_id, column) pairs, each column holds
+           one value per record
+        @param port_timestamp The port timestamp shared by all records
+        @param internal_timestamps A column of internal timestamps, one per
+           record, or None
+        @param preferred_timestamp The preferred timestamp of all records
+        @param quality_flag The quality flag of all records
+        @param new_sequence Set on the first record, the others get False
+        @throws SampleException if the columns are not all the same length
+        """
+        if new_sequence is not None and not isinstance(new_sequence, bool):
+            raise TypeError("new_sequence is not a bool")
+
+        self.stream_name = stream_name
+        self.value_ids = [value_id for (value_id, column) in columns]
+        self.columns = [column for (value_id, column) in columns]
+        self.port_timestamp = port_timestamp
+        self.internal_timestamps = internal_timestamps
+        self.preferred_timestamp = preferred_timestamp
+        self.quality_flag = quality_flag
+        self.new_sequence = new_sequence
+        self.driver_timestamp = ntplib.system_to_ntp_time(time.time())
+
+        lengths = set(len(column) for column in self.columns)
+        if internal_timestamps is not None:
+            lengths.add(len(internal_timestamps))
+        if len(lengths) > 1:
+            raise SampleException("batch columns have different lengths %s" % sorted(lengths))
+        self._length = lengths.pop() if lengths else 0
+
+        # columns converted to lists of python values, built on demand
+        self._lists = None
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for index in xrange(self._length):
+            yield BatchParticle(self, index)
+
+    def __getitem__(self, index):
+        """
+        @param index A record index, or a slice of records
+        @retval A BatchParticle for an index, a ParticleBatch for a slice
+        """
+        if isinstance(index, slice):
+            if self.internal_timestamps is None:
+                internal_timestamps = None
+            else:
+                internal_timestamps = self.internal_timestamps[index]
+            new_sequence = self.new_sequence
+            if new_sequence and index.indices(self._length)[0] > 0:
+                new_sequence = False
+            batch = ParticleBatch(self.stream_name,
+                                  [(value_id, column[index]) for (value_id, column)
+                                   in zip(self.value_ids, self.columns)],
+                                  port_timestamp=self.port_timestamp,
+                                  internal_timestamps=internal_timestamps,
+                                  preferred_timestamp=self.preferred_timestamp,
+                                  quality_flag=self.quality_flag,
+                                  new_sequence=new_sequence)
+            batch.driver_timestamp = self.driver_timestamp
+            return batch
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("batch index out of range")
+        return BatchParticle(self, index)
+
+    def column(self, value_id):
+        """
+        @param value_id The value id of a column
+        @retval The column as it was given to the batch
+        @throws NotImplementedException if the batch has no such column
+        """
+        try:
+            return self.columns[self.value_ids.index(value_id)]
+        except ValueError:
+            raise NotImplementedException("Value %s not available in batch!" % value_id)
+
+    def particles(self):
+        """
+        @retval A list with a BatchParticle for every record
+        """
+        return list(self)
+
+    def generate_dicts(self):
+        """
+        @retval A list with the particle dictionary of every record, the
+           same as generate_dict() of the equivalent DataParticles
+        """
+        return [particle.generate_dict() for particle in self]
+
+    def _values(self, index):
+        """
+        Build the values of one record.  The columns are converted to
+        python values in one pass the first time, so numpy scalars do not
+        end up in the particles.
+        """
+        if self._lists is None:
+            self._lists = [column.tolist() if hasattr(column, 'tolist') else list(column)
+                           for column in self.columns]
+        return [{DataParticleKey.VALUE_ID: value_id,
+                 DataParticleKey.VALUE: values[index]}
+                for (value_id, values) in zip(self.value_ids, self._lists)]
+
+class BatchParticle(DataParticle):
+    """
+    One record of a ParticleBatch.  Its values are read from the batch
+    columns when the particle is generated.
+    """
+    def __init__(self, batch, index):
+        """
+        @param batch The ParticleBatch holding the record
+        @param index The index of the record in the batch
+        """
+        internal_timestamp = None
+        if batch.internal_timestamps is not None:
+            internal_timestamp = float(batch.internal_timestamps[index])
+
+        new_sequence = batch.new_sequence
+        if new_sequence and index > 0:
+            new_sequence = False
+
+        super(BatchParticle, self).__init__((batch, index),
+                                            port_timestamp=batch.port_timestamp,
+                                            internal_timestamp=internal_timestamp,
+                                            preferred_timestamp=batch.preferred_timestamp,
+                                            quality_flag=batch.quality_flag,
+                                            new_sequence=new_sequence)
+        self.contents[DataParticleKey.DRIVER_TIMESTAMP] = batch.driver_timestamp
+        self._data_particle_type = batch.stream_name
+        self.batch = batch
+        self.index = index
+
+    def _build_parsed_values(self):
+        return self.batch._values(self.index)
@@ -19,6 +19,7 @@ import os
 import sys
 import time
 import traceback
+import Queue
 from mi.core.exceptions import InstrumentException, InstrumentCommandException
 from mi.core.instrument.instrument_driver import DriverAsyncEvent
 
@@ -56,7 +57,7 @@ class DriverProcess(object):
         self.driver_class = driver_class
         self.ppid = ppid
         self.driver = None
-        self.events = []
+        self.events = Queue.Queue()
         self.messaging_started = False
         
     def construct_driver(self):
@@ -65,23 +66,33 @@ class DriverProcess(object):
         configuration.
         @retval True if successful, False otherwise.
         """
-        import_str = 'import %s as dvr_mod' % self.driver_module
-        ctor_str = 'driver = dvr_mod.%s(self.send_event)' % self.driver_class
+        self.driver = self.build_driver(self.driver_module, self.driver_class, self.send_event)
+        return self.driver is not None
+
+    def build_driver(self, driver_module, driver_class, event_callback):
+        """
+        Import a driver module and construct a driver object.
+        @param driver_module The python module containing the driver code.
+        @param driver_class The python driver class.
+        @param event_callback The callback the driver sends events with.
+        @retval The driver object, None if it could not be constructed.
+        """
+        import_str = 'import %s as dvr_mod' % driver_module
+        ctor_str = 'driver = dvr_mod.%s(event_callback)' % driver_class
         try:
             exec import_str
-            log.info('Imported driver module %s' % self.driver_module)
+            log.info('Imported driver module %s' % driver_module)
             exec ctor_str
-            log.info('Constructed driver %s' % self.driver_class)
+            log.info('Constructed driver %s' % driver_class)
             
         except (ImportError, NameError, AttributeError) as e:
             log.error('Could not import/construct driver module %s, class %s.' %
-                      (self.driver_module, self.driver_class))
+                      (driver_module, driver_class))
             log.error('%s' % str(e))
-            return False
+            return None
 
         else:
-            self.driver = driver
-            return True
+            return driver
             
     def start_messaging(self):
         """
@@ -145,7 +156,8 @@ class DriverProcess(object):
             return'stop_driver_process'
         elif cmd == 'test_events':
             events = kwargs['events']
-            self.events += events
+            for evt in events:
+                self.events.put(evt)
             reply = 'test_events'
         elif cmd == 'process_echo':
             reply = 'ping from resource ppid:%s, resource:%s' % (str(self.ppid), str(self.driver))
@@ -154,7 +166,23 @@ class DriverProcess(object):
             #except IndexError:
             #    msg = 'no message to echo'
             # reply = 'process_echo: %s' % msg
-        elif cmd_func:
+        else:
+            reply = self.call_driver(self.driver, cmd, args, kwargs)
+        
+        return reply        
+
+    def call_driver(self, driver, cmd, args, kwargs):
+        """
+        Call a driver command, returning the exception instead of raising it
+        if the command fails.
+        @param driver The driver object.
+        @param cmd The name of the driver method.
+        @param args Positional arguments of the command.
+        @param kwargs Keyword arguments of the command.
+        @retval The driver command result.
+        """
+        cmd_func = getattr(driver, cmd, None)
+        if cmd_func:
             try:
                 reply = cmd_func(*args, **kwargs)
             except Exception as e:
@@ -187,9 +215,9 @@ class DriverProcess(object):
             
     def send_event(self, evt):
         """
-        Append an event to the list to be sent by the event threaed.
+        Put an event on the queue to be sent by the event threaed.
         """
-        self.events.append(evt)
+        self.events.put(evt)
             
     def run(self):
         """
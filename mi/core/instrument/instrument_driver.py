@@ -23,7 +23,7 @@ from mi.core.exceptions import InstrumentException
 from mi.core.exceptions import InstrumentParameterException
 from mi.core.exceptions import InstrumentConnectionException
 from mi.core.instrument.instrument_fsm import InstrumentFSM, ThreadSafeFSM
-from mi.core.instrument.port_agent_client import PortAgentClient
+from mi.core.instrument.port_agent_client import PortAgentClient, ListenerHub
 
 from mi.core.log import get_logger,LoggerManager
 log = get_logger()
@@ -902,11 +902,21 @@ class SingleConnectionInstrumentDriver(InstrumentDriver):
         next_state = None
         result = None
         self._build_protocol()
+
+        # Have the port agent client deliver data in batches if the
+        # driver was configured for it and the protocol can take them.
+        kwargs = {}
+        got_data_batch = getattr(self._protocol, 'got_data_batch', None)
+        if got_data_batch and isinstance(self._connection, PortAgentClient) \
+           and self._connection.batch_data:
+            kwargs['user_callback_data_batch'] = got_data_batch
+
         try:
             self._connection.init_comms(self._protocol.got_data, 
                                         self._protocol.got_raw,
                                         self._got_exception,
-                                        self._lost_connection_callback)
+                                        self._lost_connection_callback,
+                                        **kwargs)
             self._protocol._connection = self._connection
             next_state = DriverConnectionState.CONNECTED
         except InstrumentConnectionException as e:
@@ -1035,6 +1045,12 @@ class SingleConnectionInstrumentDriver(InstrumentDriver):
         The value returned by this operation is assigned to self._connection
         and also to self._protocol._connection upon entering in the
         DriverConnectionState.CONNECTED state.
+        If the configuration has a true 'listener_hub', the port agent
+        socket is read by the listener hub shared by the process instead
+        of by a listener thread of its own. A true 'batch_data' has the
+        data packets read in one block handed to the protocol together;
+        the raw packets of the block are published before its data is
+        parsed, so only set it for protocols that don't mind.
 
         @param config configuration dict
 
@@ -1054,7 +1070,12 @@ class SingleConnectionInstrumentDriver(InstrumentDriver):
             cmd_port = config.get('cmd_port')
 
             if isinstance(addr, str) and isinstance(port, int) and len(addr)>0:
-                return PortAgentClient(addr, port, cmd_port)
+                client = PortAgentClient(addr, port, cmd_port)
+                if config.get('listener_hub'):
+                    client.listener_hub = ListenerHub.instance()
+                if config.get('batch_data'):
+                    client.batch_data = True
+                return client
             else:
                 raise InstrumentParameterException('Invalid comms config dict.')
 
@@ -15,14 +15,15 @@ __license__ = 'Apache 2.0'
 
 import re
 import time
-import json
 from functools import partial
 
 from mi.core.log import get_logger ; log = get_logger()
 
 from threading import Thread
+from threading import Condition
 
 from mi.core.instrument.protocol_param_dict import ParameterDictVisibility
+from mi.core.instrument.protocol_buffer import ProtocolBuffer
 from mi.core.common import BaseEnum, InstErrorCode
 from mi.core.instrument.data_particle import RawDataParticle
 from mi.core.instrument.instrument_driver import DriverConfigKey
@@ -47,6 +48,12 @@ from mi.core.exceptions import InstrumentParameterExpirationException
 MAX_BUFFER_SIZE=32768
 DEFAULT_CMD_TIMEOUT=20
 DEFAULT_WRITE_DELAY=0
+# Longest a response waiter sleeps without being woken by add_to_buffer.
+# Only matters for protocols whose add_to_buffer does not notify waiters.
+BUFFER_POLL_INTERVAL=.1
+# How long the device has to stay quiet after a wakeup prompt before the
+# wakeup is considered complete, for _wakeup callers passing a settle_time.
+WAKEUP_SETTLE_TIME=.05
 RE_PATTERN = type(re.compile(""))
 
 class InterfaceType(BaseEnum):
@@ -252,12 +259,12 @@ class InstrumentProtocol(object):
         if regex.match(line):
         
             particle = particle_class(line, port_timestamp=timestamp)
-            parsed_sample = particle.generate()
+            sample = particle.generate_dict()
 
+            # generate() serializes the dict built above, there is no need
+            # to parse the JSON back to return the sample
             if publish and self._driver_event:
-                self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
-    
-            sample = json.loads(parsed_sample)
+                self._driver_event(DriverAsyncEvent.SAMPLE, particle.generate())
 
         return sample
 
@@ -810,11 +817,11 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         self._prompts = prompts
     
         # Line buffer for input from device.
-        self._linebuf = ''
+        self._line_buffer = ProtocolBuffer(self._max_buffer_size())
         
         # Short buffer to look for prompts from device in command-response
         # mode.
-        self._promptbuf = ''
+        self._prompt_buffer = ProtocolBuffer(self._max_buffer_size())
         
         # Lines of data awaiting further processing.
         self._datalines = []
@@ -827,6 +834,56 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
 
         self._last_data_receive_timestamp = None
 
+        # Signalled whenever data is added to the line and prompt buffers.
+        # The generation counts the additions so waiters can tell if data
+        # arrived between looking at the buffers and starting to wait.
+        self._buffer_condition = Condition()
+        self._buffer_generation = 0
+
+        # Settle time _wakeup uses when the caller doesn't give one. None
+        # waits out the whole wakeup delay; protocols for instruments that
+        # send their wakeup response at once can set WAKEUP_SETTLE_TIME.
+        self._wakeup_settle_time = None
+
+    def _get_linebuf(self):
+        return self._line_buffer.value
+
+    def _set_linebuf(self, value):
+        self._line_buffer.set(value)
+
+    def _get_promptbuf(self):
+        return self._prompt_buffer.value
+
+    def _set_promptbuf(self, value):
+        self._prompt_buffer.set(value)
+
+    # The line and prompt buffers read and assign as strs
+    _linebuf = property(_get_linebuf, _set_linebuf)
+    _promptbuf = property(_get_promptbuf, _set_promptbuf)
+
+    def _notify_buffer_waiters(self):
+        """
+        Wake up everything waiting for data in the line and prompt buffers.
+        Called by add_to_buffer; protocols overriding add_to_buffer should
+        call it after updating the buffers.
+        """
+        with self._buffer_condition:
+            self._buffer_generation += 1
+            self._buffer_condition.notify_all()
+
+    def _wait_for_buffer(self, generation, timeout):
+        """
+        Wait until data has been added to the buffers since generation was
+        read from self._buffer_generation, or the timeout expires.
+        @param generation The buffer generation the caller last looked at
+        @param timeout Maximum seconds to wait
+        @retval True if data was added to the buffers since generation
+        """
+        with self._buffer_condition:
+            if self._buffer_generation == generation:
+                self._buffer_condition.wait(min(timeout, BUFFER_POLL_INTERVAL))
+            return self._buffer_generation != generation
+
     def _get_prompts(self):
         """
         Return a list of prompts order from longest to shortest.  The
@@ -890,22 +947,24 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         log.debug('_get_response: timeout=%s, prompt_list=%s, expected_prompt=%s, response_regex=%r, promptbuf=%s',
                   timeout, prompt_list, expected_prompt, pattern, self._promptbuf)
         while True:
+            generation = self._buffer_generation
             if response_regex:
-                match = response_regex.search(self._linebuf)
+                match = self._line_buffer.search(response_regex)
                 if match:
                     return match.groups()
             else:
                 for item in prompt_list:
-                    index = self._promptbuf.find(item)
+                    index = self._prompt_buffer.find(item)
                     if index >= 0:
                         result = self._promptbuf[0:index+len(item)]
                         return item, result
 
-            time.sleep(.1)
-
-            if time.time() > starttime + timeout:
+            remaining = starttime + timeout - time.time()
+            if remaining <= 0:
                 raise InstrumentTimeoutException("in InstrumentProtocol._get_response()")
 
+            self._wait_for_buffer(generation, remaining)
+
     def _get_raw_response(self, timeout=10, expected_prompt=None):
         """
         Get a response from the instrument, but don't trim whitespace. Used in
@@ -929,15 +988,17 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
                 prompt_list = expected_prompt
 
         while True:
+            generation = self._buffer_generation
             for item in prompt_list:
                 if self._promptbuf.rstrip(strip_chars).endswith(item.rstrip(strip_chars)):
                     return (item, self._linebuf)
-                else:
-                    time.sleep(.1)
 
-            if time.time() > starttime + timeout:
+            remaining = starttime + timeout - time.time()
+            if remaining <= 0:
                 raise InstrumentTimeoutException("in InstrumentProtocol._get_raw_response()")
 
+            self._wait_for_buffer(generation, remaining)
+
     def _do_cmd_resp(self, cmd, *args, **kwargs):
         """
         Perform a command-response on the device.
@@ -1099,6 +1160,37 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
                 self._got_chunk(chunk, timestamp)
                 (timestamp, chunk) = self._chunker.get_next_data()
 
+    def got_data_batch(self, port_agent_packets):
+        """
+        Called by the instrument connection with all data packets framed
+        from one block read from the port agent. Does what got_data does
+        for each packet, but feeds the chunker once for the whole batch.
+        Protocols that override got_data get it called for every packet.
+        """
+        if self.got_data.im_func is not CommandResponseInstrumentProtocol.got_data.im_func:
+            for port_agent_packet in port_agent_packets:
+                self.got_data(port_agent_packet)
+            return
+
+        chunks = []
+        for port_agent_packet in port_agent_packets:
+            if port_agent_packet.get_data_length() > 0:
+                data = port_agent_packet.get_data()
+                if self.get_current_state() == DriverProtocolState.DIRECT_ACCESS:
+                    self._driver_event(DriverAsyncEvent.DIRECT_ACCESS, data)
+
+                self.add_to_buffer(data)
+                chunks.append((data, port_agent_packet.get_timestamp()))
+
+        log.debug("Got Data Batch of %d packets", len(chunks))
+
+        if chunks:
+            self._chunker.add_chunks(chunks)
+            (timestamp, chunk) = self._chunker.get_next_data()
+            while(chunk):
+                self._got_chunk(chunk, timestamp)
+                (timestamp, chunk) = self._chunker.get_next_data()
+
     ########################################################################
     # Incoming raw data callback.
     ########################################################################            
@@ -1126,23 +1218,14 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         buffers implemented as lifo ring buffer
         @param data: bytes to add to the buffer
         '''
-        # Update the line and prompt buffers.
-        self._linebuf += data
-        self._promptbuf += data
+        # Update the line and prompt buffers.  If a buffer exceeds the max
+        # allowable size then the leading characters are dropped on the floor.
+        max_size = self._max_buffer_size()
+        self._line_buffer.append(data, max_size)
+        self._prompt_buffer.append(data, max_size)
         self._last_data_timestamp = time.time()
 
-        # If our buffer exceeds the max allowable size then drop the leading
-        # characters on the floor.
-        if(len(self._linebuf) > self._max_buffer_size()):
-            self._linebuf = self._linebuf[self._max_buffer_size()*-1:]
-
-        # If our buffer exceeds the max allowable size then drop the leading
-        # characters on the floor.
-        if(len(self._promptbuf) > self._max_buffer_size()):
-            self._promptbuf = self._linebuf[self._max_buffer_size()*-1:]
-
-        log.debug("LINE BUF: %s", self._linebuf)
-        log.debug("PROMPT BUF: %s", self._promptbuf)
+        self._notify_buffer_waiters()
 
     def _max_buffer_size(self):
         return MAX_BUFFER_SIZE
@@ -1158,13 +1241,21 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         """
         pass
         
-    def _wakeup(self, timeout, delay=1):
+    def _wakeup(self, timeout, delay=1, settle_time=None):
         """
         Clear buffers and send a wakeup command to the instrument
         @param timeout The timeout to wake the device.
         @param delay The time to wait between consecutive wakeups.
+        @param settle_time If set, return as soon as a prompt was seen and
+        no more data arrived for this many seconds (WAKEUP_SETTLE_TIME is a
+        good value) instead of waiting out the delay. Only for instruments
+        that send their whole wakeup response at once. Defaults to the
+        protocol's _wakeup_settle_time.
         @throw InstrumentTimeoutException if the device could not be woken.
         """
+        if settle_time is None:
+            settle_time = self._wakeup_settle_time
+
         # Clear the prompt buffer.
         log.debug("clearing promptbuf: %s", self._promptbuf)
         self._promptbuf = ''
@@ -1172,28 +1263,47 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         # Grab time for timeout.
         starttime = time.time()
         
+        prompts = self._get_prompts()
+        log.debug("Prompts: %s", prompts)
+
         while True:
-            # Send a line return and wait a sec.
+            # Send a line return and wait up to a sec for a prompt.
             log.trace('Sending wakeup. timeout=%s', timeout)
             self._send_wakeup()
-            time.sleep(delay)
-
-            log.debug("Prompts: %s", self._get_prompts())
-
-            for item in self._get_prompts():
-                log.debug("buffer: %s", self._promptbuf)
-                log.debug("find prompt: %s", item)
-                index = self._promptbuf.find(item)
-                log.debug("Got prompt (index: %s): %s ", index, repr(self._promptbuf))
-                if index >= 0:
-                    log.trace('wakeup got prompt: %s', repr(item))
-                    return item
-            log.debug("Searched for all prompts")
+            wakeup_time = time.time()
+
+            while True:
+                generation = self._buffer_generation
+                prompt = None
+                for item in prompts:
+                    if self._prompt_buffer.find(item) >= 0:
+                        prompt = item
+                        break
+
+                remaining = wakeup_time + delay - time.time()
+                if remaining <= 0:
+                    if prompt is not None:
+                        log.trace('wakeup got prompt: %s', repr(prompt))
+                        return prompt
+                    break
+
+                if prompt is not None and settle_time is not None:
+                    # Let the rest of the wakeup response arrive so it is
+                    # not taken for the response to the next command.
+                    if not self._wait_for_buffer(generation, min(remaining, settle_time)):
+                        log.trace('wakeup got prompt: %s', repr(prompt))
+                        return prompt
+                    continue
+
+                self._wait_for_buffer(generation, remaining)
+
+            log.debug("Searched for all prompts, buffer: %r", self._promptbuf)
 
             if time.time() > starttime + timeout:
                 raise InstrumentTimeoutException("in _wakeup()")
 
-    def _wakeup_until(self, timeout, desired_prompt, delay=1, no_tries=5):
+    def _wakeup_until(self, timeout, desired_prompt, delay=1, no_tries=5,
+                      settle_time=None):
         """
         Continue waking device until a specific prompt appears or a number
         of tries has occurred. Desired prompt must be in the instrument's
@@ -1202,6 +1312,7 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         @desired_prompt Continue waking until this prompt is seen.
         @delay Time to wake between consecutive wakeups.
         @no_tries Maximum number of wakeup tries to see desired prompt.
+        @settle_time Passed on to _wakeup.
         @raises InstrumentTimeoutException if device could not be woken.
         @raises InstrumentProtocolException if the desired prompt is not seen in the
         maximum number of attempts.
@@ -1209,7 +1320,7 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
 
         count = 0
         while True:
-            prompt = self._wakeup(timeout, delay)
+            prompt = self._wakeup(timeout, delay, settle_time)
             if prompt == desired_prompt:
                 break
             else:
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.pd0_framing
+@file mi/core/instrument/pd0_framing.py
+@author Roger Unwin
+@brief Framing, checksum and decoding routines for Teledyne PD0 ensembles,
+shared by the live ADCP drivers and the ADCP data set parsers.  An ensemble
+starts with the 0x7F7F header followed by the little endian number of bytes in
+the ensemble, not counting the two checksum bytes that end it.  The checksum
+is the sum of every byte before it modulo 65536; ensembles are summed with
+numpy over a view of the buffer instead of one byte at a time.  The per depth
+cell arrays are decoded the same way, one numpy call per data type.
+"""
+
+__author__ = 'Roger Unwin'
+__license__ = 'Apache 2.0'
+
+import re
+import struct
+
+import numpy
+
+PD0_HEADER = '\x7f\x7f'
+PD0_HEADER_MATCHER = re.compile(PD0_HEADER)
+
+CHECKSUM_BYTES = 2
+CHECKSUM_MASK = 0xffff
+
+# Longer than any ensemble a Workhorse sends.  255 depth cells of velocity,
+# correlation, echo intensity and percent good with the leaders and bottom
+# track come to under 6 KB, so a header claiming more is not a real one.
+MAX_ENSEMBLE_LENGTH = 8192
+
+# each data type starts with a two byte id
+ID_BYTES = 2
+
+NUM_BYTES_STRUCT = struct.Struct('<H')
+CHECKSUM_STRUCT = struct.Struct('<H')
+
+# Below this many bytes a plain loop beats setting up a numpy view
+BULK_CHECKSUM_THRESHOLD = 64
+
+# One depth cell of the velocity data, a signed short per beam
+VELOCITY_CELL = numpy.dtype([('beam1', '<i2'), ('beam2', '<i2'), ('beam3', '<i2'), ('beam4', '<i2')])
+
+# One depth cell of the correlation magnitude, echo intensity or percent good
+# data, a byte per beam
+BEAM_BYTE_CELL = numpy.dtype([('beam1', 'u1'), ('beam2', 'u1'), ('beam3', 'u1'), ('beam4', 'u1')])
+
+
+def pd0_checksum(data, start=0, end=None):
+    """
+    Sum the bytes of part of a buffer modulo 65536
+    @param data A str, bytearray, memoryview or array holding the bytes
+    @param start The offset of the first byte to sum
+    @param end The offset after the last byte to sum, the end of data if None
+    @retval The checksum as an int in the range 0-65535
+    """
+    if end is None:
+        end = len(data)
+    length = end - start
+    if length <= 0:
+        return 0
+
+    if length < BULK_CHECKSUM_THRESHOLD:
+        return sum(bytearray(data[start:end])) & CHECKSUM_MASK
+
+    # the view shares the buffer, nothing is copied
+    total = numpy.frombuffer(data, numpy.uint8, length, start).sum(dtype=numpy.uint64)
+    return int(total) & CHECKSUM_MASK
+
+
+def ensemble_checksum(data, start=0):
+    """
+    Calculate the checksum of the ensemble starting at start and read the
+    checksum it was sent with.  The whole ensemble must be in data.
+    @param data The buffer holding the ensemble
+    @param start The offset of the ensemble header
+    @retval A (calculated checksum, received checksum) tuple
+    @throws struct.error if data ends before the ensemble does
+    """
+    checksum_start = start + NUM_BYTES_STRUCT.unpack_from(data, start + 2)[0]
+    received = CHECKSUM_STRUCT.unpack_from(data, checksum_start)[0]
+    return (pd0_checksum(data, start, checksum_start), received)
+
+
+def ensemble_length(data, start=0):
+    """
+    Read the length of the ensemble starting at start from its header
+    @param data The buffer holding the start of the ensemble
+    @param start The offset of the ensemble header
+    @retval The number of bytes in the ensemble including the checksum, None
+        if data ends before the number of bytes does
+    """
+    if len(data) < start + 2 + NUM_BYTES_STRUCT.size:
+        return None
+    return NUM_BYTES_STRUCT.unpack_from(data, start + 2)[0] + CHECKSUM_BYTES
+
+
+def find_ensembles(data, validate=True):
+    """
+    Find the ensembles that are entirely in a buffer.  When the checksums are
+    validated the search resumes after each valid ensemble, so header bytes
+    inside an ensemble are never mistaken for the start of another one.
+    Without validation every header with its whole ensemble in the buffer is
+    returned and the checksum is left to whoever parses the ensemble.
+    @param data The buffer to search
+    @param validate Only return ensembles whose checksum matches
+    @retval A list of (start, end) tuples, end is after the checksum bytes
+    """
+    indices = []
+    # the number of bytes must be in the buffer after the header
+    search_end = len(data) - CHECKSUM_BYTES
+    match = PD0_HEADER_MATCHER.search(data, 0, search_end)
+    while match:
+        start = match.start()
+        resume = match.end()
+        end = start + ensemble_length(data, start)
+
+        if end <= len(data):
+            if not validate:
+                indices.append((start, end))
+            else:
+                (calculated, received) = ensemble_checksum(data, start)
+                if calculated == received:
+                    indices.append((start, end))
+                    resume = end
+
+        match = PD0_HEADER_MATCHER.search(data, resume, search_end)
+    return indices
+
+
+def decode_cells(data, cell, count, offset=ID_BYTES):
+    """
+    Decode the depth cells of a data type with one numpy call and split them
+    into a list per field of the cell
+    @param data The bytes of the data type, starting with its id
+    @param cell The numpy structured dtype of one depth cell
+    @param count The number of depth cells
+    @param offset The offset of the first depth cell in data
+    @retval A list holding a list of python values for each field of cell
+    @throws ValueError if data ends before the last depth cell
+    """
+    if count <= 0:
+        return [[] for name in cell.names]
+    cells = numpy.frombuffer(data, cell, count, offset)
+    return [cells[name].tolist() for name in cell.names]
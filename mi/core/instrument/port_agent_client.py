@@ -12,24 +12,20 @@ __author__ = 'David Everett'
 __license__ = 'Apache 2.0'
 
 import socket
+import select
 import errno
 import threading
 import time
+import math
 import datetime
-import struct
 import array
 import binascii
-import ctypes
 import subprocess
 
 from mi.core.log import get_logger ; log = get_logger()
 from mi.core.exceptions import InstrumentConnectionException
-
-HEADER_SIZE = 16 # BBBBHHLL = 1 + 1 + 1 + 1 + 2 + 2 + 4 + 4 = 16
-
-
-OFFSET_P_CHECKSUM_LOW = 6
-OFFSET_P_CHECKSUM_HIGH = 7
+from mi.core.instrument import port_agent_codec
+from mi.core.instrument.port_agent_codec import HEADER_SIZE
 
 """
 Offsets into the unpacked header fields
@@ -62,12 +58,15 @@ MAX_SEND_ATTEMPTS = 15              # Max number of times we can get EAGAIN
 class SocketClosed(Exception): pass
 
 
-class PortAgentPacket():
+class PortAgentPacket(object):
     """
     An object that encapsulates the details packets that are sent to and
     received from the port agent.
     https://confluence.oceanobservatories.org/display/syseng/CIAD+MI+Port+Agent+Design
     """
+    __slots__ = ('__header', '__data', '__type', '__length',
+                 '__port_agent_timestamp', '__recv_checksum', '__checksum',
+                 '__isValid')
     
     """
     Port Agent Packet Types
@@ -94,19 +93,8 @@ class PortAgentPacket():
 
     def unpack_header(self, header):
         self.__header = header
-        #@TODO may want to switch from big endian to network order '!' instead of '>' note network order is big endian.
-        # B = unsigned char size 1 bytes
-        # H = unsigned short size 2 bytes
-        # L = unsigned long size 4 bytes
-        # d = float size8 bytes
-        variable_tuple = struct.unpack_from('>BBBBHHII', header)
-        # change offset to index.
-        self.__type = variable_tuple[TYPE_INDEX]
-        self.__length = int(variable_tuple[LENGTH_INDEX]) - HEADER_SIZE
-        self.__recv_checksum  = int(variable_tuple[CHECKSUM_INDEX])
-        upper = variable_tuple[TIMESTAMP_UPPER_INDEX]
-        lower = variable_tuple[TIMESTAMP_LOWER_INDEX]
-        self.__port_agent_timestamp = float("%s.%s" % (upper, lower))
+        (self.__type, self.__length, self.__recv_checksum,
+         self.__port_agent_timestamp) = port_agent_codec.unpack_header(header)
         #log.trace("port_timestamp: %f", self.__port_agent_timestamp)
 
     def pack_header(self):
@@ -127,21 +115,9 @@ class PortAgentPacket():
             self.set_data_length(len(self.__data))
             self.set_timestamp()
 
-
-            variable_tuple = (0xa3, 0x9d, 0x7a, self.__type, 
-                              self.__length + HEADER_SIZE, 0x0000, 
-                              self.__port_agent_timestamp)
-
-            # B = unsigned char size 1 bytes
-            # H = unsigned short size 2 bytes
-            # L = unsigned long size 4 bytes
-            # d = float size 8 bytes
-            format = '>BBBBHHd'
-            size = struct.calcsize(format)
-            temp_header = ctypes.create_string_buffer(size)
-            struct.pack_into(format, temp_header, 0, *variable_tuple)
-            self.__header = temp_header.raw
-            #print "here it is: ", binascii.hexlify(self.__header)
+            self.__header = port_agent_codec.pack_header(self.__type,
+                                                         self.__length,
+                                                         self.__port_agent_timestamp)
             
             """
             do the checksum last, since the checksum needs to include the
@@ -153,43 +129,17 @@ class PortAgentPacket():
             self.__checksum = self.calculate_checksum()
             self.__recv_checksum  = self.__checksum
 
-            """
-            This was causing a problem, and since it is not used for our tests,
-            commented out; if we need it we'll have to fix
-            """
-            #self.__header[OFFSET_P_CHECKSUM_HIGH] = self.__checksum & 0x00ff
-            #self.__header[OFFSET_P_CHECKSUM_LOW] = (self.__checksum & 0xff00) >> 8
-
 
     def attach_data(self, data):
         self.__data = data
 
     def calculate_checksum(self):
-        checksum = 0
-        for i in range(HEADER_SIZE):
-            if i < OFFSET_P_CHECKSUM_LOW or i > OFFSET_P_CHECKSUM_HIGH:
-                checksum ^= struct.unpack_from('B', str(self.__header[i]))[0]
-                
-        for i in range(self.__length):
-            checksum ^= struct.unpack_from('B', str(self.__data[i]))[0]
-            
-        return checksum
-            
-                                
+        return port_agent_codec.packet_checksum(self.__header, self.__data,
+                                                self.__length)
+
     def verify_checksum(self):
-        checksum = 0
-        for i in range(HEADER_SIZE):
-            if i < OFFSET_P_CHECKSUM_LOW or i > OFFSET_P_CHECKSUM_HIGH:
-                checksum ^= struct.unpack_from('B', self.__header[i])[0]
-                
-        for i in range(self.__length):
-            checksum ^= struct.unpack_from('B', self.__data[i])[0]
-            
-        if checksum == self.__recv_checksum:
-            self.__isValid = True
-        else:
-            self.__isValid = False
-            
+        checksum = self.calculate_checksum()
+        self.__isValid = (checksum == self.__recv_checksum)
         #log.debug('checksum: %i.' %(checksum))
 
     def get_header(self):
@@ -256,6 +206,16 @@ class PortAgentClient(object):
     RECOVERY_SLEEP_TIME = 2
     HEARTBEAT_INTERVAL_COMMAND = "heartbeat_interval "
     BREAK_COMMAND = "break "
+
+    # Set by a process hosting many drivers to a ListenerHub, so the
+    # listeners of every client share its thread instead of each starting
+    # their own.
+    listener_hub = None
+
+    # Set by drivers that take the data packets read in one block together.
+    # The raw packets of a block are then handed over before its data, so
+    # only drivers that don't depend on that order should set it.
+    batch_data = False
     
     def __init__(self, host, port, cmd_port, delim=None):
         """
@@ -273,6 +233,7 @@ class PortAgentClient(object):
         self.send_attempts = MAX_SEND_ATTEMPTS
         self.recovery_attempts = 0
         self.user_callback_data = None
+        self.user_callback_data_batch = None
         self.user_callback_raw = None
         self.user_callback_error = None
         self.listener_callback_error = None
@@ -302,6 +263,10 @@ class PortAgentClient(object):
             # start the listener thread if instructed to
             ###
             if self.start_listener:
+                callback_data_batch = None
+                if self.user_callback_data_batch:
+                    callback_data_batch = self.callback_data_batch
+
                 self.listener_thread = Listener(self.sock,  
                                                 self.recovery_attempts,
                                                 self.delim, self.heartbeat, 
@@ -310,7 +275,9 @@ class PortAgentClient(object):
                                                 self.callback_raw,
                                                 self.listener_callback_error,
                                                 self.callback_error,
-                                                self.user_callback_error)
+                                                self.user_callback_error,
+                                                callback_data_batch,
+                                                self.listener_hub)
                 self.listener_thread.start()
 
             ###
@@ -363,9 +330,18 @@ class PortAgentClient(object):
     def init_comms(self, user_callback_data = None, user_callback_raw = None,
                    listener_callback_error = None,
                    user_callback_error = None, heartbeat = 0,
-                   max_missed_heartbeats = None, start_listener = True):
-        
+                   max_missed_heartbeats = None, start_listener = True,
+                   user_callback_data_batch = None):
+        """
+        Connect to the port agent and start the listener thread.
+        @param user_callback_data Called with every data packet
+        @param user_callback_raw Called with every packet
+        @param user_callback_data_batch If given, the listener reads the
+        socket in large blocks and calls this with the list of data packets
+        framed from each block instead of calling user_callback_data.
+        """
         self.user_callback_data = user_callback_data        
+        self.user_callback_data_batch = user_callback_data_batch
         self.user_callback_raw = user_callback_raw
         self.listener_callback_error = listener_callback_error
         self.user_callback_error = user_callback_error
@@ -410,6 +386,18 @@ class PortAgentClient(object):
         else:
             log.error("No user_callback_data defined")
 
+    def callback_data_batch(self, paPackets):
+        """
+        A block of packets has been received from the port agent.  The data
+        packets are contained in a list of packet objects.
+        """
+        if (self.user_callback_data_batch):
+            for paPacket in paPackets:
+                paPacket.verify_checksum()
+            self.user_callback_data_batch(paPackets)
+        else:
+            log.error("No user_callback_data_batch defined")
+
     def callback_raw(self, paPacket):
         """
         A packet has been received from the port agent.  The packet is 
@@ -582,6 +570,8 @@ class Listener(threading.Thread):
     MAX_HEARTBEAT_INTERVAL = 20 # Max, for range checking parameter
     MAX_MISSED_HEARTBEATS = 5   # Max number we can miss 
     HEARTBEAT_FUDGE = 1         # Fudge factor to account for delayed heartbeat
+    BATCH_BUFFER_SIZE = 0x40000 # Receive buffer in batch mode, holds several max sized packets
+    BATCH_SELECT_TIMEOUT = .1   # Seconds to wait for data before checking for done
 
     """
     A listener thread to monitor the client socket data incoming from
@@ -594,7 +584,9 @@ class Listener(threading.Thread):
                  callback_data = None, callback_raw = None,
                  default_callback_error = None,
                  local_callback_error = None,
-                 user_callback_error = None):
+                 user_callback_error = None,
+                 callback_data_batch = None,
+                 hub = None):
         """
         Listener thread constructor.
         @param sock The socket to listen on.
@@ -609,11 +601,23 @@ class Listener(threading.Thread):
         @param default_callback_data A callback to handle non-network exceptions
         @param local_callback_data The local callback when error encountered.
         @param user_callback_data The user callback on error_encountered.
+        @param callback_data_batch If given, read the socket in large blocks
+        and call this with the list of data packets framed from each block
+        instead of calling callback_data for every packet.
+        @param hub If given, the ListenerHub whose thread reads the socket in
+        large blocks; the listener thread itself is never started.
         """
         threading.Thread.__init__(self)
         self.sock = sock
+        self.hub = hub
+        self.heartbeat_deadline = None
+        self.buf = None
+        self.bufview = None
+        self.buf_size = 0
         self.recovery_attempt = recovery_attempt
         self._done = False
+        # held by the hub while a block of this listener is handled
+        self._read_lock = threading.RLock()
         self.linebuf = ''
         self.delim = delim
         self.heartbeat_timer = None
@@ -682,6 +686,7 @@ class Listener(threading.Thread):
         self.local_callback_error = fn_local_callback_error
         self.user_callback_error = fn_user_callback_error
         self.default_callback_error = fn_callback_error
+        self.callback_data_batch = callback_data_batch
 
     def heartbeat_timeout(self):
         log.error('heartbeat timeout')
@@ -723,7 +728,13 @@ class Listener(threading.Thread):
         it and start it again, you have to instantiate a new one.
         I don't like this; we need to implement a tread timer that 
         stays up and can be reset and started many times.
+        With a hub only the deadline is moved; the hub's timer wheel checks
+        it, so no timer is created per heartbeat.
         """
+        if self.hub:
+            self.heartbeat_deadline = time.time() + self.heartbeat
+            return
+
         if self.heartbeat_timer:
             self.heartbeat_timer.cancel()
 
@@ -731,6 +742,37 @@ class Listener(threading.Thread):
                                             self.heartbeat_timeout)
         self.heartbeat_timer.start()
         
+    def start(self):
+        """
+        Start the listener thread, or hand the socket to the hub.
+        """
+        if not self.hub:
+            threading.Thread.start(self)
+            return
+
+        self.thread_name = self.hub.name
+        if self.heartbeat:
+            self.start_heartbeat_timer()
+        self.hub.add(self)
+
+    def join(self, timeout=None):
+        """
+        Wait for the listener thread to end, or for the hub to let go of the
+        socket.
+        """
+        if not self.hub:
+            threading.Thread.join(self, timeout)
+            return
+        self.hub.remove(self)
+
+    def is_alive(self):
+        """
+        True while the listener thread runs or the hub reads the socket.
+        """
+        if not self.hub:
+            return threading.Thread.is_alive(self)
+        return self.hub.has(self)
+
     def done(self):
         """
         Signal to the listener thread to end its processing loop and
@@ -771,6 +813,52 @@ class Listener(threading.Thread):
             self.heartbeat_missed_count = self.max_missed_heartbeats
 
 
+    def handle_packets(self, paPackets):
+        """
+        Handle a list of packets received in one block.  Every packet goes
+        to the raw callback as it would in handle_packet, the data packets
+        are then passed on in one call to the batch callback.
+        """
+        data_packets = []
+        for paPacket in paPackets:
+            packet_type = paPacket.get_header_type()
+            if packet_type == PortAgentPacket.DATA_FROM_INSTRUMENT or \
+               packet_type == PortAgentPacket.PICKLED_DATA_FROM_INSTRUMENT:
+                self.callback_raw(paPacket)
+                data_packets.append(paPacket)
+            else:
+                self.handle_packet(paPacket)
+
+        if data_packets:
+            self.callback_data_batch(data_packets)
+
+    def frame_packets(self, buf, size):
+        """
+        Frame the complete packets at the front of a receive buffer.
+        @param buf The bytearray holding the received bytes
+        @param size The number of bytes received into buf
+        @retval A tuple of (packets, used) with the list of framed packets and
+        the number of bytes they took up.
+        @raise SocketClosed if a header has a length shorter than a header,
+        the stream can not be framed after that.
+        """
+        packets = []
+        used = 0
+        while size - used >= HEADER_SIZE:
+            header = str(buf[used:used + HEADER_SIZE])
+            paPacket = PortAgentPacket()
+            paPacket.unpack_header(header)
+            data_size = paPacket.get_data_length()
+            if data_size < 0:
+                raise SocketClosed('Invalid port agent packet length %d' % data_size)
+            if size - used < HEADER_SIZE + data_size:
+                break
+            start = used + HEADER_SIZE
+            paPacket.attach_data(str(buf[start:start + data_size]))
+            packets.append(paPacket)
+            used = start + data_size
+        return (packets, used)
+
     def run(self):
         """
         Listener thread processing loop. Block on receive from port agent.
@@ -784,6 +872,83 @@ class Listener(threading.Thread):
         if self.heartbeat:
             self.start_heartbeat_timer()
 
+        if self.callback_data_batch:
+            self._run_batched()
+        else:
+            self._run_packets()
+
+        log.info('Port_agent_client thread done listening; going away.')
+
+    def _run_batched(self):
+        """
+        Batch mode processing loop. Wait for data, then read and handle
+        blocks of packets until done.
+        """
+        while not self._done:
+            try:
+                (readable, writable, errored) = select.select([self.sock], [], [],
+                                                             self.BATCH_SELECT_TIMEOUT)
+                if readable:
+                    self.read_block()
+
+            except SocketClosed:
+                errorString = 'Listener thread: %s SocketClosed exception from port_agent socket' \
+                    % (self.thread_name)
+                log.error(errorString)
+                self._invoke_error_callback(self.recovery_attempt, errorString)
+                self._done = True
+
+            except socket.error as e:
+                errorString = 'Listener thread: %s Socket error while receiving from port agent: %r' \
+                 % (self.thread_name, e)
+                log.error(errorString)
+                self._invoke_error_callback(self.recovery_attempt, errorString)
+                self._done = True
+
+            except Exception as e:
+                self.default_callback_error(e)
+
+    def read_block(self):
+        """
+        Read as much as fits into a reusable buffer, frame every complete
+        packet in it and hand them over together.  A partial packet is moved
+        to the front of the buffer to be completed by the next read.
+        @raise SocketClosed if the port agent closed the socket
+        @raise socket.error on a receive error other than EWOULDBLOCK
+        """
+        if self.buf is None:
+            self.buf = bytearray(self.BATCH_BUFFER_SIZE)
+            self.bufview = memoryview(self.buf)
+            self.buf_size = 0
+
+        try:
+            bytesrx = self.sock.recv_into(self.bufview[self.buf_size:], len(self.buf) - self.buf_size)
+        except socket.error as e:
+            if e.errno == errno.EWOULDBLOCK:
+                return
+            raise
+        log.debug('RX BLOCK BYTES %d SOCK %r', bytesrx, self.sock)
+        if bytesrx <= 0:
+            raise SocketClosed()
+        self.buf_size += bytesrx
+
+        (packets, used) = self.frame_packets(self.buf, self.buf_size)
+        if used:
+            self.buf[:self.buf_size - used] = self.buf[used:self.buf_size]
+            self.buf_size -= used
+
+        if packets and not self._done:
+            log.debug("HANDLE %d PACKETS", len(packets))
+            if self.callback_data_batch:
+                self.handle_packets(packets)
+            else:
+                for paPacket in packets:
+                    self.handle_packet(paPacket)
+
+    def _run_packets(self):
+        """
+        Packet at a time processing loop.
+        """
         while not self._done:
             try:
                 log.debug('RX NEW PACKET')
@@ -800,7 +965,7 @@ class Listener(threading.Thread):
                         bytes_left -= bytesrx
                     except socket.error as e:
                         if e.errno == errno.EWOULDBLOCK:
-                            time.sleep(.1)
+                            select.select([self.sock], [], [], self.BATCH_SELECT_TIMEOUT)
                         else:
                             raise
 
@@ -827,7 +992,7 @@ class Listener(threading.Thread):
                         bytes_left -= bytesrx
                     except socket.error as e:
                         if e.errno == errno.EWOULDBLOCK:
-                            time.sleep(.1)
+                            select.select([self.sock], [], [], self.BATCH_SELECT_TIMEOUT)
                         else:
                             raise
 
@@ -868,8 +1033,6 @@ class Listener(threading.Thread):
             except Exception as e:
                 self.default_callback_error(e)
 
-        log.info('Port_agent_client thread done listening; going away.')
-
     def _invoke_error_callback(self, recovery_attempt, error_string = "No error string passed."):
         """
         Invoke either the user_error_callback or the local_error_callback, depending upon the
@@ -889,3 +1052,289 @@ class Listener(threading.Thread):
         else:
             log.debug('port_agent_client listen thread calling user_callback_error.')
             self.user_callback_error(error_string)
+
+
+class TimerWheel(object):
+    """
+    A hashed timer wheel: items are kept in the slot of the tick their
+    deadline falls in, so scheduling and cancelling take constant time and
+    expiring only looks at the slots of the ticks that passed.  Deadlines
+    more than one turn of the wheel away wait in their slot for later turns.
+    """
+    def __init__(self, tick, slots, now=None):
+        """
+        @param tick Seconds per slot, the resolution of the deadlines
+        @param slots Number of slots in the wheel
+        @param now The current time, time.time() if None
+        """
+        if now is None:
+            now = time.time()
+        self.tick = tick
+        self.slots = [set() for i in range(slots)]
+        self.due = {}
+        self.last_tick = int(now / tick)
+
+    def schedule(self, item, deadline):
+        """
+        Schedule an item to expire at a deadline, replacing any deadline it
+        had.
+        """
+        self.cancel(item)
+        due = max(int(math.ceil(deadline / self.tick)), self.last_tick + 1)
+        self.slots[due % len(self.slots)].add(item)
+        self.due[item] = due
+
+    def cancel(self, item):
+        """
+        Unschedule an item.
+        """
+        due = self.due.pop(item, None)
+        if due is not None:
+            self.slots[due % len(self.slots)].discard(item)
+
+    def expire(self, now=None):
+        """
+        Unschedule the items whose deadline passed.
+        @param now The current time, time.time() if None
+        @retval A list of the expired items
+        """
+        if now is None:
+            now = time.time()
+        now_tick = int(now / self.tick)
+        expired = []
+        # every slot is looked at once at most, however long it has been
+        for tick in range(self.last_tick + 1, min(now_tick, self.last_tick + len(self.slots)) + 1):
+            slot = self.slots[tick % len(self.slots)]
+            for item in [item for item in slot if self.due[item] <= now_tick]:
+                slot.discard(item)
+                del self.due[item]
+                expired.append(item)
+        self.last_tick = max(self.last_tick, now_tick)
+        return expired
+
+
+class ListenerHub(threading.Thread):
+    """
+    A single thread that reads the sockets of many listeners and keeps
+    their heartbeat timers.  Each listener's socket is read in blocks as in
+    batch mode, and its packets are handed over with the listener's own
+    callbacks.  Sockets are waited on with epoll where it is available and
+    select has not been patched by gevent, and with select otherwise.
+    Heartbeat deadlines are kept on a timer wheel.  Connection errors and
+    missed heartbeats are passed to the listener's error callbacks on a
+    separate thread, since recovery reconnects and may sleep, and would hold
+    up every other listener if run on this one.
+    """
+    SELECT_TIMEOUT = .1   # Seconds to wait for data before checking for new listeners
+    WHEEL_SLOTS = 256     # Heartbeat wheel slots of SELECT_TIMEOUT, a longer span than any heartbeat
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        """
+        The hub shared by every client in the process that asks for one,
+        started on first use.
+        """
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance._done:
+                cls._instance = cls()
+                cls._instance.start()
+            return cls._instance
+
+    def __init__(self, use_epoll=None):
+        """
+        @param use_epoll Wait with epoll rather than select; if None, use
+        epoll when it is available and select has not been patched.
+        """
+        threading.Thread.__init__(self, name='ListenerHub')
+        self.daemon = True
+        if use_epoll is None:
+            # gevent replaces select.select with a cooperative version but
+            # not epoll, which would block every greenlet while waiting
+            use_epoll = hasattr(select, 'epoll') and select.select.__module__ == 'select'
+        self._epoll = use_epoll and select.epoll() or None
+        # listeners by socket file descriptor, and the other way round
+        self._listeners = {}
+        self._fds = {}
+        # listeners added since the hub last scheduled heartbeats
+        self._added = []
+        self._wheel = TimerWheel(self.SELECT_TIMEOUT, self.WHEEL_SLOTS)
+        # guards the listener tables; not held while a block is handled, so
+        # slow callbacks do not hold up adding or removing other listeners
+        self._mutex = threading.RLock()
+        self._done = False
+
+    def add(self, listener):
+        """
+        Start reading a listener's socket, and keeping its heartbeat timer.
+        """
+        fd = listener.sock.fileno()
+        with self._mutex:
+            # a listener whose socket was closed without being removed has
+            # left its descriptor to this one
+            stale = self._listeners.get(fd)
+            if stale is not None:
+                del self._fds[stale]
+            self._listeners[fd] = listener
+            self._fds[listener] = fd
+            self._added.append(listener)
+            if self._epoll:
+                try:
+                    self._epoll.register(fd, select.EPOLLIN)
+                except IOError as e:
+                    if e.errno != errno.EEXIST:
+                        raise
+
+    def remove(self, listener):
+        """
+        Stop reading a listener's socket, waiting for a block being handled.
+        """
+        with self._mutex:
+            fd = self._fds.pop(listener, None)
+            if fd is None:
+                return
+            del self._listeners[fd]
+            if self._epoll:
+                try:
+                    self._epoll.unregister(fd)
+                except (IOError, OSError, ValueError):
+                    # closed sockets are already gone from the set
+                    pass
+        # a block being handled is finished first, unless it is a callback
+        # of this listener removing it
+        with listener._read_lock:
+            pass
+
+    def has(self, listener):
+        """
+        True if the hub reads the listener's socket.
+        """
+        with self._mutex:
+            return listener in self._fds
+
+    def done(self):
+        """
+        Signal the hub thread to end its processing loop and conclude.
+        """
+        self._done = True
+
+    def _fail(self, listener, error_string):
+        """
+        Stop reading a listener that lost its connection and start its error
+        handling on a thread of its own.
+        """
+        log.error(error_string)
+        listener.done()
+        self.remove(listener)
+        recovery = threading.Thread(target=listener._invoke_error_callback,
+                                    args=(listener.recovery_attempt, error_string))
+        recovery.start()
+
+    def _wait_epoll(self):
+        """
+        Wait for data with epoll.
+        @retval The listeners whose socket has data or an error.
+        """
+        try:
+            events = self._epoll.poll(self.SELECT_TIMEOUT)
+        except IOError as e:
+            if e.errno == errno.EINTR:
+                return []
+            raise
+        with self._mutex:
+            return [self._listeners[fd] for (fd, event) in events if fd in self._listeners]
+
+    def _wait_select(self):
+        """
+        Wait for data with select.
+        @retval The listeners whose socket has data.
+        """
+        with self._mutex:
+            listeners = [listener for listener in self._listeners.values() if not listener._done]
+        if not listeners:
+            time.sleep(self.SELECT_TIMEOUT)
+            return []
+
+        try:
+            (readable, writable, errored) = select.select([listener.sock for listener in listeners],
+                                                         [], [], self.SELECT_TIMEOUT)
+        except (select.error, socket.error, ValueError):
+            # a socket was closed while waiting, find it
+            for listener in listeners:
+                if listener._done or not self.has(listener):
+                    continue
+                try:
+                    select.select([listener.sock], [], [], 0)
+                except (select.error, socket.error, ValueError) as e:
+                    self._fail(listener, 'Listener hub: socket error while waiting on port agent: %r' % (e,))
+            return []
+
+        return [listener for listener in listeners if listener.sock in readable]
+
+    def _read(self, listener):
+        """
+        Read and handle a block of packets from a listener's socket.  Only
+        the listener's own lock is held while its callbacks run.
+        """
+        with listener._read_lock:
+            if listener._done or not self.has(listener):
+                return
+            try:
+                listener.read_block()
+            except SocketClosed:
+                self._fail(listener, 'Listener hub: SocketClosed exception from port_agent socket')
+            except socket.error as e:
+                self._fail(listener, 'Listener hub: Socket error while receiving from port agent: %r' % (e,))
+            except Exception as e:
+                listener.default_callback_error(e)
+
+    def _check_heartbeats(self):
+        """
+        Schedule the heartbeats of new listeners, then count a missed
+        heartbeat for every listener whose deadline passed.  A heartbeat
+        received since the deadline was scheduled has moved it, and it is
+        only scheduled again.
+        """
+        with self._mutex:
+            (added, self._added) = (self._added, [])
+        for listener in added:
+            if listener.heartbeat:
+                self._wheel.schedule(listener, listener.heartbeat_deadline)
+
+        now = time.time()
+        for listener in self._wheel.expire(now):
+            if listener._done or not self.has(listener):
+                continue
+            if listener.heartbeat_deadline > now:
+                self._wheel.schedule(listener, listener.heartbeat_deadline)
+                continue
+
+            log.error('heartbeat timeout')
+            listener.heartbeat_missed_count -= 1
+            if listener.heartbeat_missed_count <= 0:
+                self._fail(listener, 'Maximum allowable Port Agent heartbeats (' +
+                           str(listener.max_missed_heartbeats) + ') missed!')
+            else:
+                listener.start_heartbeat_timer()
+                self._wheel.schedule(listener, listener.heartbeat_deadline)
+
+    def run(self):
+        """
+        Hub thread processing loop.  Wait for any socket to have data, read
+        a block from each one that does, then check the heartbeats.
+        """
+        log.info('PortAgentClient listener hub started.')
+        while not self._done:
+            if self._epoll:
+                ready = self._wait_epoll()
+            else:
+                ready = self._wait_select()
+            for listener in ready:
+                self._read(listener)
+            self._check_heartbeats()
+
+        if self._epoll:
+            self._epoll.close()
+        log.info('PortAgentClient listener hub done listening; going away.')
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.port_agent_codec
+@file mi/core/instrument/port_agent_codec.py
+@author David Everett
+@brief Header packing and checksum routines for port agent packets.  The
+checksum is an XOR over every header byte except the checksum field and
+every payload byte; payloads are reduced 64 bits at a time with numpy
+instead of one byte at a time.
+"""
+
+__author__ = 'David Everett'
+__license__ = 'Apache 2.0'
+
+import struct
+
+import numpy
+
+HEADER_SIZE = 16 # BBBBHHLL = 1 + 1 + 1 + 1 + 2 + 2 + 4 + 4 = 16
+
+OFFSET_P_CHECKSUM_LOW = 6
+OFFSET_P_CHECKSUM_HIGH = 7
+
+SYNC_BYTES = (0xa3, 0x9d, 0x7a)
+
+# B = unsigned char size 1 bytes
+# H = unsigned short size 2 bytes
+# I = unsigned int size 4 bytes
+# d = float size 8 bytes
+HEADER_STRUCT = struct.Struct('>BBBBHHII')
+PACK_HEADER_STRUCT = struct.Struct('>BBBBHHd')
+
+# Below this many bytes a plain loop beats setting up a numpy view
+BULK_CHECKSUM_THRESHOLD = 64
+
+
+def xor_checksum(data, length=None):
+    """
+    XOR all bytes of a buffer together.
+    @param data A str, bytearray, memoryview or array holding the bytes
+    @param length Only use the first length bytes of data
+    @retval The XOR of the bytes as an int in the range 0-255
+    """
+    if data is None and not length:
+        # a packet with no data attached
+        return 0
+
+    if length is None:
+        length = len(data)
+
+    if length < BULK_CHECKSUM_THRESHOLD:
+        checksum = 0
+        for byte in bytearray(data[:length]):
+            checksum ^= byte
+        return checksum
+
+    # reduce as 64 bit words, then fold the word down to a byte
+    words = length // 8
+    word = int(numpy.bitwise_xor.reduce(numpy.frombuffer(data, numpy.uint64, words)))
+    word ^= word >> 32
+    word ^= word >> 16
+    word ^= word >> 8
+    checksum = word & 0xff
+
+    for byte in bytearray(data[words * 8:length]):
+        checksum ^= byte
+    return checksum
+
+
+def header_checksum(header):
+    """
+    XOR the header bytes, skipping the checksum field itself.
+    @param header The HEADER_SIZE bytes of a packet header
+    @retval The XOR of the header bytes as an int
+    """
+    header = bytearray(header[:HEADER_SIZE])
+    checksum = 0
+    for i in range(OFFSET_P_CHECKSUM_LOW):
+        checksum ^= header[i]
+    for i in range(OFFSET_P_CHECKSUM_HIGH + 1, HEADER_SIZE):
+        checksum ^= header[i]
+    return checksum
+
+
+def packet_checksum(header, data, length=None):
+    """
+    Compute the checksum of a port agent packet.
+    @param header The HEADER_SIZE bytes of the packet header
+    @param data The packet payload
+    @param length Only use the first length bytes of the payload
+    @retval The packet checksum as an int
+    """
+    return header_checksum(header) ^ xor_checksum(data, length)
+
+
+def unpack_header(header):
+    """
+    Unpack a packet header.
+    @param header A buffer starting with the HEADER_SIZE header bytes
+    @retval A tuple of (type, data length, checksum, timestamp), where the
+    data length excludes the header.
+    """
+    (sync1, sync2, sync3, packet_type, length, checksum,
+     upper, lower) = HEADER_STRUCT.unpack_from(header)
+    return (packet_type, length - HEADER_SIZE, checksum,
+            float("%s.%s" % (upper, lower)))
+
+
+def pack_header(packet_type, length, timestamp):
+    """
+    Pack a packet header with an empty checksum field.
+    @param packet_type The port agent packet type
+    @param length The length of the packet payload, without the header
+    @param timestamp The packet timestamp as a float
+    @retval The header as a str
+    """
+    return PACK_HEADER_STRUCT.pack(SYNC_BYTES[0], SYNC_BYTES[1], SYNC_BYTES[2],
+                                   packet_type, length + HEADER_SIZE, 0x0000,
+                                   timestamp)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.protocol_buffer
+@file mi/core/instrument/protocol_buffer.py
+@author Steve Foley
+@brief A bounded byte buffer for the line and prompt buffers of a command
+response protocol.  Data is appended in place instead of building a new
+string for every chunk, and prompt searches only scan the bytes added since
+the last search for the same prompt.
+"""
+
+__author__ = 'Steve Foley'
+__license__ = 'Apache 2.0'
+
+import threading
+
+class ProtocolBuffer(object):
+    """
+    Keep the most recent capacity bytes received from a device.  Offsets are
+    tracked from the first byte ever appended so searches can remember how
+    far they got; dropped bytes stay in the backing bytearray until they use
+    as much space as the live data may, then they are reclaimed in one move.
+
+    The listener thread appends while the command thread searches, so every
+    access to the offsets and the backing bytearray holds the buffer lock.
+    """
+    def __init__(self, capacity, value=''):
+        """
+        @param capacity Maximum number of bytes held, older bytes are dropped
+        @param value Initial contents of the buffer
+        """
+        self.capacity = capacity
+        self._lock = threading.RLock()
+
+        self._data = bytearray()
+        # absolute offset of self._data[0]
+        self._base = 0
+        # absolute offset of the first live byte
+        self._start = 0
+        # absolute offset just past the last byte
+        self._head = 0
+
+        # str copy of the live bytes, built on demand
+        self._value = ''
+
+        # prompt -> (absolute offset to resume the search from, absolute
+        # offset of the last match or -1)
+        self._finds = {}
+        # (regex, start, head) of the last search that did not match
+        self._miss = None
+
+        if value:
+            self.append(value)
+
+    def __len__(self):
+        with self._lock:
+            return self._head - self._start
+
+    def __str__(self):
+        return self.value
+
+    @property
+    def value(self):
+        """
+        The live contents of the buffer as a str.  The copy is cached until
+        the buffer changes.
+        """
+        with self._lock:
+            if self._value is None:
+                self._value = str(self._data[self._start - self._base:])
+            return self._value
+
+    def append(self, data, capacity=None):
+        """
+        Add data to the end of the buffer, dropping the oldest bytes to stay
+        within capacity.
+        @param data The bytes to add
+        @param capacity If given, replaces the capacity of the buffer
+        """
+        with self._lock:
+            if capacity is not None:
+                self.capacity = capacity
+
+            if not data:
+                return
+
+            self._data.extend(data)
+            self._head += len(data)
+            self._value = None
+
+            if self._head - self._start > self.capacity:
+                self._start = self._head - self.capacity
+                self._reclaim()
+
+    def clear(self):
+        """
+        Drop everything in the buffer.
+        """
+        with self._lock:
+            del self._data[:]
+            self._base = self._start = self._head
+            self._value = ''
+
+    def set(self, value):
+        """
+        Replace the contents of the buffer.
+        @param value The new contents
+        """
+        with self._lock:
+            self.clear()
+            self.append(value)
+
+    def find(self, prompt):
+        """
+        Find the first occurrence of a prompt in the buffer.  Only the bytes
+        added since the last find for the same prompt are scanned.
+        @param prompt The str to look for
+        @retval The index of the prompt in value, or -1 if it is not there
+        """
+        with self._lock:
+            (resume, found) = self._finds.get(prompt, (self._start, -1))
+            if found >= self._start:
+                return found - self._start
+
+            # a match that has since been dropped may be followed by another
+            if found >= 0:
+                resume = found + 1
+            resume = max(resume, self._start)
+
+            index = self._data.find(prompt, resume - self._base)
+            if index < 0:
+                self._finds[prompt] = (max(self._head - len(prompt) + 1, self._start), -1)
+                return -1
+
+            found = index + self._base
+            self._finds[prompt] = (found, found)
+            return found - self._start
+
+    def search(self, regex):
+        """
+        Search the buffer with a compiled regular expression.  A regex can
+        match across old and new bytes, so the whole buffer is searched, but
+        not again until the buffer has changed since the last miss.
+        @param regex A compiled regular expression
+        @retval A match object for value, or None
+        """
+        with self._lock:
+            if self._miss == (regex, self._start, self._head):
+                return None
+
+            match = regex.search(self.value)
+            if match is None:
+                self._miss = (regex, self._start, self._head)
+            return match
+
+    def _reclaim(self):
+        """
+        Release dropped bytes once they take as much room as the live data
+        may, so the backing bytearray is moved at most once per capacity
+        bytes appended.  Called with the lock held.
+        """
+        dropped = self._start - self._base
+        if dropped and dropped >= self.capacity:
+            del self._data[:dropped]
+            self._base = self._start
@@ -12,6 +12,8 @@ __author__ = 'Edward Hunter'
 __license__ = 'Apache 2.0'
 
 import re
+import sre_parse
+import sre_constants
 import ntplib
 import time
 import yaml
@@ -27,6 +29,45 @@ from mi.core.log import get_logger ; log = get_logger()
 EGG_PATH = "resource"
 DEFAULT_FILENAME = "strings.yml"
 
+# Compiled regexes and their literal prefixes by (pattern, flags).  Parameter
+# dictionaries are rebuilt for every particle by some parsers, and hold more
+# distinct patterns than the re module caches.
+_compiled_regexes = {}
+
+def regex_literal_prefix(regex):
+    """
+    Find the literal text that every match of a compiled regex starts with, so
+    a search can skip straight to the first place that text appears.
+    @param regex A compiled regex
+    @retval The literal prefix, '' if the regex can start some other way
+    """
+    if regex.flags & re.IGNORECASE:
+        return ''
+    prefix = []
+    for (op, av) in sre_parse.parse(regex.pattern, regex.flags):
+        if op != sre_constants.LITERAL or av > 127:
+            break
+        prefix.append(chr(av))
+    return ''.join(prefix)
+
+def compile_regex(pattern, regex_flags=None):
+    """
+    Compile a parameter regex and find its literal prefix, or return them from
+    the cache if the pattern has been compiled before.
+    @param pattern The regex pattern
+    @param regex_flags Flags that should be passed to the regex, None for none
+    @retval A (compiled regex, literal prefix) tuple
+    @throws TypeError if regex flags are bad
+    """
+    key = (pattern, regex_flags)
+    if key not in _compiled_regexes:
+        if regex_flags == None:
+            regex = re.compile(pattern)
+        else:
+            regex = re.compile(pattern, regex_flags)
+        _compiled_regexes[key] = (regex, regex_literal_prefix(regex))
+    return _compiled_regexes[key]
+
 class ParameterDictType(BaseEnum):
     BOOL = "bool"
     INT = "int"
@@ -280,13 +321,23 @@ class RegexParameter(Parameter):
                            value_description=value_description)
 
         self.pattern = pattern
-        if regex_flags == None:
-            self.regex = re.compile(pattern)
-        else:
-            self.regex = re.compile(pattern, regex_flags)
-            
+        (self.regex, self.prefix) = compile_regex(pattern, regex_flags)
         self.f_getval = f_getval
 
+    def search(self, input):
+        """
+        Search a string for the value regex, starting at the first occurrence
+        of its literal prefix since no match can start before that.
+        @param input The string to search.
+        @retval The match object, None if the regex does not match.
+        """
+        if not self.prefix:
+            return self.regex.search(input)
+        start = input.find(self.prefix)
+        if start == -1:
+            return None
+        return self.regex.search(input, start)
+
     def update(self, input):
         """
         Attempt to update a parameter value. If the input string matches the
@@ -295,9 +346,9 @@ class RegexParameter(Parameter):
         @retval True if an update was successful, False otherwise.
         """
         if not (isinstance(input, str)):
-            match = self.regex.search(str(input))
+            match = self.search(str(input))
         else:
-            match = self.regex.search(input)
+            match = self.search(input)
 
         if match:
             self.value.set_value(self.f_getval(match))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.benchmark_instrument_protocol
+@file mi/core/instrument/test/benchmark_instrument_protocol.py
+@author Steve Foley
+@brief Compare command/response round trip times when the command only
+notices the response on its next poll of the buffers, as it did before
+waiters were notified, and when add_to_buffer wakes the waiting command.
+Drivers keep the default of waiting out the whole wakeup delay, so the
+notified column is the gain a driver sees today. The settled column is what
+a driver would see after opting in to an early wakeup with
+_wakeup_settle_time, which none does yet.
+
+Usage: python -m mi.core.instrument.test.benchmark_instrument_protocol
+"""
+
+__author__ = 'Steve Foley'
+__license__ = 'Apache 2.0'
+
+import time
+from threading import Timer
+
+from mock import Mock
+
+from mi.core.instrument.instrument_protocol import CommandResponseInstrumentProtocol
+from mi.core.instrument.instrument_protocol import WAKEUP_SETTLE_TIME
+
+COMMAND = 'CMD'
+PROMPT = 'S>'
+
+# Simulated instrument turn around time for each command
+RESPONSE_DELAY = .005
+
+# Roughly the number of set commands in an SBE37 startup configuration
+COMMAND_COUNT = 30
+
+
+def build_protocol(notify, settle_time=None):
+    protocol = CommandResponseInstrumentProtocol([PROMPT], '\r\n', lambda event, value=None: None)
+    protocol._add_build_handler(COMMAND, lambda cmd: cmd)
+    protocol._add_response_handler(COMMAND, lambda resp, prompt: resp)
+    protocol._connection = Mock()
+    protocol._connection.send = lambda data: Timer(
+        RESPONSE_DELAY, protocol.add_to_buffer, ["%s\r\n%s" % (data, PROMPT)]).start()
+    protocol._send_wakeup = lambda: protocol._connection.send('')
+    protocol.get_current_state = Mock(return_value='COMMAND')
+
+    if not notify:
+        protocol._notify_buffer_waiters = lambda: None
+    protocol._wakeup_settle_time = settle_time
+
+    return protocol
+
+
+def configure(protocol):
+    starttime = time.time()
+    for i in range(COMMAND_COUNT):
+        protocol._do_cmd_resp(COMMAND, expected_prompt=PROMPT, timeout=5)
+    return time.time() - starttime
+
+
+def run():
+    polled = configure(build_protocol(False))
+    notified = configure(build_protocol(True))
+    settled = configure(build_protocol(True, WAKEUP_SETTLE_TIME))
+
+    print "%10s %12s %14s %9s %13s %9s" % ("commands", "polled sec", "notified sec",
+                                           "speedup", "settled sec", "speedup")
+    print "%10d %12.3f %14.3f %8.2fx %13.3f %8.1fx" % (COMMAND_COUNT, polled, notified,
+                                                      polled / notified, settled,
+                                                      polled / settled)
+
+
+if __name__ == '__main__':
+    run()
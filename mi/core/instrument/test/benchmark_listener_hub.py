@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.benchmark_listener_hub
+@file mi/core/instrument/test/benchmark_listener_hub.py
+@author David Everett
+@brief Compare reading many port agent connections with a listener thread
+each and with one ListenerHub, over local socket pairs.  Reports the threads
+used and the time to deliver every packet.
+
+Usage: python -m mi.core.instrument.test.benchmark_listener_hub
+"""
+
+__author__ = 'David Everett'
+__license__ = 'Apache 2.0'
+
+import socket
+import threading
+import time
+
+from mi.core.instrument.port_agent_client import Listener, ListenerHub, PortAgentPacket
+
+CONNECTIONS = (10, 100, 200)
+
+# Packets sent on each connection
+PACKETS = 200
+
+
+def packet_bytes(data):
+    paPacket = PortAgentPacket(PortAgentPacket.DATA_FROM_INSTRUMENT)
+    paPacket.attach_data(data)
+    paPacket.pack_header()
+    return paPacket.get_header() + paPacket.get_data()
+
+
+def deliver(connections, hub):
+    """
+    Start a listener per connection, send every packet and wait for them.
+    @retval Tuple of (threads while listening, seconds to deliver)
+    """
+    received = []
+    done = threading.Event()
+    total = connections * PACKETS
+
+    def got_data_batch(packets):
+        received.extend(packets)
+        if len(received) >= total:
+            done.set()
+
+    def ignore(*args):
+        pass
+
+    pairs = []
+    listeners = []
+    for i in range(connections):
+        (listener_sock, port_agent_sock) = socket.socketpair()
+        listener_sock.setblocking(0)
+        paListener = Listener(listener_sock, 0, None, 0, 5, ignore, ignore, ignore, ignore, ignore,
+                              got_data_batch, hub)
+        paListener.start()
+        pairs.append((listener_sock, port_agent_sock))
+        listeners.append(paListener)
+    threads = threading.active_count()
+
+    data = packet_bytes('2013-05-15T12:00:00 21.4331, 0.00009, 0.0, 0.0, 0.0\r\n') * PACKETS
+    start = time.time()
+    for (listener_sock, port_agent_sock) in pairs:
+        port_agent_sock.sendall(data)
+    done.wait(60)
+    elapsed = time.time() - start
+
+    for paListener in listeners:
+        paListener.done()
+        paListener.join()
+    for (listener_sock, port_agent_sock) in pairs:
+        listener_sock.close()
+        port_agent_sock.close()
+    return (threads, elapsed)
+
+
+def run():
+    print "%12s %16s %14s %12s %12s" % ("connections", "thread threads", "hub threads",
+                                        "thread s", "hub s")
+    for connections in CONNECTIONS:
+        (thread_count, thread_time) = deliver(connections, None)
+        hub = ListenerHub()
+        hub.start()
+        (hub_count, hub_time) = deliver(connections, hub)
+        hub.done()
+        hub.join()
+        print "%12d %16d %14d %12.3f %12.3f" % (connections, thread_count, hub_count,
+                                                thread_time, hub_time)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.benchmark_pd0_framing
+@file mi/core/instrument/test/benchmark_pd0_framing.py
+@author Roger Unwin
+@brief Compare decoding the depth cell arrays of the PD0 ensembles in the
+adcps_jln resource files with decode_cells and the struct call per depth cell
+it replaced.  The mflm adcp resources hold the compact SIO ensembles, not
+PD0, and are not included.
+
+Usage: python -m mi.core.instrument.test.benchmark_pd0_framing
+"""
+
+__author__ = 'Roger Unwin'
+__license__ = 'Apache 2.0'
+
+import os
+import glob
+import struct
+import timeit
+
+from mi.idk.config import Config
+from mi.core.instrument.pd0_framing import find_ensembles, decode_cells
+from mi.core.instrument.pd0_framing import VELOCITY_CELL, BEAM_BYTE_CELL
+
+RESOURCE_GLOBS = {
+    'adcps_jln': os.path.join('mi', 'dataset', 'driver', 'adcps_jln', '*', 'resource', '*.000'),
+}
+
+VELOCITY_ID = 0x0100
+BEAM_BYTE_IDS = (0x0200, 0x0300, 0x0400)
+
+# Decode each resource set this many times
+REPEAT = 20
+
+
+def cell_sections(pattern):
+    """
+    Find the velocity, correlation, echo intensity and percent good sections
+    of every ensemble in the files matching pattern
+    @retval A list of (section data, number of depth cells) tuples
+    """
+    sections = []
+    for path in glob.glob(os.path.join(Config().base_dir(), pattern)):
+        with open(path, 'rb') as filehandle:
+            data = filehandle.read()
+        for (start, end) in find_ensembles(data):
+            ensemble = data[start:end]
+            num_types = ord(ensemble[5])
+            offsets = [struct.unpack_from('<H', ensemble, 6 + 2 * i)[0] for i in range(num_types)]
+            offsets.append(len(ensemble) - 2)
+            # the number of cells is in the fixed leader, the first data type
+            num_cells = ord(ensemble[offsets[0] + 9])
+            for (section_start, section_end) in zip(offsets, offsets[1:]):
+                section = ensemble[section_start:section_end]
+                if struct.unpack_from('<H', section)[0] in (VELOCITY_ID,) + BEAM_BYTE_IDS:
+                    sections.append((section, num_cells))
+    return sections
+
+
+def struct_decode(sections):
+    for (data, num_cells) in sections:
+        if struct.unpack_from('<H', data)[0] == VELOCITY_ID:
+            (fmt, size) = ('<4h', 8)
+        else:
+            (fmt, size) = ('<4B', 4)
+        columns = ([], [], [], [])
+        offset = 2
+        for row in range(num_cells):
+            for (column, value) in zip(columns, struct.unpack_from(fmt, data, offset)):
+                column.append(value)
+            offset += size
+
+
+def numpy_decode(sections):
+    for (data, num_cells) in sections:
+        if struct.unpack_from('<H', data)[0] == VELOCITY_ID:
+            decode_cells(data, VELOCITY_CELL, num_cells)
+        else:
+            decode_cells(data, BEAM_BYTE_CELL, num_cells)
+
+
+def run():
+    print "%10s %10s %10s %12s %12s %9s" % ("resource", "sections", "cells", "struct s",
+                                            "numpy s", "speedup")
+    for (name, pattern) in sorted(RESOURCE_GLOBS.items()):
+        sections = cell_sections(pattern)
+        cells = sum(num_cells for (data, num_cells) in sections)
+        legacy = timeit.timeit(lambda: struct_decode(sections), number=REPEAT)
+        vectorized = timeit.timeit(lambda: numpy_decode(sections), number=REPEAT)
+        print "%10s %10d %10d %12.4f %12.4f %8.1fx" % (name, len(sections), cells, legacy,
+                                                        vectorized, legacy / vectorized)
+
+
+if __name__ == '__main__':
+    run()
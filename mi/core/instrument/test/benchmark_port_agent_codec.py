@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.benchmark_port_agent_codec
+@file mi/core/instrument/test/benchmark_port_agent_codec.py
+@author David Everett
+@brief Compare the throughput of receiving a port agent packet (unpack the
+header, attach the payload, verify the checksum) using PortAgentPacket and
+the byte at a time implementation it replaced.
+
+Usage: python -m mi.core.instrument.test.benchmark_port_agent_codec
+"""
+
+__author__ = 'David Everett'
+__license__ = 'Apache 2.0'
+
+import os
+import struct
+import timeit
+
+from mi.core.instrument.port_agent_client import PortAgentPacket
+from mi.core.instrument.port_agent_codec import HEADER_SIZE
+from mi.core.instrument.port_agent_codec import OFFSET_P_CHECKSUM_LOW
+from mi.core.instrument.port_agent_codec import OFFSET_P_CHECKSUM_HIGH
+
+# the largest payload that fits the 16 bit packet length is just under 64 KB
+PAYLOAD_SIZES = [16, 1024, 0xffff - HEADER_SIZE]
+
+# Run each case for roughly this many payload bytes
+BYTES_PER_CASE = 8 * 1024 * 1024
+
+
+class LegacyPortAgentPacket():
+    """
+    The header and checksum handling of PortAgentPacket before the codec
+    """
+    def unpack_header(self, header):
+        self.header = header
+        variable_tuple = struct.unpack_from('>BBBBHHII', header)
+        self.type = variable_tuple[3]
+        self.length = int(variable_tuple[4]) - HEADER_SIZE
+        self.recv_checksum = int(variable_tuple[5])
+        self.timestamp = float("%s.%s" % (variable_tuple[6], variable_tuple[7]))
+
+    def attach_data(self, data):
+        self.data = data
+
+    def verify_checksum(self):
+        checksum = 0
+        for i in range(HEADER_SIZE):
+            if i < OFFSET_P_CHECKSUM_LOW or i > OFFSET_P_CHECKSUM_HIGH:
+                checksum ^= struct.unpack_from('B', self.header[i])[0]
+
+        for i in range(self.length):
+            checksum ^= struct.unpack_from('B', self.data[i])[0]
+
+        self.valid = (checksum == self.recv_checksum)
+
+
+def receive(packet_class, header, data):
+    packet = packet_class()
+    packet.unpack_header(header)
+    packet.attach_data(data)
+    packet.verify_checksum()
+
+
+def run():
+    print "%10s %12s %14s %14s %9s" % ("payload", "packets", "legacy MB/s",
+                                      "codec MB/s", "speedup")
+    for size in PAYLOAD_SIZES:
+        data = os.urandom(size)
+        packet = PortAgentPacket()
+        packet.attach_data(data)
+        packet.pack_header()
+        header = packet.get_header()
+
+        count = max(BYTES_PER_CASE / size, 1)
+        legacy = timeit.timeit(lambda: receive(LegacyPortAgentPacket, header, data),
+                               number=max(count / 100, 1)) * 100
+        codec = timeit.timeit(lambda: receive(PortAgentPacket, header, data),
+                              number=count)
+
+        megabytes = float(count * size) / (1024 * 1024)
+        print "%10d %12d %14.2f %14.2f %8.1fx" % (size, count, megabytes / legacy,
+                                                 megabytes / codec, legacy / codec)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.benchmark_zmq_driver_process
+@file mi/core/instrument/test/benchmark_zmq_driver_process.py
+@author Edward Hunter
+@brief Measure how many sample events per second a ZMQ driver process in this
+process publishes to a client over localhost TCP, using the test_events
+command, with each event encoding and with events pickled one per message.
+
+Usage: python -m mi.core.instrument.test.benchmark_zmq_driver_process
+"""
+
+__author__ = 'Edward Hunter'
+__license__ = 'Apache 2.0'
+
+import os
+import json
+import time
+import shutil
+import tempfile
+
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument.zmq_driver_client import ZmqDriverClient
+from mi.core.instrument.zmq_driver_process import ZmqDriverProcess
+
+# Total events, sent this many per test_events command so the publisher
+# high water mark is never reached
+EVENTS = 20000
+EVENTS_PER_COMMAND = 500
+
+ENCODINGS = (('send_pyobj', ()),
+             ('pickle', ('pickle',)),
+             ('sample', ('sample',)))
+
+
+def sample_event():
+    """
+    A sample event holding a JSON encoded particle like a driver sends
+    """
+    values = [{'value_id': 'value_%d' % i, 'value': i * 1.5} for i in range(10)]
+    particle = {'stream_name': 'benchmark_sample', 'pkt_format_id': 'JSON_Data', 'pkt_version': 1,
+                'port_timestamp': 3590000000.0, 'driver_timestamp': 3590000001.0,
+                'preferred_timestamp': 'port_timestamp', 'quality_flag': 'ok', 'values': values}
+    return {'type': DriverAsyncEvent.SAMPLE, 'value': json.dumps(particle), 'time': time.time()}
+
+
+def events_per_second(workdir, event_codecs):
+    driver_process = ZmqDriverProcess(None, None, os.path.join(workdir, 'cmd_port'),
+                                      os.path.join(workdir, 'evt_port'), None)
+    driver_process.start_messaging()
+    events = []
+    driver_client = ZmqDriverClient('localhost', driver_process.cmd_port, driver_process.evt_port)
+    driver_client.start_messaging(events.append, event_codecs=event_codecs)
+
+    # wait for the subscription to reach the driver process
+    while not events:
+        driver_client.cmd_dvr('test_events', events=['subscribed'])
+        time.sleep(.01)
+    del events[:]
+
+    batch = [sample_event()] * EVENTS_PER_COMMAND
+    start = time.time()
+    for sent in range(EVENTS_PER_COMMAND, EVENTS + 1, EVENTS_PER_COMMAND):
+        driver_client.cmd_dvr('test_events', events=batch)
+        while len(events) < sent:
+            time.sleep(.0005)
+    elapsed = time.time() - start
+
+    driver_client.done()
+    driver_process.cmd_thread.join()
+    driver_process.evt_thread.join()
+    return EVENTS / elapsed
+
+
+def run():
+    workdir = tempfile.mkdtemp()
+    try:
+        print "%12s %12s" % ("encoding", "events/s")
+        for (name, event_codecs) in ENCODINGS:
+            print "%12s %12.0f" % (name, events_per_second(workdir, event_codecs))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -19,7 +19,8 @@ from pyon.util.unit_test import IonUnitTestCase
 from ooi.logging import log
 
 from mi.core.exceptions import SampleException
-from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import Chunker, StringChunker, BinaryChunker, ByteArrayChunker, RegexSieve
+from mi.core.instrument.chunker import uncapture_pattern
 
 @attr('UNIT', group='mi')
 class UnitTestStringChunker(MiUnitTestCase):
@@ -42,6 +43,9 @@ class UnitTestStringChunker(MiUnitTestCase):
     TIMESTAMP_1 = 3569168821.102485
     TIMESTAMP_2 = 3569168822.202485
     TIMESTAMP_3 = 3569168823.302485
+
+    # The chunker under test, subclasses run the same tests on other chunkers
+    chunker_class = StringChunker
     
     @staticmethod
     def sieve_function(raw_data):
@@ -61,7 +65,7 @@ class UnitTestStringChunker(MiUnitTestCase):
     
     def setUp(self):
         """ Setup a chunker for use in tests """
-        self._chunker = StringChunker(UnitTestStringChunker.sieve_function)
+        self._chunker = self.chunker_class(UnitTestStringChunker.sieve_function)
         
     def _display_chunk_list(self, data, chunk_list):
         """ Display the data as viewed through the chunk list """
@@ -90,7 +94,7 @@ class UnitTestStringChunker(MiUnitTestCase):
         pattern = r'SATPAR(?P<sernum>\d{4}),(?P<timer>\d{1,7}.\d\d),(?P<counts>\d{10}),(?P<checksum>\d{1,3})'
         regex = re.compile(pattern)
 
-        self._chunker = StringChunker(partial(self._chunker.regex_sieve_function, regex_list=[regex]))
+        self._chunker = self.chunker_class(partial(self._chunker.regex_sieve_function, regex_list=[regex]))
         
         self.assertEquals([(0,31)],
                           self._chunker.regex_sieve_function(self.SAMPLE_1, [regex]))
@@ -99,7 +103,73 @@ class UnitTestStringChunker(MiUnitTestCase):
         self.assertEquals([(0,31), (33, 64)],
                           self._chunker.regex_sieve_function(self.MULTI_SAMPLE_1, [regex]))
 
-        
+        # every regex scans the data, so overlapping blocks are all returned
+        prefix = re.compile(r'SATPAR\d{4}')
+        self.assertEquals([(0,31), (0, 10)],
+                          self._chunker.regex_sieve_function(self.SAMPLE_1, [regex, prefix]))
+
+    def test_regex_sieve_class(self):
+        """
+        Verify the combined sieve finds blocks for several regexes in one
+        pass, tags them with their particle class and can classify chunks.
+        """
+        sample = re.compile(r'SATPAR(?P<sernum>\d{4}),(?P<timer>\d{1,7}.\d\d),(?P<counts>\d{10}),(?P<checksum>\d{1,3})')
+        status = re.compile(r'STATUS (?P<sernum>\d{4})\r\n')
+        sieve = RegexSieve([(sample, 'sample'), (status, 'status')])
+        self.assertIsNotNone(sieve._combined)
+
+        data = "Foo" + self.SAMPLE_1 + "STATUS 0229\r\n" + self.SAMPLE_2
+        self.assertEquals(sieve.sieve(data), [(3, 34, 'sample'),
+                                              (34, 47, 'status'),
+                                              (47, 78, 'sample')])
+        self.assertEquals(sieve(data), [(3, 34), (34, 47), (47, 78)])
+        self.assertEquals(sieve(self.FRAGMENT_1), [])
+
+        self.assertEquals(sieve.classify(self.SAMPLE_2), 'sample')
+        self.assertEquals(sieve.classify("STATUS 0229\r\n"), 'status')
+        self.assertEquals(sieve.classify("Foo"), None)
+
+        # the first regex in the list wins where both match
+        greedy = re.compile(r'SATPAR\d{4}')
+        sieve = RegexSieve([(greedy, 'short'), (sample, 'sample')])
+        self.assertEquals(sieve.sieve(self.SAMPLE_1), [(0, 10, 'short')])
+
+        # regexes with back references or different flags are searched one
+        # at a time
+        repeat = re.compile(r'([a-z])\1\1')
+        sieve = RegexSieve([(sample, 'sample'), (repeat, 'repeat')])
+        self.assertIsNone(sieve._combined)
+        self.assertEquals(sieve.sieve("Fooo" + self.SAMPLE_2),
+                          [(1, 4, 'repeat'), (4, 35, 'sample')])
+        self.assertEquals(sieve.classify("ooo"), 'repeat')
+
+        sieve = RegexSieve([(sample, 'sample'), (re.compile(r'foo', re.I), 'foo')])
+        self.assertIsNone(sieve._combined)
+        self.assertEquals(sieve.sieve("FOO" + self.SAMPLE_1), [(0, 3, 'foo'), (3, 34, 'sample')])
+
+    def test_regex_sieve_verbose(self):
+        """
+        Verify verbose regexes ending in a comment can be combined
+        """
+        sample = re.compile(r'''
+            SATPAR(?P<sernum>\d{4}),   # serial number
+            (?P<timer>\d{1,7}.\d\d),   # timer''', re.VERBOSE)
+        status = re.compile(r'''
+            STATUS\ (?P<sernum>\d{4})  # serial number''', re.VERBOSE)
+        sieve = RegexSieve([(sample, 'sample'), (status, 'status')])
+        self.assertIsNotNone(sieve._combined)
+        self.assertEquals(sieve.sieve("SATPAR0229,10.01,STATUS 0229"),
+                          [(0, 17, 'sample'), (17, 28, 'status')])
+
+    def test_uncapture_pattern(self):
+        """
+        Verify groups are made non capturing, leaving escaped parentheses,
+        sets and extensions alone
+        """
+        self.assertEquals(uncapture_pattern(r'(?P<a>\d)(b|c)(?:d)(?=e)\(f\)[(]'),
+                          r'(?:\d)(?:b|c)(?:d)(?=e)\(f\)[(]')
+        self.assertEquals(uncapture_pattern(r'[]()](x)[^]()](y)'), r'[]()](?:x)[^]()](?:y)')
+
     def test_generate_data_lists(self):
         sample_string = "Foo%sBar%sBat" % (self.SAMPLE_1, self.SAMPLE_2)
         self._chunker.add_chunk(sample_string, self.TIMESTAMP_1)
@@ -308,7 +378,7 @@ class UnitTestStringChunker(MiUnitTestCase):
         def funky_sieve(data):
             return [(3,6),(0,3)]
 
-        self._chunker = StringChunker(funky_sieve)
+        self._chunker = self.chunker_class(funky_sieve)
         self._chunker.add_chunk("BarFoo", self.TIMESTAMP_1)
         (time, result) = self._chunker.get_next_data()
         self.assertEquals(result, "Bar")
@@ -327,10 +397,348 @@ class UnitTestStringChunker(MiUnitTestCase):
         def overlap_sieve(data):
             return [(0,3),(2,6)]
 
-        self._chunker = StringChunker(overlap_sieve)
+        self._chunker = self.chunker_class(overlap_sieve)
         self.assertRaises(SampleException,
                           self._chunker.add_chunk, "foobar", self.TIMESTAMP_1)
 
+    def test_add_chunks(self):
+        """
+        Add several chunks in one call and verify each keeps its timestamp
+        """
+        self._chunker.add_chunks([("Foo", self.TIMESTAMP_1),
+                                  (self.FRAGMENT_1, self.TIMESTAMP_2),
+                                  (self.FRAGMENT_2, self.TIMESTAMP_3),
+                                  (self.SAMPLE_2, self.TIMESTAMP_3)])
+        (time, result) = self._chunker.get_next_non_data(clean=False)
+        self.assertEquals(result, "Foo")
+        self.assertEquals(time, self.TIMESTAMP_1)
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, self.FRAGMENT_SAMPLE)
+        self.assertEquals(time, self.TIMESTAMP_2)
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, self.SAMPLE_2)
+        self.assertEquals(time, self.TIMESTAMP_3)
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, None)
+
+        self._chunker.add_chunks([])
+        self.assertEquals(self._chunker.get_next_raw(), (None, None))
+
+    def test_resumable_sieve(self):
+        """
+        Verify the resumable regex sieve reports where to continue from
+        """
+        regex = re.compile(r'SATPAR(?P<sernum>\d{4}),(?P<timer>\d{1,7}.\d\d),(?P<counts>\d{10}),(?P<checksum>\d{1,3})')
+        sieve = partial(Chunker.resumable_regex_sieve_function,
+                        regex_list=[regex], start_markers=['SATPAR'])
+
+        result = sieve(self.SAMPLE_1)
+        self.assertEquals(result, [(0, 31)])
+        self.assertEquals(result.resume_index, 31)
+
+        # nothing but noise, nothing to come back to
+        self.assertEquals(sieve("Foo").resume_index, 3)
+
+        # resume at the start of a fragment
+        result = sieve("Foo" + self.FRAGMENT_1)
+        self.assertEquals(result, [])
+        self.assertEquals(result.resume_index, 3)
+
+        # resume at the start of a marker split over the end of the data
+        result = sieve(self.SAMPLE_1 + "FooSAT")
+        self.assertEquals(result, [(0, 31)])
+        self.assertEquals(result.resume_index, 34)
+        self.assertEquals(result.min_end, 40)
+
+        # with the block length known the fragment says how long it will be
+        sieve = partial(Chunker.resumable_regex_sieve_function,
+                        regex_list=[regex], start_markers=['SATPAR'],
+                        block_length=len(self.SAMPLE_1))
+        result = sieve("Foo" + self.FRAGMENT_1)
+        self.assertEquals(result.resume_index, 3)
+        self.assertEquals(result.min_end, 3 + len(self.SAMPLE_1))
+
+        # a marker with a whole block behind it that doesn't match is noise
+        result = sieve("SATPAR" + "x" * 30 + self.FRAGMENT_1)
+        self.assertEquals(result, [])
+        self.assertEquals(result.resume_index, 36)
+        self.assertEquals(result.min_end, 36 + len(self.SAMPLE_1))
+
+    def test_find_marker(self):
+        """
+        Verify markers are found in strings, bytearrays and lists, including
+        the front of a marker at the end of the data
+        """
+        for kind in (str, bytearray, list):
+            data = kind("FooSATPARBarSAT")
+            marker = kind("SATPAR")
+            self.assertEquals(Chunker.find_marker(data, marker), 3)
+            self.assertEquals(Chunker.find_marker(data, marker, 4), 12)
+            self.assertEquals(Chunker.find_marker(data, marker, 13), -1)
+            self.assertEquals(Chunker.find_marker(kind("Foo"), marker), -1)
+
+    def test_resumable_min_end(self):
+        """
+        Feed a chunker a byte at a time and verify a fragment of known length
+        is not sieved again until it can be complete.
+        """
+        regex = re.compile(r'SATPAR(?P<sernum>\d{4}),(?P<timer>\d{1,7}.\d\d),(?P<counts>\d{10}),(?P<checksum>\d{1,3})')
+        sieved = []
+
+        def sieve(raw_data):
+            sieved.append(raw_data)
+            return Chunker.resumable_regex_sieve_function(raw_data, [regex],
+                                                          ['SATPAR'],
+                                                          len(self.SAMPLE_1))
+
+        self._chunker = self.chunker_class(sieve)
+        data = "Foo" + self.SAMPLE_1 + self.SAMPLE_2
+        for char in data:
+            self._chunker.add_chunk(char, self.TIMESTAMP_1)
+
+        # sieved for each byte of noise, then for each sample once at the
+        # first byte of the marker, once at the whole marker and once when
+        # the whole block was there
+        self.assertEquals(sieved[-1], self.SAMPLE_2)
+        self.assertEquals(len(sieved), 3 + 3 + 3)
+
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, self.SAMPLE_1)
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, self.SAMPLE_2)
+
+        # consuming the waiting fragment in part means sieving it again
+        del sieved[:]
+        self._chunker.add_chunk(self.FRAGMENT_1, self.TIMESTAMP_2)
+        self._chunker.add_chunk("Foo", self.TIMESTAMP_2)
+        self.assertEquals(len(sieved), 1)
+        self._chunker.get_next_raw()
+        self._chunker.add_chunk(self.SAMPLE_3, self.TIMESTAMP_3)
+        self.assertEquals(len(sieved), 2)
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, self.SAMPLE_3)
+
+    def test_resumable_chunker(self):
+        """
+        Feed a resumable chunker one byte at a time and verify the sieve
+        never looks at data in front of a waiting fragment again.
+        """
+        regex = re.compile(r'SATPAR(?P<sernum>\d{4}),(?P<timer>\d{1,7}.\d\d),(?P<counts>\d{10}),(?P<checksum>\d{1,3})\r\n')
+        sieved = []
+
+        def sieve(raw_data):
+            sieved.append(raw_data)
+            return Chunker.resumable_regex_sieve_function(raw_data, [regex],
+                                                          ['SATPAR'])
+
+        self._chunker = self.chunker_class(sieve)
+        sample_1 = self.SAMPLE_1 + "\r\n"
+        sample_2 = self.SAMPLE_2 + "\r\n"
+        data = "Foo" + sample_1 + "Bar" + sample_2
+        for char in data:
+            self._chunker.add_chunk(char, self.TIMESTAMP_1)
+
+        # The noise in front of the fragments was never sieved twice
+        for raw_data in sieved:
+            self.assertFalse(raw_data.startswith("Fo"))
+            self.assertFalse(raw_data.startswith("Ba"))
+
+        (time, result) = self._chunker.get_next_non_data()
+        self.assertEquals(result, "Foo")
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, sample_1)
+        (time, result) = self._chunker.get_next_non_data()
+        self.assertEquals(result, "Bar")
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, sample_2)
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, None)
+
+        # the cursor follows the buffer
+        self._chunker.add_chunk(self.FRAGMENT_1, self.TIMESTAMP_2)
+        self._chunker.add_chunk(self.FRAGMENT_2 + "\r\n", self.TIMESTAMP_3)
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, self.FRAGMENT_SAMPLE + "\r\n")
+
+        # noise behind a sample the sieve has vouched for is non-data
+        self._chunker.add_chunk(sample_1 + "Foo", self.TIMESTAMP_1)
+        self._chunker.add_chunk(sample_2, self.TIMESTAMP_2)
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, sample_1)
+        (time, result) = self._chunker.get_next_non_data()
+        self.assertEquals(result, "Foo")
+        self.assertEquals(time, self.TIMESTAMP_1)
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, sample_2)
+        self.assertEquals(time, self.TIMESTAMP_2)
+
+@attr('UNIT', group='mi')
+class UnitTestByteArrayChunker(UnitTestStringChunker):
+    """
+    Run the string chunker tests against the bytearray backed chunker
+    """
+    chunker_class = ByteArrayChunker
+
+    def test_generate_data_lists(self):
+        """
+        The bytearray chunker sieves in add_chunk, verify the lists it
+        builds from the same data.
+        """
+        sample_string = "Foo%sBar%sBat" % (self.SAMPLE_1, self.SAMPLE_2)
+        self._chunker.add_chunk(sample_string, self.TIMESTAMP_1)
+
+        self.assertEquals(self._chunker.data_chunk_list,
+                          [(3, 34, self.TIMESTAMP_1),
+                           (37, 68, self.TIMESTAMP_1)])
+        self.assertEquals(self._chunker.nondata_chunk_list,
+                          [(0, 3, self.TIMESTAMP_1),
+                           (34, 37, self.TIMESTAMP_1)])
+        self.assertEquals(self._chunker.buffer, sample_string)
+
+    def test_clean_chunk_list(self):
+        """
+        Verify consuming data rebases the chunk lists
+        """
+        self._chunker.add_chunk("Foo", self.TIMESTAMP_1)
+        self._chunker.add_chunk(self.SAMPLE_1, self.TIMESTAMP_2)
+        self._chunker.add_chunk("Bar" + self.SAMPLE_2, self.TIMESTAMP_3)
+
+        (time, result, start, end) = self._chunker.get_next_data_with_index()
+        self.assertEquals(result, self.SAMPLE_1)
+        self.assertEquals((start, end), (3, 34))
+
+        self.assertEquals(self._chunker.buffer, "Bar" + self.SAMPLE_2)
+        self.assertEquals(self._chunker.raw_chunk_list,
+                          [(0, 34, self.TIMESTAMP_3)])
+        self.assertEquals(self._chunker.data_chunk_list,
+                          [(3, 34, self.TIMESTAMP_3)])
+        self.assertEquals(self._chunker.nondata_chunk_list,
+                          [(0, 3, self.TIMESTAMP_3)])
+
+    def test_reclaim_buffer(self):
+        """
+        Stream many samples through the chunker and verify the consumed part
+        of the bytearray is given back.
+        """
+        for i in range(1000):
+            self._chunker.add_chunk(self.SAMPLE_1 + "\r\n", self.TIMESTAMP_1)
+            (time, result) = self._chunker.get_next_data()
+            self.assertEquals(result, self.SAMPLE_1)
+            (time, result) = self._chunker.get_next_non_data()
+            self.assertEquals(result, None)
+
+        self.assertLessEqual(len(self._chunker._data), 2 * (len(self.SAMPLE_1) + 2))
+
+    def test_clean_all_chunks(self):
+        """
+        Verify clean_all_chunks empties the chunker
+        """
+        self._chunker.add_chunk("Foo" + self.SAMPLE_1 + self.FRAGMENT_1,
+                                self.TIMESTAMP_1)
+        self._chunker.clean_all_chunks()
+        self.assertEquals(self._chunker.buffer, "")
+        self.assertEquals(self._chunker.get_next_data(), (None, None))
+        self.assertEquals(self._chunker.get_next_non_data(), (None, None))
+        self.assertEquals(self._chunker.get_next_raw(), (None, None))
+
+        self._chunker.add_chunk(self.SAMPLE_2, self.TIMESTAMP_2)
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, self.SAMPLE_2)
+        self.assertEquals(time, self.TIMESTAMP_2)
+
+    def test_buffer_sieve(self):
+        """
+        Verify a chunker passing the sieve a buffer over its data finds the
+        same blocks as one passing it a string, fed a byte at a time, with a
+        plain and a resumable sieve.
+        """
+        regex = re.compile(r'SATPAR(?P<sernum>\d{4}),(?P<timer>\d{1,7}.\d\d),(?P<counts>\d{10}),(?P<checksum>\d{1,3})\r\n')
+        sample_1 = self.SAMPLE_1 + "\r\n"
+        sample_2 = self.SAMPLE_2 + "\r\n"
+        data = "Foo" + sample_1 + "Bar" + sample_2 + "SATP"
+        self.assertEquals(Chunker.find_marker(buffer(data), 'SATPAR', 4), data.index(sample_2))
+        self.assertEquals(Chunker.find_marker(buffer(data), 'SATPAR', data.index(sample_2) + 1),
+                          len(data) - 4)
+
+        for sieve in (partial(Chunker.regex_sieve_function, regex_list=[regex]),
+                      partial(Chunker.resumable_regex_sieve_function, regex_list=[regex],
+                              start_markers=['SATPAR'], block_length=len(sample_1))):
+            sieved_types = set()
+            def typed_sieve(raw_data):
+                sieved_types.add(type(raw_data))
+                return sieve(raw_data)
+
+            self._chunker = ByteArrayChunker(typed_sieve, buffer_sieve=True)
+            string_chunker = ByteArrayChunker(sieve)
+            for char in data:
+                self._chunker.add_chunk(char, self.TIMESTAMP_1)
+                string_chunker.add_chunk(char, self.TIMESTAMP_1)
+            self.assertEquals(sieved_types, set([buffer]))
+
+            for expected in (sample_1, sample_2, None):
+                (time, result) = self._chunker.get_next_data()
+                self.assertEquals(result, expected)
+                self.assertEquals(string_chunker.get_next_data(), (time, result))
+            self.assertEquals(self._chunker.get_next_non_data(),
+                              string_chunker.get_next_non_data())
+
+
+@attr('UNIT', group='mi')
+class UnitTestResumableBinaryChunker(MiUnitTestCase):
+    """
+    Verify a resumable sieve works on the list buffer of the binary chunker
+    """
+    SYNC = [0xa5, 0x5a]
+    BLOCK_LENGTH = 6
+
+    @staticmethod
+    def sieve_function(raw_data):
+        """
+        Frame fixed length blocks that start with the sync bytes
+        """
+        return_list = []
+        index = Chunker.find_marker(raw_data, UnitTestResumableBinaryChunker.SYNC)
+        while 0 <= index <= len(raw_data) - UnitTestResumableBinaryChunker.BLOCK_LENGTH:
+            end = index + UnitTestResumableBinaryChunker.BLOCK_LENGTH
+            return_list.append((index, end))
+            index = Chunker.find_marker(raw_data, UnitTestResumableBinaryChunker.SYNC, end)
+
+        if return_list:
+            start = return_list[-1][1]
+        else:
+            start = 0
+        return Chunker.resume_at_marker(return_list, raw_data, start,
+                                        [UnitTestResumableBinaryChunker.SYNC],
+                                        UnitTestResumableBinaryChunker.BLOCK_LENGTH)
+
+    def test_resumable(self):
+        """
+        Add blocks a byte at a time and get them out whole
+        """
+        sieved = []
+
+        def sieve(raw_data):
+            sieved.append(list(raw_data))
+            return self.sieve_function(raw_data)
+
+        chunker = BinaryChunker(sieve)
+        block_1 = self.SYNC + [1, 2, 3, 4]
+        block_2 = self.SYNC + [5, 6, 7, 8]
+        for byte in [0] + block_1 + block_2:
+            chunker.add_chunk([byte], 3569168821.102485)
+
+        # noise, two for each sync and one for each whole block
+        self.assertEquals(len(sieved), 1 + 2 * 3)
+
+        (time, result) = chunker.get_next_non_data()
+        self.assertEquals(result, [0])
+        (time, result) = chunker.get_next_data()
+        self.assertEquals(result, block_1)
+        (time, result) = chunker.get_next_data()
+        self.assertEquals(result, block_2)
+        (time, result) = chunker.get_next_data()
+        self.assertEquals(result, None)
+
 @unittest.skip("Write this when a binary chunker is needed")
 @attr('UNIT', group='mi')
 class UnitTestBinaryChunker(MiUnitTestCase):
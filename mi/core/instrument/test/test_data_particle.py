@@ -12,10 +12,13 @@ __license__ = 'Apache 2.0'
 
 
 import json
+import array
 import base64
 import time
 import ntplib
+import numpy
 
+from mock import Mock
 from nose.plugins.attrib import attr
 from mi.core.unit_test import MiUnitTestCase
 
@@ -23,6 +26,7 @@ from mi.core.log import get_logger ; log = get_logger()
 from mi.core.exceptions import SampleException, ReadOnlyException, NotImplementedException, InstrumentParameterException
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey, DataParticleValue
 from mi.core.instrument.data_particle import RawDataParticle, CommonDataParticleType
+from mi.core.instrument.data_particle import ParticleBatch
 from mi.core.instrument.port_agent_client import PortAgentPacket
 
 TEST_PARTICLE_VERSION = 1
@@ -147,6 +151,32 @@ class TestUnitDataParticle(MiUnitTestCase):
         standard = json.dumps(self.sample_parsed_particle, sort_keys=True)
         self.assertEqual(parsed_result, standard)
 
+    def test_generate_dict_cached(self):
+        """
+        Test the parsed values are built once and rebuilt after the internal
+        timestamp changes
+        """
+        test_particle = self.TestDataParticle(self.sample_raw_data,
+            preferred_timestamp=DataParticleKey.PORT_TIMESTAMP)
+        test_particle._build_parsed_values = Mock(wraps=test_particle._build_parsed_values)
+
+        dict_result = test_particle.generate_dict()
+        self.assertIs(test_particle.generate_dict(), dict_result)
+        self.assertEqual(json.loads(test_particle.generate()), dict_result)
+        self.assertEqual(test_particle._build_parsed_values.call_count, 1)
+        self.assertNotIn(DataParticleKey.INTERNAL_TIMESTAMP, dict_result)
+
+        test_particle.set_internal_timestamp(self.sample_internal_timestamp)
+        dict_result = test_particle.generate_dict()
+        self.assertEqual(test_particle._build_parsed_values.call_count, 2)
+        self.assertEqual(dict_result[DataParticleKey.INTERNAL_TIMESTAMP],
+                         self.sample_internal_timestamp)
+
+        test_particle.set_value(DataParticleKey.INTERNAL_TIMESTAMP,
+                                self.sample_internal_timestamp + 200)
+        self.assertEqual(test_particle.generate_dict()[DataParticleKey.INTERNAL_TIMESTAMP],
+                         self.sample_internal_timestamp + 200)
+
     def test_new_sequence_flag(self):
         """
         Verify that we can set the new sequence flag
@@ -283,3 +313,56 @@ class TestUnitDataParticle(MiUnitTestCase):
 
         with self.assertRaises(NotImplementedException):
             particle.data_particle_type()
+
+    def test_particle_batch(self):
+        """
+        Test a batch expands to the same particles as the equivalent
+        DataParticles
+        """
+        batch = ParticleBatch(TEST_PARTICLE_TYPE,
+                              [("temp", numpy.array([23.45, 24.5])),
+                               ("cond", array.array('i', [15, 16])),
+                               ("depth", ["305.16", "306.1"])],
+                              port_timestamp=self.sample_port_timestamp,
+                              internal_timestamps=numpy.array([self.sample_internal_timestamp,
+                                                               self.sample_internal_timestamp + 1]),
+                              preferred_timestamp=DataParticleKey.INTERNAL_TIMESTAMP,
+                              new_sequence=True)
+        self.assertEqual(len(batch), 2)
+        self.assertEqual(list(batch.column("cond")), [15, 16])
+        self.assertRaises(NotImplementedException, batch.column, "bad_key")
+
+        particle = batch[-1]
+        self.assertIsInstance(particle, DataParticle)
+        self.assertEqual(particle.data_particle_type(), TEST_PARTICLE_TYPE)
+        self.assertEqual(particle.get_value(DataParticleKey.INTERNAL_TIMESTAMP),
+                         self.sample_internal_timestamp + 1)
+
+        parsed = json.loads(particle.generate())
+        self.assertEqual(parsed, {
+            DataParticleKey.PKT_FORMAT_ID: DataParticleValue.JSON_DATA,
+            DataParticleKey.PKT_VERSION: TEST_PARTICLE_VERSION,
+            DataParticleKey.STREAM_NAME: TEST_PARTICLE_TYPE,
+            DataParticleKey.PORT_TIMESTAMP: self.sample_port_timestamp,
+            DataParticleKey.INTERNAL_TIMESTAMP: self.sample_internal_timestamp + 1,
+            DataParticleKey.DRIVER_TIMESTAMP: batch.driver_timestamp,
+            DataParticleKey.PREFERRED_TIMESTAMP: DataParticleKey.INTERNAL_TIMESTAMP,
+            DataParticleKey.QUALITY_FLAG: DataParticleValue.OK,
+            DataParticleKey.NEW_SEQUENCE: False,
+            DataParticleKey.VALUES: [
+                {DataParticleKey.VALUE_ID: "temp", DataParticleKey.VALUE: 24.5},
+                {DataParticleKey.VALUE_ID: "cond", DataParticleKey.VALUE: 16},
+                {DataParticleKey.VALUE_ID: "depth", DataParticleKey.VALUE: "306.1"}]})
+
+        dicts = batch.generate_dicts()
+        self.assertTrue(dicts[0][DataParticleKey.NEW_SEQUENCE])
+        self.assertEqual(dicts[1], particle.generate_dict())
+        self.assertIs(type(dicts[0][DataParticleKey.VALUES][0][DataParticleKey.VALUE]), float)
+
+        tail = batch[1:]
+        self.assertEqual(len(tail), 1)
+        self.assertEqual(tail.generate_dicts(), [particle.generate_dict()])
+
+        self.assertRaises(IndexError, batch.__getitem__, 2)
+        self.assertRaises(SampleException, ParticleBatch, TEST_PARTICLE_TYPE,
+                          [("temp", [1, 2]), ("cond", [1])])
@@ -162,6 +162,25 @@ class TestUnitInstrumentDriver(MiUnitTestCase):
         self.assertEquals(running_config["foo"], 10)
         self.assertEquals(running_config["bar"], 15)        
         
+    def test_batch_data(self):
+        """
+        Verify the port agent client only hands over data in batches when
+        the comms config asks for it
+        """
+        config = {'addr': 'localhost', 'port': 4001}
+        for batch_data in (False, True):
+            config['batch_data'] = batch_data
+            self.driver._connection = self.driver._build_connection(config)
+            self.assertEquals(self.driver._connection.batch_data, batch_data)
+
+            self.driver._connection.init_comms = Mock()
+            self.driver._build_protocol = Mock()
+            self.driver._protocol = Mock()
+            self.driver._handler_disconnected_connect()
+
+            kwargs = self.driver._connection.init_comms.call_args[1]
+            self.assertEquals('user_callback_data_batch' in kwargs, batch_data)
+
     def test_apply_startup_params(self):
         """
         Test to see that calling a driver's apply_startup_params successfully
@@ -14,6 +14,8 @@ import re
 import time
 import ntplib
 import datetime
+from functools import partial
+from threading import Timer
 from mock import Mock
 from nose.plugins.attrib import attr
 from mi.core.log import get_logger ; log = get_logger()
@@ -22,11 +24,14 @@ from mi.core.instrument.instrument_driver import DriverParameter
 from mi.core.instrument.instrument_protocol import InstrumentProtocol
 from mi.core.instrument.instrument_protocol import MenuInstrumentProtocol
 from mi.core.instrument.instrument_protocol import CommandResponseInstrumentProtocol
+from mi.core.instrument.instrument_protocol import WAKEUP_SETTLE_TIME
 from mi.core.instrument.protocol_param_dict import ParameterDictVisibility
 from mi.core.instrument.instrument_driver import ConfigMetadataKey
 from mi.instrument.satlantic.par_ser_600m.driver import SAMPLE_REGEX
 from mi.instrument.satlantic.par_ser_600m.driver import SatlanticPARDataParticle
 
+from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.port_agent_client import PortAgentPacket
 from mi.core.instrument.protocol_cmd_dict import Command, CommandArgument
 from mi.core.instrument.driver_dict import DriverDictKey
 from mi.core.driver_scheduler import DriverScheduler
@@ -608,6 +613,61 @@ class TestUnitCommandInstrumentProtocol(MiUnitTestCase):
                           self.protocol._do_cmd_resp,
                           self.TestEvent.TEST, expected_prompt=">", response_regex=regex1)
 
+    def test_got_data_batch(self):
+        """
+        Verify a batch of packets is chunked with each packet's timestamp
+        and reaches the line buffer.
+        """
+        chunks = []
+        self.protocol._chunker = StringChunker(partial(StringChunker.regex_sieve_function,
+                                                       regex_list=[re.compile(r'sample \d\r\n')]))
+        self.protocol._got_chunk = lambda chunk, timestamp: chunks.append((chunk, timestamp))
+
+        packets = []
+        for (data, timestamp) in [("sam", 1.0), ("ple 1\r\nsample 2", 2.0), ("\r\n", 3.0)]:
+            packet = PortAgentPacket(PortAgentPacket.DATA_FROM_INSTRUMENT)
+            packet.attach_data(data)
+            packet.pack_header()
+            packet.attach_timestamp(timestamp)
+            packets.append(packet)
+
+        self.protocol.got_data_batch(packets)
+        self.assertEqual(chunks, [("sample 1\r\n", 1.0), ("sample 2\r\n", 2.0)])
+        self.assertTrue(self.protocol._linebuf.endswith("sample 1\r\nsample 2\r\n"))
+
+    def test_response_wakes_waiter(self):
+        """
+        Verify a response arriving from another thread wakes _do_cmd_resp
+        as soon as it is added to the buffer rather than on the next poll.
+        """
+        def respond(data):
+            Timer(.01, self.protocol.add_to_buffer, ["%s >->" % data]).start()
+        self.protocol._connection.send = respond
+        self.protocol._wakeup_settle_time = WAKEUP_SETTLE_TIME
+
+        for i in range(10):
+            starttime = time.time()
+            result = self.protocol._do_cmd_resp(self.TestEvent.TEST, expected_prompt=">-", timeout=5)
+            self.assertEqual(result, self._parse_test_response(self._build_simple_command(None)+" >-", ">-"))
+            self.assertLess(time.time() - starttime, .09)
+
+    def test_wakeup(self):
+        """
+        Verify _wakeup waits out the delay after a prompt unless the caller
+        passes a settle time.
+        """
+        starttime = time.time()
+        self.assertEqual(self.protocol._wakeup(5, delay=.3), ">")
+        self.assertGreaterEqual(time.time() - starttime, .3)
+
+        starttime = time.time()
+        self.assertEqual(self.protocol._wakeup(5, delay=.3, settle_time=WAKEUP_SETTLE_TIME), ">")
+        self.assertLess(time.time() - starttime, .2)
+
+        self.protocol._wakeup_settle_time = WAKEUP_SETTLE_TIME
+        starttime = time.time()
+        self.assertEqual(self.protocol._wakeup(5, delay=.3), ">")
+        self.assertLess(time.time() - starttime, .2)
 
 @attr('UNIT', group='mi')
 class TestUnitMenuInstrumentProtocol(MiUnitTestCase):
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_pd0_framing
+@file mi/core/instrument/test/test_pd0_framing.py
+@author Roger Unwin
+@brief Unit tests for the PD0 ensemble framing and checksum
+"""
+
+__author__ = 'Roger Unwin'
+__license__ = 'Apache 2.0'
+
+import os
+import glob
+import struct
+
+from nose.plugins.attrib import attr
+
+from mi.core.unit_test import MiUnitTest
+from mi.idk.config import Config
+from mi.core.instrument.pd0_framing import pd0_checksum, ensemble_checksum, find_ensembles, decode_cells
+from mi.core.instrument.pd0_framing import ensemble_length
+from mi.core.instrument.pd0_framing import PD0_HEADER_MATCHER, VELOCITY_CELL, BEAM_BYTE_CELL
+
+PD0_RESOURCE_GLOB = os.path.join(Config().base_dir(), 'mi', 'dataset', 'driver', '*', '*', 'resource', '*.000')
+
+
+def make_ensemble(body, checksum=None):
+    """
+    Build an ensemble around body, with the correct checksum unless one is given
+    """
+    ensemble = '\x7f\x7f' + struct.pack('<H', len(body) + 4) + body
+    if checksum is None:
+        checksum = sum(bytearray(ensemble)) & 0xffff
+    return ensemble + struct.pack('<H', checksum)
+
+
+def byte_sieve(input_buffer):
+    """
+    The byte at a time sieve the framing replaces
+    """
+    indices_list = []
+    for match in PD0_HEADER_MATCHER.finditer(input_buffer[0: -2]):
+        record_start = match.start()
+        num_bytes = struct.unpack("<H", input_buffer[record_start + 2: record_start + 4])[0]
+        record_end = record_start + num_bytes
+        if record_end <= len(input_buffer[0: -2]):
+            total = 0
+            for i in range(record_start, record_end):
+                total += ord(input_buffer[i])
+            if total & 65535 == struct.unpack("<H", input_buffer[record_end: record_end + 2])[0]:
+                indices_list.append((record_start, record_end + 2))
+    return indices_list
+
+
+@attr('UNIT', group='mi')
+class Pd0FramingUnitTest(MiUnitTest):
+
+    def test_checksum(self):
+        """
+        Verify the checksum wraps at 16 bits for short and long buffers
+        """
+        for length in (0, 1, 63, 64, 65, 1000):
+            data = '\xff' * length
+            self.assertEqual(pd0_checksum(data), (255 * length) & 0xffff)
+
+        data = ''.join(chr(i % 256) for i in range(700))
+        self.assertEqual(pd0_checksum(data, 3, 650), sum(bytearray(data[3:650])) & 0xffff)
+        self.assertEqual(pd0_checksum(bytearray(data), 100), sum(bytearray(data[100:])) & 0xffff)
+
+        ensemble = make_ensemble('\x00\x06' + '\xaa' * 200)
+        self.assertEqual(ensemble_checksum(ensemble), (sum(bytearray(ensemble[:-2])) & 0xffff,) * 2)
+
+    def test_find_ensembles(self):
+        """
+        Verify only whole ensembles with good checksums are found, and headers
+        inside a good ensemble are skipped
+        """
+        good = make_ensemble('\x00\x06' + '\x7f\x7f\x08\x00' + 'x' * 100)
+        bad = make_ensemble('\x00\x06' + 'y' * 100, checksum=0)
+        data = 'junk' + good + bad + good + good[:50]
+
+        start = 4
+        good_indices = [(start, start + len(good)),
+                        (start + len(good) + len(bad), start + 2 * len(good) + len(bad))]
+        self.assertEqual(find_ensembles(data), good_indices)
+
+        # without validation the bad ensemble is framed as well
+        framed = find_ensembles(data, validate=False)
+        self.assertIn((start + len(good), start + len(good) + len(bad)), framed)
+        for indices in good_indices:
+            self.assertIn(indices, framed)
+
+        self.assertEqual(find_ensembles(''), [])
+        self.assertEqual(find_ensembles('\x7f\x7f\x10'), [])
+
+    def test_ensemble_length(self):
+        """
+        Verify the ensemble length is read from the header once it is there
+        """
+        ensemble = make_ensemble('\x00\x06' + 'x' * 100)
+        self.assertEqual(ensemble_length(ensemble), len(ensemble))
+        self.assertEqual(ensemble_length('junk' + ensemble[:4], 4), len(ensemble))
+        self.assertEqual(ensemble_length(ensemble[:3]), None)
+
+    def test_resources(self):
+        """
+        Verify the ensembles found in the PD0 resource files match the byte at
+        a time sieve
+        """
+        paths = glob.glob(PD0_RESOURCE_GLOB)
+        self.assertGreater(len(paths), 0)
+        for path in paths:
+            with open(path, 'rb') as filehandle:
+                data = filehandle.read()
+            self.assertEqual(find_ensembles(data), byte_sieve(data))
+
+    def test_decode_cells(self):
+        """
+        Verify the depth cells decode to the same python values as a struct
+        call per cell
+        """
+        cells = 30
+        data = '\x00\x01' + ''.join(chr((i * 37) % 256) for i in range(cells * 8))
+        for (cell, fmt, size) in ((VELOCITY_CELL, '<4h', 8), (BEAM_BYTE_CELL, '<4B', 4)):
+            expected = [[], [], [], []]
+            for row in range(cells):
+                for (column, value) in zip(expected, struct.unpack_from(fmt, data, 2 + row * size)):
+                    column.append(value)
+
+            decoded = decode_cells(data, cell, cells)
+            self.assertEqual(decoded, expected)
+            for column in decoded:
+                for value in column:
+                    self.assertIsInstance(value, int)
+
+        self.assertEqual(decode_cells(data, VELOCITY_CELL, 0), [[], [], [], []])
+        self.assertRaises(ValueError, decode_cells, data, VELOCITY_CELL, cells + 1)
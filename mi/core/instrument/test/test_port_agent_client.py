@@ -15,6 +15,8 @@ from gevent import monkey; monkey.patch_all()
 import gevent
 
 import logging
+import socket
+import threading
 import unittest
 import re
 import time
@@ -38,7 +40,8 @@ from mi.idk.unit_test import InstrumentDriverTestCase
 from mi.idk.unit_test import InstrumentDriverUnitTestCase
 from mi.idk.unit_test import InstrumentDriverIntegrationTestCase
 
-from mi.core.instrument.port_agent_client import PortAgentClient, PortAgentPacket, Listener
+from mi.core.instrument.port_agent_client import PortAgentClient, PortAgentPacket, Listener, ListenerHub
+from mi.core.instrument.port_agent_client import TimerWheel
 from mi.core.instrument.port_agent_client import HEADER_SIZE
 from mi.core.instrument.instrument_driver import DriverConnectionState
 from mi.core.instrument.instrument_driver import DriverProtocolState
@@ -226,6 +229,249 @@ class PAClientUnitTestCase(InstrumentDriverUnitTestCase):
         self.assertFalse(self.errorCallbackCalled)
         self.assertFalse(self.listenerCallbackCalled)
 
+    def test_batch_listener(self):
+        """
+        Test that a listener in batch mode frames the packets written to its
+        socket in arbitrary pieces and hands all data packets over in order.
+        """
+        batches = []
+        (listener_sock, port_agent_sock) = socket.socketpair()
+        listener_sock.setblocking(0)
+        paListener = Listener(listener_sock, None, 0, 0, 5, self.myGotData, self.myGotRaw,
+                              self.myGotListenerError, self.myGotError, None,
+                              lambda packets: batches.append(packets))
+
+        stream = ""
+        for i in range(100):
+            paPacket = PortAgentPacket(PortAgentPacket.DATA_FROM_INSTRUMENT)
+            paPacket.attach_data("sample %d\r\n" % i)
+            paPacket.pack_header()
+            stream += paPacket.get_header() + paPacket.get_data()
+
+        paPacket = PortAgentPacket(PortAgentPacket.DATA_FROM_INSTRUMENT)
+        paPacket.attach_data("x" * 60000)
+        paPacket.pack_header()
+        stream += paPacket.get_header() + paPacket.get_data()
+
+        self.resetTestVars()
+        paListener.start()
+        for i in range(0, len(stream), 1000):
+            port_agent_sock.sendall(stream[i:i + 1000])
+
+        for i in range(50):
+            if sum([len(batch) for batch in batches]) == 101:
+                break
+            time.sleep(.1)
+        paListener.done()
+        paListener.join()
+        port_agent_sock.close()
+        listener_sock.close()
+
+        data = [packet.get_data() for batch in batches for packet in batch]
+        self.assertEqual(data[:100], ["sample %d\r\n" % i for i in range(100)])
+        self.assertEqual(data[100], "x" * 60000)
+        self.assertTrue(self.rawCallbackCalled)
+        self.assertFalse(self.dataCallbackCalled)
+
+    def test_listener_hub(self):
+        """
+        Test that one hub thread hands each listener the packets written to
+        its own socket, and that losing one connection only stops that
+        listener.
+        """
+        hub = ListenerHub()
+        hub.start()
+        received = ([], [])
+        sockets = []
+        listeners = []
+        for packets in received:
+            (listener_sock, port_agent_sock) = socket.socketpair()
+            listener_sock.setblocking(0)
+            paListener = Listener(listener_sock, None, 0, 0, 5, packets.append, self.myGotRaw,
+                                  self.myGotListenerError, self.myGotError, None, None, hub)
+            sockets.append((listener_sock, port_agent_sock))
+            listeners.append(paListener)
+
+        self.resetTestVars()
+        for paListener in listeners:
+            paListener.start()
+            self.assertTrue(paListener.is_alive())
+
+        for (i, (listener_sock, port_agent_sock)) in enumerate(sockets):
+            for j in range(10):
+                paPacket = PortAgentPacket(PortAgentPacket.DATA_FROM_INSTRUMENT)
+                paPacket.attach_data("listener %d sample %d\r\n" % (i, j))
+                paPacket.pack_header()
+                port_agent_sock.sendall(paPacket.get_header() + paPacket.get_data())
+
+        for i in range(50):
+            if len(received[0]) == 10 and len(received[1]) == 10:
+                break
+            time.sleep(.1)
+        for (i, packets) in enumerate(received):
+            self.assertEqual([packet.get_data() for packet in packets],
+                             ["listener %d sample %d\r\n" % (i, j) for j in range(10)])
+        self.assertFalse(self.errorCallbackCalled)
+
+        # the port agent closing one connection stops only that listener
+        sockets[0][1].close()
+        for i in range(50):
+            if self.errorCallbackCalled:
+                break
+            time.sleep(.1)
+        self.assertTrue(self.errorCallbackCalled)
+        self.assertFalse(listeners[0].is_alive())
+        self.assertTrue(listeners[1].is_alive())
+
+        paPacket = PortAgentPacket(PortAgentPacket.DATA_FROM_INSTRUMENT)
+        paPacket.attach_data("still listening")
+        paPacket.pack_header()
+        sockets[1][1].sendall(paPacket.get_header() + paPacket.get_data())
+        for i in range(50):
+            if len(received[1]) == 11:
+                break
+            time.sleep(.1)
+        self.assertEqual(received[1][-1].get_data(), "still listening")
+
+        for paListener in listeners:
+            paListener.done()
+            paListener.join()
+        self.assertFalse(listeners[1].is_alive())
+        hub.done()
+        hub.join()
+        for (listener_sock, port_agent_sock) in sockets:
+            listener_sock.close()
+            port_agent_sock.close()
+
+    def test_listener_hub_slow_callback(self):
+        """
+        Test that a listener whose callback is slow does not hold up adding
+        and removing other listeners, and that removing it waits for the
+        callback to finish.
+        """
+        hub = ListenerHub()
+        hub.start()
+        entered = threading.Event()
+        release = threading.Event()
+        def slow_data(paPacket):
+            entered.set()
+            release.wait(5)
+        sockets = []
+        listeners = []
+        for callback in (slow_data, self.myGotData):
+            (listener_sock, port_agent_sock) = socket.socketpair()
+            listener_sock.setblocking(0)
+            paListener = Listener(listener_sock, None, 0, 0, 5, callback, self.myGotRaw,
+                                  self.myGotListenerError, self.myGotError, None, None, hub)
+            sockets.append((listener_sock, port_agent_sock))
+            listeners.append(paListener)
+            paListener.start()
+
+        paPacket = PortAgentPacket(PortAgentPacket.DATA_FROM_INSTRUMENT)
+        paPacket.attach_data("slow")
+        paPacket.pack_header()
+        sockets[0][1].sendall(paPacket.get_header() + paPacket.get_data())
+        self.assertTrue(entered.wait(5))
+
+        start = time.time()
+        hub.remove(listeners[1])
+        self.assertFalse(listeners[1].is_alive())
+        hub.add(listeners[1])
+        self.assertTrue(listeners[1].is_alive())
+        self.assertLess(time.time() - start, 1)
+
+        removed = threading.Thread(target=hub.remove, args=(listeners[0],))
+        removed.start()
+        removed.join(.2)
+        self.assertTrue(removed.is_alive())
+        release.set()
+        removed.join(5)
+        self.assertFalse(removed.is_alive())
+        self.assertFalse(listeners[0].is_alive())
+
+        for paListener in listeners:
+            paListener.done()
+            paListener.join()
+        hub.done()
+        hub.join()
+        for (listener_sock, port_agent_sock) in sockets:
+            listener_sock.close()
+            port_agent_sock.close()
+
+    def test_timer_wheel(self):
+        """
+        Test items expire once their deadline has passed, including
+        deadlines more than a turn of the wheel away, and that cancelled or
+        rescheduled items do not expire early.
+        """
+        wheel = TimerWheel(.5, 8, now=100.0)
+        wheel.schedule('a', 101.25)
+        wheel.schedule('b', 102.75)
+        # more than a turn of the wheel away, in the same slot as 'a'
+        wheel.schedule('c', 105.25)
+        wheel.schedule('d', 101.75)
+        wheel.cancel('d')
+        wheel.schedule('e', 101.75)
+        wheel.schedule('e', 103.25)
+
+        self.assertEqual(wheel.expire(101.0), [])
+        self.assertEqual(wheel.expire(101.5), ['a'])
+        self.assertEqual(wheel.expire(102.0), [])
+        self.assertEqual(wheel.expire(103.0), ['b'])
+        self.assertEqual(wheel.expire(103.5), ['e'])
+        self.assertEqual(wheel.expire(105.0), [])
+        self.assertEqual(wheel.expire(105.5), ['c'])
+
+        # a deadline already passed expires on the next tick
+        wheel.schedule('f', 50.0)
+        self.assertEqual(wheel.expire(105.5), [])
+        self.assertEqual(wheel.expire(106.0), ['f'])
+
+        # a long gap looks at every slot once
+        wheel.schedule('g', 107.0)
+        self.assertEqual(wheel.expire(200.0), ['g'])
+        self.assertEqual(wheel.due, {})
+
+    def test_listener_hub_heartbeat(self):
+        """
+        Test that a hub listener stays up while heartbeats arrive, and that
+        the error callback is called once they stop.
+        """
+        hub = ListenerHub()
+        hub.start()
+        (listener_sock, port_agent_sock) = socket.socketpair()
+        listener_sock.setblocking(0)
+        self.resetTestVars()
+        test_recovery_attempts = 1
+        test_heartbeat = 1
+        test_max_missed_heartbeats = 1
+        paListener = Listener(listener_sock, test_recovery_attempts, None, test_heartbeat,
+                              test_max_missed_heartbeats, self.myGotData, self.myGotRaw,
+                              self.myGotListenerError, None, self.myGotError, None, hub)
+        paListener.start()
+
+        paPacket = PortAgentPacket(PortAgentPacket.HEARTBEAT)
+        paPacket.attach_data('')
+        paPacket.pack_header()
+        for i in range(6):
+            port_agent_sock.sendall(paPacket.get_header())
+            time.sleep(.5)
+        self.assertFalse(self.errorCallbackCalled)
+        self.assertTrue(paListener.is_alive())
+
+        for i in range(50):
+            if self.errorCallbackCalled:
+                break
+            time.sleep(.1)
+        self.assertTrue(self.errorCallbackCalled)
+        self.assertFalse(paListener.is_alive())
+        self.assertFalse(self.listenerCallbackCalled)
+
+        hub.done()
+        hub.join()
+        listener_sock.close()
+        port_agent_sock.close()
+
     def test_heartbeat_timeout(self):
         """
         Initialize the Listener with a heartbeat value, then
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_port_agent_codec
+@file mi/core/instrument/test/test_port_agent_codec.py
+@author David Everett
+@brief Unit tests for the port agent packet codec
+"""
+
+__author__ = 'David Everett'
+__license__ = 'Apache 2.0'
+
+import array
+import random
+
+from nose.plugins.attrib import attr
+
+from mi.core.unit_test import MiUnitTest
+from mi.core.instrument import port_agent_codec
+from mi.core.instrument.port_agent_codec import HEADER_SIZE
+from mi.core.instrument.port_agent_client import PortAgentPacket
+
+
+def byte_checksum(header, data):
+    """
+    The byte at a time checksum the codec replaces
+    """
+    checksum = 0
+    for i in range(HEADER_SIZE):
+        if i < port_agent_codec.OFFSET_P_CHECKSUM_LOW or i > port_agent_codec.OFFSET_P_CHECKSUM_HIGH:
+            checksum ^= ord(header[i])
+    for c in data:
+        checksum ^= ord(c)
+    return checksum
+
+
+@attr('UNIT', group='mi')
+class PortAgentCodecUnitTest(MiUnitTest):
+
+    def setUp(self):
+        self.random = random.Random(42)
+
+    def random_data(self, length):
+        return ''.join(chr(self.random.randint(0, 255)) for i in range(length))
+
+    def test_xor_checksum(self):
+        """
+        Verify the bulk checksum matches a byte at a time XOR on both sides
+        of the bulk threshold and for lengths that are not whole words.
+        """
+        for length in [0, 1, 7, 8, 63, 64, 65, 1000, 1024, 4099]:
+            data = self.random_data(length)
+            expected = 0
+            for c in data:
+                expected ^= ord(c)
+            self.assertEqual(port_agent_codec.xor_checksum(data), expected)
+            self.assertEqual(port_agent_codec.xor_checksum(bytearray(data)), expected)
+
+    def test_xor_checksum_length(self):
+        """
+        Verify only the first length bytes are used
+        """
+        data = self.random_data(500)
+        self.assertEqual(port_agent_codec.xor_checksum(data, 100),
+                         port_agent_codec.xor_checksum(data[:100]))
+        self.assertEqual(port_agent_codec.xor_checksum(data, 10),
+                         port_agent_codec.xor_checksum(data[:10]))
+        self.assertEqual(port_agent_codec.xor_checksum(None, 0), 0)
+
+    def test_unpack_header(self):
+        header = array.array('B', [163, 157, 122, 2, 0, 32 + HEADER_SIZE, 14, 145,
+                                   65, 234, 142, 154, 23, 155, 51, 51])
+        (packet_type, length, checksum, timestamp) = port_agent_codec.unpack_header(header)
+        self.assertEqual(packet_type, PortAgentPacket.DATA_FROM_DRIVER)
+        self.assertEqual(length, 32)
+        self.assertEqual(checksum, 3729)
+
+    def test_packet_checksum(self):
+        """
+        Verify packets built and checked through PortAgentPacket agree with
+        the byte at a time checksum.
+        """
+        for length in [16, 1024, 65000]:
+            data = self.random_data(length)
+            packet = PortAgentPacket()
+            packet.attach_data(data)
+            packet.pack_header()
+            self.assertEqual(packet.calculate_checksum(),
+                             byte_checksum(packet.get_header(), data))
+
+            received = PortAgentPacket()
+            received.unpack_header(packet.get_header())
+            received.attach_data(data)
+            self.assertEqual(received.get_data_length(), length)
+            self.assertEqual(received.get_header_type(), PortAgentPacket.DATA_FROM_DRIVER)
+
+            # pack_header leaves the checksum field empty
+            self.assertEqual(received.get_header_recv_checksum(), 0)
+            received.verify_checksum()
+            self.assertEqual(received.is_valid(), packet.calculate_checksum() == 0)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_protocol_buffer
+@file mi/core/instrument/test/test_protocol_buffer.py
+@author Steve Foley
+@brief Unit tests for the protocol line and prompt buffer
+"""
+
+__author__ = 'Steve Foley'
+__license__ = 'Apache 2.0'
+
+import re
+import sys
+from threading import Thread
+
+from nose.plugins.attrib import attr
+
+from mi.core.unit_test import MiUnitTest
+from mi.core.instrument.protocol_buffer import ProtocolBuffer
+
+
+@attr('UNIT', group='mi')
+class ProtocolBufferUnitTest(MiUnitTest):
+
+    def test_bounded(self):
+        """
+        Verify the buffer keeps only the newest capacity bytes and releases
+        the space of dropped bytes.
+        """
+        buf = ProtocolBuffer(5)
+        for c in "abcde":
+            buf.append(c)
+        self.assertEqual(buf.value, "abcde")
+        self.assertEqual(len(buf), 5)
+
+        buf.append("f")
+        self.assertEqual(buf.value, "bcdef")
+        buf.append("ghijklmn")
+        self.assertEqual(buf.value, "jklmn")
+        self.assertEqual(str(buf), "jklmn")
+
+        for i in range(100):
+            buf.append("xyz")
+        self.assertEqual(buf.value, "zxyzxyz"[-5:])
+        self.assertLessEqual(len(buf._data), 2 * buf.capacity)
+
+        buf.append("12", capacity=3)
+        self.assertEqual(buf.value, "z12")
+
+    def test_clear_and_set(self):
+        buf = ProtocolBuffer(10, "abc")
+        self.assertEqual(buf.value, "abc")
+        buf.clear()
+        self.assertEqual(buf.value, "")
+        self.assertEqual(len(buf), 0)
+        buf.set("this is longer than ten")
+        self.assertEqual(buf.value, "er than ten"[-10:])
+
+    def test_find(self):
+        """
+        Verify prompts are found incrementally, including prompts split over
+        appends and a second prompt after the first has been dropped.
+        """
+        buf = ProtocolBuffer(10)
+        self.assertEqual(buf.find("S>"), -1)
+        buf.append("abc S")
+        self.assertEqual(buf.find("S>"), -1)
+        buf.append(">")
+        self.assertEqual(buf.find("S>"), 4)
+        self.assertEqual(buf.find(">"), 5)
+        self.assertEqual(buf.find("S>"), buf.value.find("S>"))
+
+        # the first prompt is dropped, the search picks up the next one
+        buf.append("1234S>")
+        self.assertEqual(buf.value, "c S>1234S>")
+        self.assertEqual(buf.find("S>"), 2)
+        buf.append("xyz")
+        self.assertEqual(buf.value, ">1234S>xyz")
+        self.assertEqual(buf.find("S>"), 5)
+
+        buf.clear()
+        self.assertEqual(buf.find("S>"), -1)
+        buf.append("S>")
+        self.assertEqual(buf.find("S>"), 0)
+
+    def test_search(self):
+        """
+        Verify regex searches see matches that span appends and are not
+        fooled by the cached miss.
+        """
+        regex = re.compile(r'do (it)')
+        buf = ProtocolBuffer(100)
+        buf.append("cmd...do")
+        self.assertIsNone(buf.search(regex))
+        self.assertIsNone(buf.search(regex))
+        buf.append(" it!")
+        match = buf.search(regex)
+        self.assertEqual(match.group(1), "it")
+
+        buf.set("do")
+        self.assertIsNone(buf.search(regex))
+        buf.set("do it")
+        self.assertEqual(buf.search(regex).group(0), "do it")
+
+    def test_concurrent_find(self):
+        """
+        Verify a prompt appended while another thread searches for it is
+        still found.  Without the lock a find could record the end of data
+        appended after it scanned as its resume point and never see the
+        prompt.
+        """
+        interval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+        try:
+            for trial in range(2000):
+                buf = ProtocolBuffer(1000)
+                done = []
+
+                def search():
+                    while not done:
+                        buf.find("S>")
+
+                reader = Thread(target=search)
+                reader.start()
+                for i in range(20):
+                    buf.append("x")
+                buf.append("S>")
+                done.append(True)
+                reader.join()
+
+                self.assertEqual(buf.find("S>"), 20)
+        finally:
+            sys.setcheckinterval(interval)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_zmq_codec
+@file mi/core/instrument/test/test_zmq_codec.py
+@author Edward Hunter
+@brief Test the ZMQ driver event encodings
+"""
+
+__author__ = 'Edward Hunter'
+__license__ = 'Apache 2.0'
+
+import time
+import cPickle as pickle
+
+from nose.plugins.attrib import attr
+
+from mi.core.unit_test import MiUnitTest
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument.zmq_codec import EVENT_CODECS, SAMPLE_TAG
+from mi.core.instrument.zmq_codec import choose_event_codec, decode_event
+
+
+@attr('UNIT', group='mi')
+class TestZmqCodec(MiUnitTest):
+
+    def test_round_trip(self):
+        """
+        Verify every event decodes to an equal event in every encoding
+        """
+        sample = {'type': DriverAsyncEvent.SAMPLE, 'value': '{"values": []}', 'time': time.time()}
+        events = [sample,
+                  {'type': DriverAsyncEvent.SAMPLE, 'value': u'{"values": []}', 'time': time.time()},
+                  {'type': DriverAsyncEvent.STATE_CHANGE, 'value': 'DRIVER_STATE_COMMAND', 'time': time.time()},
+                  {'type': DriverAsyncEvent.ERROR, 'value': ('x', 'error', None), 'time': time.time()},
+                  'test event']
+        for codec in EVENT_CODECS.values():
+            for evt in events:
+                decoded = decode_event(codec.encode(evt))
+                self.assertEqual(decoded, evt)
+                self.assertEqual(type(decoded), type(evt))
+
+        # only plain sample events skip the pickle
+        self.assertEqual(EVENT_CODECS['sample'].encode(sample)[0], SAMPLE_TAG)
+        self.assertTrue(EVENT_CODECS['sample'].encode(sample).endswith(sample['value']))
+
+        # events published with send_pyobj still decode
+        self.assertEqual(decode_event(pickle.dumps(sample, -1)), sample)
+
+    def test_choose(self):
+        """
+        Verify the first known encoding is chosen
+        """
+        self.assertEqual(choose_event_codec(['bogus', 'pickle', 'sample']).name, 'pickle')
+        self.assertEqual(choose_event_codec(['sample']).name, 'sample')
+        self.assertIsNone(choose_event_codec(['bogus']))
+        self.assertIsNone(choose_event_codec([]))
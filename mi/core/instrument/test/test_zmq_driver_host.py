@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_zmq_driver_host
+@file mi/core/instrument/test/test_zmq_driver_host.py
+@author Edward Hunter
+@brief Test cases for ZmqDriverHost processes.
+"""
+
+__author__ = 'Edward Hunter'
+__license__ = 'Apache 2.0'
+
+import time
+import socket
+import cPickle as pickle
+from threading import Thread
+
+import zmq
+from nose.plugins.attrib import attr
+
+from mi.core.instrument.zmq_driver_client import ZmqDriverClient
+from mi.core.instrument.zmq_driver_host import ZmqDriverHost, DRIVER_HOST_ID
+from mi.core.instrument.zmq_poll import wait_for_socket
+from mi.core.instrument.port_agent_client import Listener
+from mi.core.driver_scheduler import DriverScheduler, DriverSchedulerConfigKey, TriggerType
+from mi.core.unit_test import MiTestCase
+
+TEST_MODULE = 'mi.core.instrument.test.test_zmq_driver_host'
+
+
+class EchoDriver(object):
+    """
+    Driver that echos, raises and sends events on command.
+    """
+    def __init__(self, evt_callback):
+        self.evt_callback = evt_callback
+        self.disconnected = False
+
+    def disconnect(self):
+        self.disconnected = True
+
+    def echo(self, data):
+        return (id(self), data)
+
+    def fail(self):
+        raise ValueError('driver failed')
+
+    def emit(self, value):
+        self.evt_callback({'type': 'test', 'value': value, 'time': time.time()})
+        return value
+
+    def emit_unpicklable(self):
+        self.evt_callback({'type': 'test', 'value': lambda: None, 'time': time.time()})
+
+    def wait(self, seconds):
+        time.sleep(seconds)
+        return seconds
+
+
+class FakeConnection(object):
+    """
+    Port agent client of a connected driver, holding only its listener.
+    """
+    def __init__(self, listener_thread):
+        self.listener_thread = listener_thread
+
+
+class FakeProtocol(object):
+    """
+    Protocol of a driver, holding only its scheduler.
+    """
+    def __init__(self, scheduler):
+        self._scheduler = scheduler
+
+
+class BrokenDriver(object):
+    """
+    Driver that can not be constructed.
+    """
+    def __init__(self, evt_callback):
+        raise RuntimeError('driver broken')
+
+
+@attr('UNIT', group='mi')
+class TestZmqDriverHost(MiTestCase):
+    """
+    Unit tests for the ZMQ driver host, run with the host and its clients
+    in this process over inproc sockets.
+    """
+
+    def setUp(self):
+        """
+        Start a host with two working drivers, one that raises when
+        constructed and one whose module does not exist.
+        """
+        self.host = ZmqDriverHost([('a', TEST_MODULE, 'EchoDriver'),
+                                   ('b', TEST_MODULE, 'EchoDriver'),
+                                   ('broken', TEST_MODULE, 'BrokenDriver'),
+                                   ('missing', 'mi.core.instrument.test.no_such_driver', 'Driver')],
+                                  None, None, None, inproc_name='test_driver_host')
+        self.assertTrue(self.host.construct_driver())
+        self.assertEqual(sorted(self.host.drivers), ['a', 'b'])
+        self.host.start_messaging()
+        self.events = {}
+        self.clients = {}
+        for driver_id in ('a', 'b', DRIVER_HOST_ID):
+            self.events[driver_id] = []
+            self.clients[driver_id] = ZmqDriverClient(None, None, None, inproc_name='test_driver_host',
+                                                      driver_id=driver_id)
+            self.clients[driver_id].start_messaging(self.events[driver_id].append)
+        self.addCleanup(self.stop_host)
+
+    def stop_host(self):
+        for client in self.clients.values():
+            client.stop_messaging()
+        self.host.stop_messaging()
+        self.host.cmd_thread.join(5)
+        self.host.evt_thread.join(5)
+        self.assertFalse(self.host.cmd_thread.is_alive())
+        self.assertFalse(self.host.evt_thread.is_alive())
+
+    def test_routing(self):
+        """
+        Test commands reach the driver they name, and errors are replied to
+        without affecting the other drivers.
+        """
+        (a_id, data) = self.clients['a'].cmd_dvr('echo', 'to a')
+        self.assertEqual(data, 'to a')
+        (b_id, data) = self.clients['b'].cmd_dvr('echo', 'to b')
+        self.assertEqual(data, 'to b')
+        self.assertNotEqual(a_id, b_id)
+        self.assertEqual(self.clients['a'].cmd_dvr('echo', 1), (a_id, 1))
+
+        self.assertIsInstance(self.clients['a'].cmd_dvr('fail'), tuple)
+        self.assertIsInstance(self.clients['a'].cmd_dvr('no_such_command'), tuple)
+        self.assertEqual(self.clients['b'].cmd_dvr('echo', 2), (b_id, 2))
+
+        self.assertIn("['a', 'b']", self.clients[DRIVER_HOST_ID].cmd_dvr('process_echo'))
+        broken = ZmqDriverClient(None, None, None, inproc_name='test_driver_host', driver_id='broken')
+        broken.start_messaging(event_codecs=())
+        self.assertIsInstance(broken.cmd_dvr('echo', 3), tuple)
+        broken.stop_messaging()
+
+    def test_blocked_driver(self):
+        """
+        Test a driver busy with a command does not hold up another.
+        """
+        replies = []
+        waiting = Thread(target=lambda: replies.append(self.clients['a'].cmd_dvr('wait', 1)))
+        waiting.start()
+        time.sleep(.1)
+
+        start = time.time()
+        for i in range(10):
+            self.assertEqual(self.clients['b'].cmd_dvr('echo', i)[1], i)
+        self.assertLess(time.time() - start, .5)
+        self.assertEqual(replies, [])
+
+        waiting.join(5)
+        self.assertEqual(replies, [1])
+
+    def test_events(self):
+        """
+        Test each client only gets the events of its driver.
+        """
+        # events published before the subscriptions reach the host are
+        # dropped, so send them until one arrives
+        timeout = time.time() + 5
+        while not (self.events['a'] and self.events['b']) and time.time() < timeout:
+            self.clients['a'].cmd_dvr('test_events', events=['subscribed a'])
+            self.clients['b'].cmd_dvr('test_events', events=['subscribed b'])
+            time.sleep(.01)
+        self.assertEqual(set(self.events['a']), set(['subscribed a']))
+        self.assertEqual(set(self.events['b']), set(['subscribed b']))
+
+        del self.events['a'][:]
+        del self.events['b'][:]
+        for i in range(5):
+            self.clients['a'].cmd_dvr('emit', 'a %d' % i)
+        self.clients['b'].cmd_dvr('emit', 'b')
+        timeout = time.time() + 5
+        while (len(self.events['a']) < 5 or not self.events['b']) and time.time() < timeout:
+            time.sleep(.001)
+        self.assertEqual([evt['value'] for evt in self.events['a']], ['a %d' % i for i in range(5)])
+        self.assertEqual([evt['value'] for evt in self.events['b']], ['b'])
+        self.assertEqual(self.events[DRIVER_HOST_ID], [])
+
+    def test_stop_drivers(self):
+        """
+        Test stopping a driver disconnects it, stops reading its socket and
+        unschedules its jobs, leaves the others running, and the host stops
+        with its last driver.
+        """
+        driver = self.host.drivers['a']
+        (listener_sock, port_agent_sock) = socket.socketpair()
+        self.addCleanup(listener_sock.close)
+        self.addCleanup(port_agent_sock.close)
+        listener = Listener(listener_sock, None, 0, 0, 5, None, None, None, None, None, None,
+                            self.host.listener_hub)
+        driver._connection = FakeConnection(listener)
+        listener.start()
+        self.assertTrue(self.host.listener_hub.has(listener))
+        config = {
+            'polled_job': {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.POLLED_INTERVAL,
+                    DriverSchedulerConfigKey.MINIMAL_INTERVAL: {DriverSchedulerConfigKey.SECONDS: 1},
+                },
+                DriverSchedulerConfigKey.CALLBACK: lambda: None
+            }
+        }
+        scheduler = DriverScheduler(config)
+        driver._protocol = FakeProtocol(scheduler)
+
+        self.assertEqual(self.clients['a'].cmd_dvr('stop_driver_process'), 'stop_driver_process')
+        self.assertTrue(driver.disconnected)
+        self.assertFalse(self.host.listener_hub.has(listener))
+        self.assertRaises(LookupError, scheduler.run_job, 'polled_job')
+        self.assertTrue(scheduler._scheduler.running)
+        self.assertIsInstance(self.clients['a'].cmd_dvr('echo', 1), tuple)
+        self.assertEqual(self.clients['b'].cmd_dvr('echo', 2)[1], 2)
+        self.assertTrue(self.host.messaging_started)
+
+        self.assertEqual(self.clients['b'].cmd_dvr('stop_driver_process'), 'stop_driver_process')
+        self.host.cmd_thread.join(5)
+        self.assertFalse(self.host.messaging_started)
+
+    def test_bad_messages(self):
+        """
+        Test a malformed command is replied to with an error and an event
+        that can not be encoded is dropped, without stopping the host.
+        """
+        sock = zmq.Context.instance().socket(zmq.REQ)
+        sock.connect('inproc://test_driver_host_cmd')
+        for frame in ('not a pickle', pickle.dumps(['not', 'a', 'dict'])):
+            sock.send(frame)
+            self.assertTrue(wait_for_socket(sock, zmq.POLLIN, 5))
+            self.assertIsInstance(pickle.loads(sock.recv(flags=zmq.NOBLOCK)), tuple)
+        sock.close()
+
+        # events published before the subscriptions reach the host are
+        # dropped, so send them until they arrive
+        timeout = time.time() + 5
+        while not (self.events['a'] and self.events['b']) and time.time() < timeout:
+            self.clients['a'].cmd_dvr('test_events', events=['subscribed a'])
+            self.clients['b'].cmd_dvr('test_events', events=['subscribed b'])
+            time.sleep(.01)
+        del self.events['a'][:]
+        del self.events['b'][:]
+
+        self.assertIsNone(self.clients['a'].cmd_dvr('emit_unpicklable'))
+        self.clients['a'].cmd_dvr('emit', 'a')
+        self.clients['b'].cmd_dvr('emit', 'b')
+        timeout = time.time() + 5
+        while not (self.events['a'] and self.events['b']) and time.time() < timeout:
+            time.sleep(.001)
+        self.assertEqual([evt['value'] for evt in self.events['a']], ['a'])
+        self.assertEqual([evt['value'] for evt in self.events['b']], ['b'])
+        self.assertEqual(self.clients['b'].cmd_dvr('echo', 1)[1], 1)
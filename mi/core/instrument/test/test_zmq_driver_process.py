@@ -105,4 +105,95 @@ class TestZmqDriverProcess(MiTestCase):
         """
         """
         
-        pass 
+        pass
+
+    def test_inproc_messaging(self):
+        """
+        Test commands and events between a driver process and client in this
+        process over inproc sockets, and that replies and events are not
+        delayed by sleeping between polls.
+        """
+        class EchoDriver(object):
+            def echo(self, data):
+                return data
+
+        driver_process = ZmqDriverProcess(None, None, None, None, None, inproc_name='test_inproc')
+        driver_process.driver = EchoDriver()
+        driver_process.start_messaging()
+        events = []
+        driver_client = ZmqDriverClient(None, None, None, inproc_name='test_inproc')
+        driver_client.start_messaging(events.append)
+
+        self.assertEqual(driver_client.cmd_dvr('echo', 'test 1 2 3'), 'test 1 2 3')
+
+        # events published before the subscription reaches the driver
+        # process are dropped, so send them until one arrives
+        timeout = time.time() + 5
+        while not events and time.time() < timeout:
+            self.assertEqual(driver_client.cmd_dvr('test_events', events=['subscribed']), 'test_events')
+            time.sleep(.01)
+        self.assertIn('subscribed', events)
+
+        start = time.time()
+        for i in range(100):
+            self.assertEqual(driver_client.cmd_dvr('echo', i), i)
+        self.assertLess(time.time() - start, 5)
+
+        del events[:]
+        start = time.time()
+        driver_client.cmd_dvr('test_events', events=['event 1', 'event 2'])
+        while len(events) < 2 and time.time() - start < 5:
+            time.sleep(.001)
+        self.assertEqual(events, ['event 1', 'event 2'])
+        self.assertLess(time.time() - start, .1)
+
+        driver_client.done()
+        driver_process.cmd_thread.join(5)
+        driver_process.evt_thread.join(5)
+        self.assertFalse(driver_process.cmd_thread.is_alive())
+        self.assertFalse(driver_process.evt_thread.is_alive()) 
+
+    def test_event_codec_timeout(self):
+        """
+        Test that a client whose driver process is slow to choose an event
+        encoding gives up waiting, leaves events pickled and can still
+        command the driver and take its events.
+        """
+        class EchoDriver(object):
+            def echo(self, data):
+                return data
+
+        class SlowDriverProcess(ZmqDriverProcess):
+            def cmd_driver(self, msg):
+                if msg.get('cmd', None) == 'set_event_codec':
+                    time.sleep(1)
+                return ZmqDriverProcess.cmd_driver(self, msg)
+
+        driver_process = SlowDriverProcess(None, None, None, None, None, inproc_name='test_codec_timeout')
+        driver_process.driver = EchoDriver()
+        driver_process.start_messaging()
+        events = []
+        driver_client = ZmqDriverClient(None, None, None, inproc_name='test_codec_timeout')
+
+        start = time.time()
+        driver_client.start_messaging(events.append, codec_timeout=.2)
+        self.assertLess(time.time() - start, 1)
+        self.assertIsNone(driver_client.event_codec)
+
+        # the late reply goes to the closed socket
+        self.assertEqual(driver_client.cmd_dvr('echo', 'test 1 2 3'), 'test 1 2 3')
+
+        # the driver process chose an encoding after all, which the client
+        # decodes as well
+        timeout = time.time() + 5
+        while not events and time.time() < timeout:
+            driver_client.cmd_dvr('test_events', events=['subscribed'])
+            time.sleep(.01)
+        self.assertIn('subscribed', events)
+        self.assertIsNotNone(driver_process.event_codec)
+
+        driver_client.done()
+        driver_process.cmd_thread.join(5)
+        driver_process.evt_thread.join(5)
+        self.assertFalse(driver_process.cmd_thread.is_alive())
+        self.assertFalse(driver_process.evt_thread.is_alive())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.zmq_codec
+@file mi/core/instrument/zmq_codec.py
+@author Edward Hunter
+@brief Wire encodings for the events a ZMQ driver process publishes to its
+client.  The client names the encodings it can decode when it starts
+messaging and the driver process picks one; until then, or with a client
+that never asks, every event is published as a single pickle the way
+send_pyobj does it.  A driver host publishes the events of all its drivers
+on one socket, each message starting with the topic of the driver it is
+from.  With an encoding chosen, queued events are published in
+batches, one frame of a multipart message per event.
+
+Every frame identifies its own encoding, so frames from before and after the
+encoding changes can be decoded by the same client.  Pickles always start
+with the protocol byte, 0x80, and sample frames start with SAMPLE_TAG.
+"""
+
+__author__ = 'Edward Hunter'
+__license__ = 'Apache 2.0'
+
+import struct
+import cPickle as pickle
+
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+
+SAMPLE_TAG = 'S'
+
+# Tag and event time in front of the particle string of a sample frame
+SAMPLE_HEADER = struct.Struct('<cd')
+
+# Most events published in one multipart message
+MAX_EVENT_BATCH = 100
+
+
+class EventCodec(object):
+    """
+    Encode every event as a pickle frame.
+    """
+    name = 'pickle'
+
+    def encode(self, evt):
+        """
+        Encode an event as a message frame.
+        @param evt The driver event.
+        @retval The frame string.
+        """
+        return pickle.dumps(evt, pickle.HIGHEST_PROTOCOL)
+
+
+class SampleEventCodec(EventCodec):
+    """
+    Encode sample events as the particle string after a small struct header
+    rather than pickling the already JSON encoded particle again, and any
+    other event as a pickle frame.
+    """
+    name = 'sample'
+
+    def encode(self, evt):
+        """
+        Encode an event as a message frame.
+        @param evt The driver event.
+        @retval The frame string.
+        """
+        if (type(evt) is dict and len(evt) == 3 and evt.get('type') == DriverAsyncEvent.SAMPLE and
+                type(evt.get('value')) is str and type(evt.get('time')) is float):
+            return SAMPLE_HEADER.pack(SAMPLE_TAG, evt['time']) + evt['value']
+        return EventCodec.encode(self, evt)
+
+
+EVENT_CODECS = dict((codec.name, codec) for codec in (SampleEventCodec(), EventCodec()))
+
+# Encodings a client asks for by default, most preferred first
+DEFAULT_EVENT_CODECS = (SampleEventCodec.name, EventCodec.name)
+
+
+def choose_event_codec(names):
+    """
+    Pick the first encoding in a client's list that is known here.
+    @param names The names of the encodings the client can decode.
+    @retval The EventCodec, None if none of the names are known.
+    """
+    for name in names:
+        if name in EVENT_CODECS:
+            return EVENT_CODECS[name]
+    return None
+
+
+def driver_event_topic(driver_id):
+    """
+    The first frame of the event messages of one driver in a driver host,
+    which its clients subscribe to.  The terminator keeps one id from
+    matching the start of another.
+    @param driver_id The id of the driver in the host.
+    @retval The topic string.
+    """
+    return '%s\0' % driver_id
+
+
+def decode_event(frame):
+    """
+    Decode a message frame in any of the encodings.
+    @param frame The frame string.
+    @retval The driver event.
+    """
+    if frame[:1] == SAMPLE_TAG:
+        (tag, timestamp) = SAMPLE_HEADER.unpack_from(frame)
+        return {'type': DriverAsyncEvent.SAMPLE,
+                'value': frame[SAMPLE_HEADER.size:],
+                'time': timestamp}
+    return pickle.loads(frame)
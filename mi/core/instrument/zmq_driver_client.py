@@ -27,8 +27,15 @@ import time
 import zmq
 
 from mi.core.instrument.driver_client import DriverClient
+from mi.core.instrument.zmq_poll import wait_for_socket
+from mi.core.instrument.zmq_codec import decode_event, driver_event_topic, DEFAULT_EVENT_CODECS
+from mi.core.exceptions import InstrumentTimeoutException
 from mi.core.log import get_logger ; log = get_logger()
 
+# Seconds to wait for the driver process to choose an event encoding before
+# leaving events pickled
+EVENT_CODEC_TIMEOUT = 5
+
  
 class ZmqDriverClient(DriverClient):
     """
@@ -36,36 +43,86 @@ class ZmqDriverClient(DriverClient):
     thread for catching asynchronous driver events.
     """
     
-    def __init__(self, host, cmd_port, event_port):
+    def __init__(self, host, cmd_port, event_port, inproc_name=None, driver_id=None):
         """
         Initialize members.
         @param host Host string address of the driver process.
         @param cmd_port Port number for the driver process command port.
         @param event_port Port number for the driver process event port.
+        @param inproc_name If given, connect to the inproc endpoints of a
+        driver process in this process created with the same name, instead
+        of to the host and ports.
+        @param driver_id If given, the id of the driver to command and take
+        events from in a driver host.
         """
         DriverClient.__init__(self)
         self.host = host
         self.cmd_port = cmd_port
         self.event_port = event_port
-        self.cmd_host_string = 'tcp://%s:%i' % (self.host, self.cmd_port)
-        self.event_host_string = 'tcp://%s:%i' % (self.host, self.event_port)
+        self.inproc_name = inproc_name
+        self.driver_id = driver_id
+        if inproc_name:
+            self.cmd_host_string = 'inproc://%s_cmd' % inproc_name
+            self.event_host_string = 'inproc://%s_evt' % inproc_name
+        else:
+            self.cmd_host_string = 'tcp://%s:%i' % (self.host, self.cmd_port)
+            self.event_host_string = 'tcp://%s:%i' % (self.host, self.event_port)
         self.zmq_context = None
         self.zmq_cmd_socket = None
         self.event_thread = None
         self.stop_event_thread = True
+        self.event_codec = None
+
+    def _new_context(self):
+        """
+        Inproc endpoints are only reachable within a single context, so use
+        the shared one for them and a new one for TCP.
+        """
+        if self.inproc_name:
+            return zmq.Context.instance()
+        return zmq.Context()
+
+    def _term_context(self, context):
+        """
+        Terminate a context unless it is the shared one.
+        """
+        if not self.inproc_name:
+            context.term()
         
-    def start_messaging(self, evt_callback=None):
+    def _connect_cmd_socket(self):
+        """
+        Create the command socket and connect it to the driver process.
+        """
+        self.zmq_cmd_socket = self.zmq_context.socket(zmq.REQ)
+        self.zmq_cmd_socket.connect(self.cmd_host_string)
+        log.info('Driver client cmd socket connected to %s.' %
+                       self.cmd_host_string)
+
+    def _reconnect_cmd_socket(self):
+        """
+        Replace a command socket still waiting for a reply, which cannot
+        send another request, with a new one.
+        """
+        self.zmq_cmd_socket.setsockopt(zmq.LINGER, 0)
+        self.zmq_cmd_socket.close()
+        self._connect_cmd_socket()
+
+    def start_messaging(self, evt_callback=None, event_codecs=DEFAULT_EVENT_CODECS,
+                        codec_timeout=EVENT_CODEC_TIMEOUT):
         """
         Initialize and start messaging resources for the driver process client.
         Initializes command socket for sending requests,
         and starts event thread that listens for events from the driver
         process independently of command request-reply.
+        @param evt_callback Function called with each driver event.
+        @param event_codecs Names of the event encodings to ask the driver
+        process for, most preferred first. Empty to leave events pickled
+        one per message.
+        @param codec_timeout Seconds to wait for the driver process to choose
+        an event encoding before leaving events pickled.
         """
-        self.zmq_context = zmq.Context()
-        self.zmq_cmd_socket = self.zmq_context.socket(zmq.REQ)
-        self.zmq_cmd_socket.connect(self.cmd_host_string)
-        log.info('Driver client cmd socket connected to %s.' %
-                       self.cmd_host_string)        
+        self.zmq_context = self._new_context()
+        self._connect_cmd_socket()
         self.evt_callback = evt_callback
         
         def recv_evt_messages(driver_client):
@@ -74,31 +131,51 @@ class ZmqDriverClient(DriverClient):
             driver events. Can be run as a thread or greenlet.
             @param driver_client The client object that launches the thread.
             """
-            context = zmq.Context()
+            context = driver_client._new_context()
             sock = context.socket(zmq.SUB)
             sock.connect(driver_client.event_host_string)
-            sock.setsockopt(zmq.SUBSCRIBE, '')
+            if driver_client.driver_id is None:
+                sock.setsockopt(zmq.SUBSCRIBE, '')
+            else:
+                sock.setsockopt(zmq.SUBSCRIBE, driver_event_topic(driver_client.driver_id))
             log.info('Driver client event thread connected to %s.' %
                   driver_client.event_host_string)
 
             driver_client.stop_event_thread = False
-            #last_time = time.time()
             while not driver_client.stop_event_thread:
-                try:
-                    evt = sock.recv_pyobj(flags=zmq.NOBLOCK)
+                # wake up periodically to check the stop flag
+                if not wait_for_socket(sock, zmq.POLLIN):
+                    continue
+                frames = sock.recv_multipart(flags=zmq.NOBLOCK)
+                if driver_client.driver_id is not None:
+                    # drop the driver topic
+                    frames = frames[1:]
+                # one event per frame, in any encoding
+                for frame in frames:
+                    evt = decode_event(frame)
                     log.debug('got event: %s' % str(evt))
                     if driver_client.evt_callback:
                         driver_client.evt_callback(evt)
-                except zmq.ZMQError:
-                    time.sleep(.5)
-                #cur_time = time.time()
-                #if cur_time - last_time > 5:
-                #    log.info('event thread listening')
-                #    last_time = cur_time
             sock.close()
-            context.term()
+            driver_client._term_context(context)
             log.info('Client event socket closed.')
         self.event_thread = thread.start_new_thread(recv_evt_messages, (self,))
+
+        self.event_codec = None
+        if event_codecs:
+            # driver processes without encodings reply with an error triple
+            try:
+                reply = self._request(self._cmd_msg('set_event_codec', list(event_codecs)),
+                                      codec_timeout)
+                if reply in event_codecs:
+                    self.event_codec = reply
+            except InstrumentTimeoutException:
+                # events decode in any encoding, so a driver process that
+                # answers late still works
+                log.warning('Driver client got no event codec reply in %s seconds.',
+                            codec_timeout)
+                self._reconnect_cmd_socket()
+            log.info('Driver client event codec set to %s.', self.event_codec)
         log.info('Driver client messaging started.')
         
     def stop_messaging(self):
@@ -111,7 +188,7 @@ class ZmqDriverClient(DriverClient):
         
         self.zmq_cmd_socket.close()
         self.zmq_cmd_socket = None
-        self.zmq_context.term()
+        self._term_context(self.zmq_context)
         self.zmq_context = None
         self.stop_event_thread = True                    
         #self.event_thread.join()
@@ -129,9 +206,26 @@ class ZmqDriverClient(DriverClient):
         @param kwargs Keyword arguments of the command.
         @retval Command result.
         """
-        # Package command dictionary.
+        return self._request(self._cmd_msg(cmd, *args, **kwargs))
+
+    def _cmd_msg(self, cmd, *args, **kwargs):
+        """
+        Package a command dictionary.
+        """
         msg = {'cmd':cmd,'args':args,'kwargs':kwargs}
-        
+        if self.driver_id is not None:
+            msg['driver_id'] = self.driver_id
+        return msg
+
+    def _request(self, msg, timeout=None):
+        """
+        Send a command message and return the reply.
+        @param msg The command dictionary.
+        @param timeout Seconds to wait for the reply, None to wait until it
+        arrives.
+        @retval Command result.
+        @throws InstrumentTimeoutException if no reply arrives in time.
+        """
         log.debug('Sending command %s.' % str(msg))
         while True:
             try:
@@ -148,16 +242,14 @@ class ZmqDriverClient(DriverClient):
                 time.sleep(.5)
             
         log.debug('Awaiting reply.')
-        while True:
-            try:
-                # Attempt reply recv. Retry if necessary.
-                reply = self.zmq_cmd_socket.recv_pyobj(flags=zmq.NOBLOCK)
-                # Reply recieved, break and return.
-                break
-
-            except zmq.ZMQError:
-                # Socket not ready with the reply. Sleep and retry later.
-                time.sleep(.5)
+        if timeout is not None:
+            deadline = time.time() + timeout
+        while not wait_for_socket(self.zmq_cmd_socket, zmq.POLLIN):
+            # No reply yet, keep waiting.
+            if timeout is not None and time.time() >= deadline:
+                raise InstrumentTimeoutException('No reply to %s in %s seconds.'
+                                                 % (msg['cmd'], timeout))
+        reply = self.zmq_cmd_socket.recv_pyobj(flags=zmq.NOBLOCK)
                 
         log.debug('Reply: %s.' % str(reply))
         
@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.zmq_driver_host
+@file mi/core/instrument/zmq_driver_host.py
+@author Edward Hunter
+@brief A driver process hosting many drivers, using ZMQ messaging.
+"""
+
+__author__ = 'Edward Hunter'
+__license__ = 'Apache 2.0'
+
+"""
+To launch a host for two drivers:
+import mi.core.instrument.zmq_driver_host as zdh
+(p, cmd_port, evt_port) = zdh.ZmqDriverHost.launch_process(
+    [('ctd1', 'mi.instrument.seabird.sbe37smb.ooicore.driver', 'SBE37Driver'),
+     ('ctd2', 'mi.instrument.seabird.sbe37smb.ooicore.driver', 'SBE37Driver')])
+
+and a client for one of them:
+import mi.core.instrument.zmq_driver_client as zdc
+c = zdc.ZmqDriverClient('localhost', cmd_port, evt_port, driver_id='ctd1')
+"""
+
+from threading import Thread
+import uuid
+import Queue
+import traceback
+import cPickle as pickle
+
+import zmq
+
+from mi.core.exceptions import InstrumentCommandException
+
+import mi.core.instrument.driver_process as driver_process
+from mi.core.instrument.zmq_driver_process import ZmqDriverProcess, STOP_EVENT_THREAD, _encode_exception
+from mi.core.instrument.zmq_poll import wait_for_sockets
+from mi.core.instrument.zmq_codec import EventCodec, choose_event_codec, driver_event_topic
+from mi.core.instrument.zmq_codec import MAX_EVENT_BATCH
+from mi.core.instrument.port_agent_client import PortAgentClient, ListenerHub
+from mi.core.driver_scheduler import DriverScheduler
+from mi.core.log import get_logger
+log = get_logger()
+
+# Events of drivers whose client never picks an encoding are pickled
+DEFAULT_EVENT_CODEC = EventCodec()
+
+# The driver id of commands for the host itself.  A client with this id
+# subscribes to a topic no driver publishes on.
+DRIVER_HOST_ID = ''
+
+
+class ZmqDriverHost(ZmqDriverProcess):
+    """
+    A OS-level process running many drivers, so they share one interpreter,
+    one ZMQ context and one thread reading every port agent socket.
+    Commands arrive on a ROUTER socket and are routed by the 'driver_id' of
+    the message to a thread per driver, so a driver that is slow to reply
+    or raises only holds up its own commands.  Events of every driver are
+    published on one PUB socket, each message starting with the topic of
+    its driver.  Commands with the DRIVER_HOST_ID, or without a driver id,
+    are for the host itself.
+    """
+
+    @classmethod
+    def launch_process(cls, drivers, workdir='/tmp/', ppid=None):
+        """
+        Class method constructor to launch ZmqDriverHost as a separate OS
+        process.
+        @param drivers List of (driver id, driver module, driver class)
+        tuples of the drivers to host.
+        @param workdir The work directory when temporary port files are written.
+        @param ppid ID of the parent process, used to self destruct when
+        parent dies in test cases.
+        @retval Tuple containing (Popen object for the process, cmd port,
+            evt_port)
+        """
+        tag = str(uuid.uuid4())
+        cmd_port_fname = workdir + 'dvr_cmd_port_%s.txt' % tag
+        evt_port_fname = workdir + 'dvr_evt_port_%s.txt' % tag
+        cmd_str = 'from %s import %s; dp = %s(%r, "%s", "%s", %s);dp.run()' \
+            % (__name__, cls.__name__, cls.__name__, [tuple(driver) for driver in drivers],
+               cmd_port_fname, evt_port_fname, str(ppid))
+
+        host_proc = driver_process.DriverProcess.launch_process(cmd_str)
+        host_cmd_port = cls._read_port_file(cmd_port_fname)
+        host_evt_port = cls._read_port_file(evt_port_fname)
+
+        return (host_proc, host_cmd_port, host_evt_port)
+
+    def __init__(self, drivers, cmd_port_fname, evt_port_fname, ppid, inproc_name=None):
+        """
+        Zmq driver host constructor.
+        @param drivers List of (driver id, driver module, driver class)
+        tuples of the drivers to host.
+        @param cmd_port_fname Filename for temp cmd port file.
+        @param evt_port_fname Filename for temp evt port file.
+        @param ppid ID of the parent process, used to self destruct when
+        parent dies in test cases.
+        @param inproc_name If given, bind the sockets to inproc endpoints
+        with this name instead of to random TCP ports.
+        """
+        ZmqDriverProcess.__init__(self, None, None, cmd_port_fname, evt_port_fname, ppid,
+                                  inproc_name)
+        self.shared_context = True
+        self.driver_specs = list(drivers)
+        self.drivers = {}
+        self.event_codecs = {}
+        # command queues of the driver threads, only used by the command thread
+        self.driver_commands = {}
+        self.driver_threads = []
+        self.reply_host_string = 'inproc://driver_host_replies_%s' % id(self)
+        self.listener_hub = None
+
+    def construct_driver(self):
+        """
+        Import and construct every hosted driver. A driver that can not be
+        constructed is logged and left out. The drivers schedule their jobs
+        on the scheduler shared by the process.
+        @retval True if any driver was constructed, False otherwise.
+        """
+        DriverScheduler.use_shared_scheduler = True
+        for (driver_id, driver_module, driver_class) in self.driver_specs:
+            try:
+                driver = self.build_driver(driver_module, driver_class,
+                                           self._driver_event_callback(driver_id))
+            except Exception:
+                log.error('Driver %s raised constructing class %s: %s', driver_id, driver_class,
+                          traceback.format_exc())
+                driver = None
+
+            if driver is None:
+                log.error('Driver %s not hosted.', driver_id)
+            else:
+                self.drivers[driver_id] = driver
+
+        return len(self.drivers) > 0
+
+    def _driver_event_callback(self, driver_id):
+        """
+        Make the event callback of a driver, which tags its events with the
+        driver id.
+        """
+        def send_event(evt):
+            self.events.put((driver_id, evt))
+        return send_event
+
+    def start_messaging(self):
+        """
+        Initialize and start messaging resources for the hosted drivers.
+        Starts the port agent listener hub, binds the command ROUTER and
+        event PUB sockets, then starts the command and event threads and a
+        command thread for every driver.
+        """
+        def route_cmd_msgs(host, context, sock, reply_sock):
+            """
+            Await commands on a ZMQ ROUTER socket and pass each to the thread
+            of its driver, and await the replies of the driver threads and
+            return them to the client they are for. Commands for the host
+            itself, or for a driver it does not have, are replied to here.
+            """
+            while not host.stop_cmd_thread:
+                # wake up periodically to check the stop flag
+                ready = wait_for_sockets([sock, reply_sock])
+
+                if reply_sock in ready:
+                    frames = reply_sock.recv_multipart(flags=zmq.NOBLOCK)
+                    sock.send_multipart(frames[1:])
+                    driver_id = frames[0]
+                    if driver_id not in host.drivers and driver_id in host.driver_commands:
+                        # the driver was stopped, end its thread
+                        host.driver_commands.pop(driver_id).put(STOP_EVENT_THREAD)
+                        if not host.drivers:
+                            log.info('Driver host has no drivers left.')
+                            host.stop_messaging()
+
+                if sock in ready:
+                    frames = sock.recv_multipart(flags=zmq.NOBLOCK)
+                    envelope = frames[:-1]
+                    # a malformed message is replied to with the error, and
+                    # the host goes on with the next
+                    try:
+                        msg = pickle.loads(frames[-1])
+                        commands = host.driver_commands.get(msg.get('driver_id', None))
+                        if commands:
+                            commands.put((envelope, msg))
+                            continue
+                        reply = host.cmd_driver(msg)
+                    except Exception as e:
+                        log.error('Driver host could not handle a command: %s', traceback.format_exc())
+                        reply = e
+                    sock.send_multipart(envelope + [host._encode_reply(reply)])
+
+            for commands in host.driver_commands.values():
+                commands.put(STOP_EVENT_THREAD)
+            host.driver_commands = {}
+            reply_sock.close()
+            host._close_socket(context, sock)
+            log.info('Driver host cmd socket closed.')
+
+        def run_driver_cmds(host, driver_id, commands):
+            """
+            Await commands for one driver on its queue, run them and pass
+            the replies to the command thread.
+            """
+            sock = zmq.Context.instance().socket(zmq.PUSH)
+            sock.connect(host.reply_host_string)
+            while True:
+                item = commands.get()
+                if item is STOP_EVENT_THREAD:
+                    break
+
+                (envelope, msg) = item
+                try:
+                    reply = host.cmd_driver(msg)
+                except Exception as e:
+                    log.error('Driver %s could not handle a command: %s', driver_id, traceback.format_exc())
+                    reply = e
+                sock.send_multipart([driver_id] + envelope + [host._encode_reply(reply)])
+
+            sock.close()
+            log.info('Driver %s command thread done.', driver_id)
+
+        def send_evt_msgs(host, context, sock):
+            """
+            Await events on the host event queue and publish them on a ZMQ
+            PUB socket, in a message per driver with the driver topic first.
+            """
+            while not host.stop_evt_thread:
+                batch = [host.events.get()]
+                try:
+                    while len(batch) < MAX_EVENT_BATCH:
+                        batch.append(host.events.get_nowait())
+                except Queue.Empty:
+                    pass
+
+                messages = {}
+                for item in batch:
+                    if item is STOP_EVENT_THREAD:
+                        continue
+                    (driver_id, evt) = item
+                    codec = host.event_codecs.get(driver_id, DEFAULT_EVENT_CODEC)
+                    try:
+                        if isinstance(evt, Exception):
+                            evt = _encode_exception(evt)
+                        frame = codec.encode(evt)
+                    except Exception:
+                        log.error('Driver %s event dropped, it could not be encoded: %s', driver_id,
+                                  traceback.format_exc())
+                        continue
+                    if driver_id not in messages:
+                        messages[driver_id] = [driver_event_topic(driver_id)]
+                    messages[driver_id].append(frame)
+
+                for frames in messages.values():
+                    sock.send_multipart(frames)
+
+            host._close_socket(context, sock)
+            log.info('Driver host event socket closed')
+
+        self.listener_hub = ListenerHub()
+        PortAgentClient.listener_hub = self.listener_hub
+        self.listener_hub.start()
+
+        (cmd_context, cmd_sock, self.cmd_port) = self._bind_socket(zmq.ROUTER, self.cmd_host_string,
+                                                                   self.cmd_port_fname)
+        log.info('Driver host cmd socket bound to %s', self.cmd_port or self.cmd_host_string)
+        (evt_context, evt_sock, self.evt_port) = self._bind_socket(zmq.PUB, self.event_host_string,
+                                                                   self.evt_port_fname)
+        log.info('Driver host event socket bound to %s', self.evt_port or self.event_host_string)
+        # inproc endpoints must be bound before the driver threads connect
+        reply_sock = zmq.Context.instance().socket(zmq.PULL)
+        reply_sock.bind(self.reply_host_string)
+
+        self.stop_cmd_thread = False
+        self.stop_evt_thread = False
+        self.driver_threads = []
+        for driver_id in self.drivers:
+            commands = Queue.Queue()
+            self.driver_commands[driver_id] = commands
+            driver_thread = Thread(target=run_driver_cmds, args=(self, driver_id, commands))
+            driver_thread.daemon = True
+            self.driver_threads.append(driver_thread)
+            driver_thread.start()
+        self.cmd_thread = Thread(target=route_cmd_msgs, args=(self, cmd_context, cmd_sock, reply_sock))
+        self.evt_thread = Thread(target=send_evt_msgs, args=(self, evt_context, evt_sock))
+        self.cmd_thread.start()
+        self.evt_thread.start()
+        self.messaging_started = True
+
+    def _encode_reply(self, reply):
+        """
+        Pickle a command reply, encoding an exception as a triple.  A reply
+        that can not be pickled is replaced with the error.
+        """
+        if isinstance(reply, Exception):
+            reply = _encode_exception(reply)
+        try:
+            return pickle.dumps(reply, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            return pickle.dumps(_encode_exception(e), pickle.HIGHEST_PROTOCOL)
+
+    def _stop_driver(self, driver_id):
+        """
+        Stop hosting a driver.  The process goes on for the other drivers,
+        so the driver is disconnected from its port agent, the listener hub
+        stops reading its socket and its jobs are taken off the shared
+        scheduler.
+        @param driver_id The id of the driver to stop.
+        """
+        driver = self.drivers[driver_id]
+        # disconnecting drops the protocol
+        protocol = getattr(driver, '_protocol', None)
+        scheduler = getattr(protocol, '_scheduler', None)
+        disconnect = getattr(driver, 'disconnect', None)
+        if disconnect:
+            try:
+                disconnect()
+            except Exception as e:
+                # a driver that is not connected refuses to disconnect
+                log.debug('Driver %s not disconnected: %r', driver_id, e)
+
+        connection = getattr(driver, '_connection', None)
+        listener = getattr(connection, 'listener_thread', None)
+        if listener is not None and getattr(listener, 'hub', None):
+            listener.done()
+            listener.hub.remove(listener)
+
+        if scheduler is not None:
+            scheduler.shutdown()
+
+        del self.drivers[driver_id]
+        self.event_codecs.pop(driver_id, None)
+        log.info('Driver %s stopped.', driver_id)
+
+    def stop_messaging(self):
+        """
+        Close messaging resources for the host. Set flags to cause the
+        command and event threads to close sockets and conclude, which ends
+        the driver threads, and stop the listener hub.
+        """
+        ZmqDriverProcess.stop_messaging(self)
+        if self.listener_hub:
+            self.listener_hub.done()
+            if PortAgentClient.listener_hub is self.listener_hub:
+                PortAgentClient.listener_hub = None
+
+    def cmd_driver(self, msg):
+        """
+        Process a command message against the driver named by its
+        'driver_id', with the special messages handled per driver:
+        'stop_driver_process' - disconnect the driver and stop hosting it;
+        the host stops when its last driver does.
+        'set_event_codec' - publish the events of the driver with the first
+        encoding named in the argument list that is known here.
+        'test_events' - populate the event queue with test data for the
+        driver.
+        'process_echo' - echos the message back.
+        For the host itself, 'stop_driver_process' stops the host and
+        'process_echo' echos the hosted driver ids.
+        @param msg A driver command message.
+        @retval The driver command result.
+        """
+        cmd = msg.get('cmd', None)
+        args = msg.get('args', None)
+        kwargs = msg.get('kwargs', None)
+        driver_id = msg.get('driver_id', None)
+        log.debug("ZmqDriverHost.cmd_driver(): driver_id=%s, cmd=%s" % (driver_id, cmd))
+
+        if driver_id in (None, DRIVER_HOST_ID):
+            if cmd == 'stop_driver_process':
+                self.stop_messaging()
+                return 'stop_driver_process'
+            elif cmd == 'process_echo':
+                return 'ping from driver host ppid:%s, drivers:%s' % (str(self.ppid), sorted(self.drivers))
+            return InstrumentCommandException('Unknown driver host command.')
+
+        driver = self.drivers.get(driver_id, None)
+        if driver is None:
+            return InstrumentCommandException('Unknown driver %s.' % driver_id)
+
+        if cmd == 'stop_driver_process':
+            self._stop_driver(driver_id)
+            reply = 'stop_driver_process'
+        elif cmd == 'set_event_codec':
+            codec = choose_event_codec(args[0])
+            self.event_codecs[driver_id] = codec or DEFAULT_EVENT_CODEC
+            log.info('Driver %s event codec set to %s', driver_id, codec and codec.name)
+            reply = codec and codec.name
+        elif cmd == 'test_events':
+            for evt in kwargs['events']:
+                self.events.put((driver_id, evt))
+            reply = 'test_events'
+        elif cmd == 'process_echo':
+            reply = 'ping from resource ppid:%s, resource:%s' % (str(self.ppid), str(driver))
+        else:
+            reply = self.call_driver(driver, cmd, args, kwargs)
+
+        return reply
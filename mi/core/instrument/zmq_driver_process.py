@@ -24,6 +24,7 @@ import time
 import logging
 import sys
 import uuid
+import Queue
 
 import zmq
 
@@ -31,9 +32,14 @@ from ooi.exception import ApplicationException
 from mi.core.exceptions import InstrumentException, UnexpectedError
 
 import mi.core.instrument.driver_process as driver_process
+from mi.core.instrument.zmq_poll import wait_for_socket
+from mi.core.instrument.zmq_codec import choose_event_codec, MAX_EVENT_BATCH
 from mi.core.log import get_logger
 log = get_logger()
 
+# Put on the event queue to wake the event thread when messaging stops
+STOP_EVENT_THREAD = object()
+
 def _encode_exception(reply):
     if isinstance(reply, InstrumentException):
         # InstrumentExceptions have corresponding IonException error code built-in
@@ -78,30 +84,32 @@ class ZmqDriverProcess(driver_process.DriverProcess):
                 
         # Call base class launch method.
         dvr_proc = driver_process.DriverProcess.launch_process(cmd_str)
+        dvr_cmd_port = cls._read_port_file(cmd_port_fname)
+        dvr_evt_port = cls._read_port_file(evt_port_fname)
+
+        return (dvr_proc, dvr_cmd_port, dvr_evt_port)
+        
+    @staticmethod
+    def _read_port_file(port_fname):
+        """
+        Wait for a launched process to write a port file, then read and
+        remove it.
+        @param port_fname Filename for the temp port file.
+        @retval The port number.
+        """
         while True:
             try:                
-                cmd_port_file = file(cmd_port_fname, 'r')
-                dvr_cmd_port = int(cmd_port_file.read().strip())
-                cmd_port_file.close()
-                os.remove(cmd_port_fname)
-                break
-            
-            except IOError:
-                time.sleep(.1)
-        while True:
-            try:                
-                evt_port_file = file(evt_port_fname, 'r')
-                dvr_evt_port = int(evt_port_file.read().strip())
-                evt_port_file.close()
-                os.remove(evt_port_fname)
-                break
+                port_file = file(port_fname, 'r')
+                port = int(port_file.read().strip())
+                port_file.close()
+                os.remove(port_fname)
+                return port
             
             except IOError:
                 time.sleep(.1)
 
-        return (dvr_proc, dvr_cmd_port, dvr_evt_port)
-        
-    def __init__(self, driver_module, driver_class, cmd_port_fname, evt_port_fname, ppid):
+    def __init__(self, driver_module, driver_class, cmd_port_fname, evt_port_fname, ppid,
+                 inproc_name=None):
         """
         Zmq driver process constructor.
         @param driver_module The python module containing the driver code.
@@ -110,100 +118,145 @@ class ZmqDriverProcess(driver_process.DriverProcess):
         @param evt_port_fname Filename for temp evt port file.
         @param ppid ID of the parent process, used to self destruct when
         parent dies in test cases.        
+        @param inproc_name If given, bind the sockets to inproc endpoints
+        with this name in the shared ZMQ context instead of to random TCP
+        ports, so a client in the same process can connect to them in tests.
         """
         driver_process.DriverProcess.__init__(self, driver_module, driver_class, ppid)
         self.cmd_port = None
         self.cmd_port_fname = cmd_port_fname
         self.evt_port = None
         self.evt_port_fname = evt_port_fname
-        self.cmd_host_string = 'tcp://*'
-        self.event_host_string ='tcp://*'
+        self.inproc_name = inproc_name
+        # inproc endpoints are only reachable within a single context
+        self.shared_context = bool(inproc_name)
+        if inproc_name:
+            self.cmd_host_string = 'inproc://%s_cmd' % inproc_name
+            self.event_host_string = 'inproc://%s_evt' % inproc_name
+        else:
+            self.cmd_host_string = 'tcp://*'
+            self.event_host_string ='tcp://*'
         self.evt_thread = None
         self.stop_evt_thread = True
         self.cmd_thread = None
         self.stop_cmd_thread = True
-        
+        # events are sent with send_pyobj until a client picks an encoding
+        self.event_codec = None
+
+    def _bind_socket(self, socket_type, host_string, port_fname):
+        """
+        Create a socket and bind it to an inproc endpoint, or to a random
+        port that is written to the port file.
+        @param socket_type The ZMQ socket type.
+        @param host_string The endpoint, or the address to bind a random port on.
+        @param port_fname Filename for the temp port file.
+        @retval Tuple containing (context, socket, port), the port is None
+        for inproc sockets.
+        """
+        if self.shared_context:
+            context = zmq.Context.instance()
+        else:
+            context = zmq.Context()
+        sock = context.socket(socket_type)
+        if self.inproc_name:
+            sock.bind(host_string)
+            return (context, sock, None)
+
+        port = sock.bind_to_random_port(host_string)
+        file(port_fname,'w+').write(str(port)+'\n')
+        return (context, sock, port)
+
+    def _close_socket(self, context, sock):
+        """
+        Close a socket, and terminate its context unless it is the shared
+        one.
+        """
+        sock.close()
+        if not self.shared_context:
+            context.term()
+
     def start_messaging(self):
         """
         Initialize and start messaging resources for the driver, blocking
-        until messaging terminates. This ZMQ implementation starts and
-        joins command and event threads, managing nonblocking send/recv calls
-        on REP and PUB sockets, respectively. Terminate loops and close
-        sockets when stop flag is set in driver process.
+        until messaging terminates. This ZMQ implementation binds the
+        command REP and event PUB sockets, then starts and joins command and
+        event threads. The command thread waits on its socket and the event
+        thread on the event queue, so both react as soon as there is work.
+        Terminate loops and close sockets when stop flag is set in driver
+        process.
         """
-        def recv_cmd_msg(zmq_driver_process):
+        def recv_cmd_msg(zmq_driver_process, context, sock):
             """
             Await commands on a ZMQ REP socket, forwaring them to the
             driver for processing and returning the result.
             """
-            context = zmq.Context()
-            sock = context.socket(zmq.REP)
-            zmq_driver_process.cmd_port = sock.bind_to_random_port(zmq_driver_process.cmd_host_string)
-            log.info('Driver process cmd socket bound to %i' %
-                           zmq_driver_process.cmd_port)
-            file(zmq_driver_process.cmd_port_fname,'w+').write(str(zmq_driver_process.cmd_port)+'\n')
-
-            zmq_driver_process.stop_cmd_thread = False
             while not zmq_driver_process.stop_cmd_thread:
-                try:
-                    msg = sock.recv_pyobj(flags=zmq.NOBLOCK)
-                    #log.trace('Processing message %s', msg)
-                    reply = zmq_driver_process.cmd_driver(msg)
-                    # if operation raised exception, encode as triple
-                    if isinstance(reply, Exception):
-                        reply = _encode_exception(reply)
-                    # send, send, and resend
-                    while True:
-                        try:
-                            sock.send_pyobj(reply, flags=zmq.NOBLOCK)
+                # wake up periodically to check the stop flag
+                if not wait_for_socket(sock, zmq.POLLIN):
+                    continue
+
+                msg = sock.recv_pyobj(flags=zmq.NOBLOCK)
+                #log.trace('Processing message %s', msg)
+                reply = zmq_driver_process.cmd_driver(msg)
+                # if operation raised exception, encode as triple
+                if isinstance(reply, Exception):
+                    reply = _encode_exception(reply)
+                # send, send, and resend
+                while True:
+                    try:
+                        sock.send_pyobj(reply, flags=zmq.NOBLOCK)
+                        break
+                    except zmq.ZMQError:
+                        if zmq_driver_process.stop_cmd_thread:
                             break
-                        except zmq.ZMQError:
-                            time.sleep(.1)
-                            if zmq_driver_process.stop_cmd_thread:
-                                break
-                except zmq.ZMQError:
-                    time.sleep(.1)
-                
-            sock.close()
-            context.term()
+                        wait_for_socket(sock, zmq.POLLOUT)
+
+            zmq_driver_process._close_socket(context, sock)
             log.info('Driver process cmd socket closed.')
 
-        def send_evt_msg(zmq_driver_process):
+        def send_evt_msg(zmq_driver_process, context, sock):
             """
             Await events on the driver process event queue and publish them
             on a ZMQ PUB socket to the driver process client.
             """
-            context = zmq.Context()
-            sock = context.socket(zmq.PUB)
-            zmq_driver_process.evt_port = sock.bind_to_random_port(zmq_driver_process.event_host_string)
-            log.info('Driver process event socket bound to %i', zmq_driver_process.evt_port)
-            file(zmq_driver_process.evt_port_fname,'w+').write(str(zmq_driver_process.evt_port)+'\n')
-
-            zmq_driver_process.stop_evt_thread = False
             while not zmq_driver_process.stop_evt_thread:
-                try:
-                    evt = zmq_driver_process.events.pop(0)
-                    #log.trace('Event thread sending event %s',evt)
-                    while evt:
-                        try:
-                            if isinstance(evt, Exception):
-                                evt = _encode_exception(evt)
-                            sock.send_pyobj(evt, flags=zmq.NOBLOCK)
-                            evt = None
-                            log.trace('Event sent!')
-                        except zmq.ZMQError:
-                            time.sleep(.1)
-                            if zmq_driver_process.stop_evt_thread:
-                                break
-                except IndexError:
-                    time.sleep(.1)
-
-            sock.close()
-            context.term()
+                batch = [zmq_driver_process.events.get()]
+                codec = zmq_driver_process.event_codec
+                if codec:
+                    # publish whatever else is already queued with it
+                    try:
+                        while len(batch) < MAX_EVENT_BATCH:
+                            batch.append(zmq_driver_process.events.get_nowait())
+                    except Queue.Empty:
+                        pass
+
+                batch = [_encode_exception(evt) if isinstance(evt, Exception) else evt
+                         for evt in batch if evt is not STOP_EVENT_THREAD]
+                if not batch:
+                    continue
+                #log.trace('Event thread sending events %s', batch)
+                # publishing never blocks, messages beyond the high water
+                # mark are dropped
+                if codec:
+                    sock.send_multipart([codec.encode(evt) for evt in batch])
+                else:
+                    sock.send_pyobj(batch[0])
+                log.trace('Event sent!')
+
+            zmq_driver_process._close_socket(context, sock)
             log.info('Driver process event socket closed')
 
-        self.cmd_thread = Thread(target=recv_cmd_msg, args=(self, ))
-        self.evt_thread = Thread(target=send_evt_msg, args=(self, ))
+        (cmd_context, cmd_sock, self.cmd_port) = self._bind_socket(zmq.REP, self.cmd_host_string,
+                                                                   self.cmd_port_fname)
+        log.info('Driver process cmd socket bound to %s', self.cmd_port or self.cmd_host_string)
+        (evt_context, evt_sock, self.evt_port) = self._bind_socket(zmq.PUB, self.event_host_string,
+                                                                   self.evt_port_fname)
+        log.info('Driver process event socket bound to %s', self.evt_port or self.event_host_string)
+
+        self.stop_cmd_thread = False
+        self.stop_evt_thread = False
+        self.cmd_thread = Thread(target=recv_cmd_msg, args=(self, cmd_context, cmd_sock))
+        self.evt_thread = Thread(target=send_evt_msg, args=(self, evt_context, evt_sock))
         self.cmd_thread.start()        
         self.evt_thread.start()
         self.messaging_started = True
@@ -211,12 +264,30 @@ class ZmqDriverProcess(driver_process.DriverProcess):
     def stop_messaging(self):
         """
         Close messaging resource for the driver. Set flags to cause
-        command and event threads to close sockets and conclude.
+        command and event threads to close sockets and conclude, and wake
+        the event thread if it is waiting for an event.
         """
         self.stop_cmd_thread = True
         self.stop_evt_thread = True
+        self.events.put(STOP_EVENT_THREAD)
         self.messaging_started = False
     
+    def cmd_driver(self, msg):
+        """
+        Process a command message against the driver. In addition to the
+        special messages handled by the base class:
+        'set_event_codec' - publish events with the first encoding named in
+        the argument list that is known here, replying with its name or None
+        if none are known.
+        @param msg A driver command message.
+        @retval The driver command result.
+        """
+        if msg.get('cmd', None) == 'set_event_codec':
+            self.event_codec = choose_event_codec(msg['args'][0])
+            log.info('Driver process event codec set to %s', self.event_codec and self.event_codec.name)
+            return self.event_codec and self.event_codec.name
+        return driver_process.DriverProcess.cmd_driver(self, msg)
+
     def shutdown(self):
         """
         Shutdown function prior to process exit.
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.zmq_poll
+@file mi/core/instrument/zmq_poll.py
+@author Edward Hunter
+@brief Blocking waits on ZMQ sockets shared by the ZMQ driver process and
+client.  The wait selects on the socket's file descriptor, so it yields to
+other greenlets when gevent has patched select, and sleeps in the kernel in
+plain threads, instead of polling a nonblocking socket between sleeps.
+"""
+
+__author__ = 'Edward Hunter'
+__license__ = 'Apache 2.0'
+
+import time
+import select
+
+import zmq
+
+# Seconds a wait blocks before the caller checks whether it should stop
+POLL_TIMEOUT = .1
+
+
+def wait_for_socket(sock, event, timeout=POLL_TIMEOUT):
+    """
+    Wait until a ZMQ socket can receive or send without blocking.
+    @param sock The ZMQ socket.
+    @param event zmq.POLLIN to wait for a message, zmq.POLLOUT to wait until
+    a message can be sent.
+    @param timeout The most seconds to wait.
+    @retval True if the socket is ready, False if the timeout passed first.
+    """
+    fd = sock.getsockopt(zmq.FD)
+    deadline = time.time() + timeout
+    # the descriptor only signals that the socket state changed, so the
+    # socket events are checked before every wait
+    while not (sock.getsockopt(zmq.EVENTS) & event):
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
+        select.select([fd], [], [], remaining)
+    return True
+
+
+def wait_for_sockets(socks, timeout=POLL_TIMEOUT):
+    """
+    Wait until any of several ZMQ sockets has a message to receive.
+    @param socks The ZMQ sockets.
+    @param timeout The most seconds to wait.
+    @retval The list of sockets with a message, empty if the timeout passed
+    first.
+    """
+    fds = [sock.getsockopt(zmq.FD) for sock in socks]
+    deadline = time.time() + timeout
+    while True:
+        ready = [sock for sock in socks if sock.getsockopt(zmq.EVENTS) & zmq.POLLIN]
+        remaining = deadline - time.time()
+        if ready or remaining <= 0:
+            return ready
+        select.select(fds, [], [], remaining)
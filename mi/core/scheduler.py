@@ -46,6 +46,15 @@ job = scheduler.add_polled_job(some_callback, test_name, min_interval, max_inter
 
 scheduler.run_polled_job(test_name)
 
+Drivers in the same process can share one scheduler, and its thread pool:
+
+scheduler = PolledScheduler.instance()
+
+The next run time of every job is kept in a heap, so the scheduler thread
+only looks at the jobs that are due when it wakes, and adding or removing a
+job takes logarithmic time.  Removed jobs are marked in the heap and dropped
+when they reach the top.
+
 This module extends the Advanced Python Scheduler:
 @see http://packages.python.org/APScheduler
 """
@@ -56,28 +65,209 @@ __license__ = 'Apache 2.0'
 from datetime import timedelta
 from datetime import datetime
 from math import ceil
+from collections import OrderedDict
+from threading import Lock
+import heapq
+import itertools
 
 from apscheduler.scheduler import Scheduler
 from apscheduler.scheduler import JobStoreEvent
 from apscheduler.scheduler import EVENT_JOBSTORE_JOB_ADDED
 from apscheduler.job import Job
+from apscheduler.jobstores.ram_store import RAMJobStore
 
 from apscheduler.util import convert_to_datetime, timedelta_seconds
 
 from mi.core.log import get_logger; log = get_logger()
 
+# Heap entry fields
+ENTRY_TIME = 0
+ENTRY_JOB = 2
+ENTRY_ALIAS = 3
+ENTRY_STORE = 4
+
+class PolledJobStore(RAMJobStore):
+    """
+    Stores jobs in RAM, in the order they were added, with constant time
+    removal.
+    """
+    def __init__(self):
+        self._jobs = OrderedDict()
+
+    @property
+    def jobs(self):
+        return self._jobs.values()
+
+    def add_job(self, job):
+        self._jobs[id(job)] = job
+
+    def remove_job(self, job):
+        del self._jobs[id(job)]
+
 class PolledScheduler(Scheduler):
     """
     Specialized advanced scheduler that allows for polled interval
     jobs.
     """
+    _instance = None
+    _instance_lock = Lock()
+
+    @classmethod
+    def instance(cls):
+        """
+        The scheduler shared by every driver in the process that asks for
+        it, started on first use.
+        @return: running PolledScheduler
+        """
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance._stopped:
+                cls._instance = cls()
+                cls._instance.start()
+            return cls._instance
+
     def __init__(self):
         """
         ensure we are running in daemon mode, so we won't wait for 
         unfinished threads on shutdown
         """
+        # [next run time, sequence, job, alias, jobstore] of the jobs that run
+        # on their own, ordered by run time
+        self._heap = []
+        # entries marked removed that may still be in the heap
+        self._removed = 0
+        # heap entry of every job by id, including jobs not in the heap
+        self._entries = {}
+        self._sequence = itertools.count()
+        self._polled_jobs = {}
+        self._jobs_by_func = {}
         Scheduler.__init__(self, {'demonic': True})
 
+    def start(self):
+        """
+        Start the scheduler, with a job store that removes jobs in constant
+        time as the default.
+        """
+        if not 'default' in self._jobstores:
+            self.add_jobstore(PolledJobStore(), 'default', True)
+        Scheduler.start(self)
+
+    def add_jobstore(self, jobstore, alias, quiet=False):
+        """
+        Add a job store, scheduling any jobs it already has.
+        """
+        Scheduler.add_jobstore(self, jobstore, alias, quiet)
+        self._jobstores_lock.acquire()
+        try:
+            for job in tuple(jobstore.jobs):
+                self._index_job(job, alias, jobstore)
+        finally:
+            self._jobstores_lock.release()
+
+    def remove_jobstore(self, alias, close=True):
+        """
+        Remove a job store, unscheduling its jobs.
+        """
+        self._jobstores_lock.acquire()
+        try:
+            jobstore = self._jobstores.get(alias)
+            for entry in self._entries.values():
+                if entry[ENTRY_STORE] is jobstore:
+                    self._unindex_job(entry[ENTRY_JOB])
+        finally:
+            self._jobstores_lock.release()
+        Scheduler.remove_jobstore(self, alias, close)
+
+    def _index_job(self, job, alias, jobstore):
+        """
+        Record a job added to a job store and push its next run time, if it
+        has one, on the heap.  Call with the jobstores lock held.
+        """
+        self._jobs_by_func.setdefault(job.func, {})[id(job)] = job
+        if isinstance(job, PolledIntervalJob):
+            self._polled_jobs[job.name] = job
+        self._push_job(job, alias, jobstore)
+
+    def _push_job(self, job, alias, jobstore):
+        """
+        Replace the heap entry of a job with one for its current next run
+        time.  Call with the jobstores lock held.
+        """
+        entry = self._entries.get(id(job))
+        if entry:
+            self._mark_removed(entry)
+        entry = [job.next_run_time, next(self._sequence), job, alias, jobstore]
+        self._entries[id(job)] = entry
+        if job.next_run_time:
+            heapq.heappush(self._heap, entry)
+
+    def _unindex_job(self, job):
+        """
+        Forget a job removed from its job store, marking its heap entry
+        removed.  Call with the jobstores lock held.
+        """
+        entry = self._entries.pop(id(job), None)
+        if entry:
+            self._mark_removed(entry)
+        jobs = self._jobs_by_func.get(job.func)
+        if jobs is not None:
+            jobs.pop(id(job), None)
+            if not jobs:
+                del self._jobs_by_func[job.func]
+        if self._polled_jobs.get(job.name) is job:
+            del self._polled_jobs[job.name]
+
+    def _mark_removed(self, entry):
+        """
+        Mark a heap entry removed, and rebuild the heap without removed
+        entries once they make up most of it.  Call with the jobstores lock
+        held.
+        """
+        entry[ENTRY_JOB] = None
+        if entry[ENTRY_TIME] is None:
+            # never pushed
+            return
+        self._removed += 1
+        if self._removed > len(self._heap) / 2 + 64:
+            self._heap = [heap_entry for heap_entry in self._heap if heap_entry[ENTRY_JOB] is not None]
+            heapq.heapify(self._heap)
+            self._removed = 0
+
+    def _remove_job(self, job, alias, jobstore):
+        self._unindex_job(job)
+        Scheduler._remove_job(self, job, alias, jobstore)
+
+    def unschedule_job(self, job):
+        """
+        Removes a job, preventing it from being run any more.
+        """
+        self._jobstores_lock.acquire()
+        try:
+            entry = self._entries.get(id(job))
+            if entry:
+                self._remove_job(job, entry[ENTRY_ALIAS], entry[ENTRY_STORE])
+                return
+        finally:
+            self._jobstores_lock.release()
+
+        raise KeyError('Job "%s" is not scheduled in any job store' % job)
+
+    def unschedule_func(self, func):
+        """
+        Removes all jobs that would execute the given function.
+        """
+        self._jobstores_lock.acquire()
+        try:
+            jobs = self._jobs_by_func.get(func, {}).values()
+            for job in jobs:
+                entry = self._entries[id(job)]
+                self._remove_job(job, entry[ENTRY_ALIAS], entry[ENTRY_STORE])
+        finally:
+            self._jobstores_lock.release()
+
+        if not jobs:
+            raise KeyError('The given function is not scheduled in this '
+                           'scheduler')
+
     @staticmethod
     def interval(weeks=0, days=0, hours=0, minutes=0, seconds=0):
         """
@@ -148,6 +338,8 @@ class PolledScheduler(Scheduler):
                 self._threadpool.submit(self._run_job, job, [datetime.now()])
                 job.compute_next_run_time(now)
                 jobstore.update_job(job)
+                # the automatic run moves out to max interval from now
+                self._push_job(job, alias, jobstore)
                 return True
             else:
                 log.debug("Job '%s' is *NOT* ready to run" % job.name)
@@ -164,10 +356,10 @@ class PolledScheduler(Scheduler):
         @param name: name of the job we are looking for
         @return: Tuple containing (job, alias, jobstore)
         """
-        for (alias, jobstore) in self._jobstores.items():
-            for job in tuple(jobstore.jobs):
-                if(isinstance(job, PolledIntervalJob) and name == job.name):
-                    return (job, alias, jobstore)
+        job = self._polled_jobs.get(name)
+        if job:
+            entry = self._entries[id(job)]
+            return (job, entry[ENTRY_ALIAS], entry[ENTRY_STORE])
 
         return (None, None, None)
 
@@ -178,42 +370,52 @@ class PolledScheduler(Scheduler):
         @param name: name of the job we are looking for
         @return: PolledIntervalJob with the matching name or None if not found.
         """
-        for (alias, jobstore) in self._jobstores.items():
-            for job in tuple(jobstore.jobs):
-                if(isinstance(job, PolledIntervalJob) and name == job.name):
-                    return job
-
-        return None
+        return self._polled_jobs.get(name)
 
     def _process_jobs(self, now, polled=False):
         """
-        Iterates through jobs in every jobstore, starts pending jobs
-        and figures out the next wakeup time.
+        Pops the jobs that are due off the heap, starts them and pushes
+        their next run time back, then returns the earliest next run time
+        of any job as the next wakeup time.
         """
         log.debug("_process_jobs started")
-        next_wakeup_time = None
-        next_polled_wakeup_time = None
         self._jobstores_lock.acquire()
         try:
             log.debug("_process_jobs lock acquired")
-            for (alias, jobstore) in self._jobstores.items():
-                for job in tuple(jobstore.jobs):
-                    log.debug("_process_jobs process job %s" % job)
+            while self._heap:
+                entry = self._heap[0]
+                job = entry[ENTRY_JOB]
+                if job is not None and entry[ENTRY_TIME] > now:
+                    break
+
+                heapq.heappop(self._heap)
+                if job is None:
+                    # removed or rescheduled since it was pushed
+                    self._removed -= 1
+                    continue
+                # the entry is out of the heap, nothing to mark when the job
+                # is pushed again
+                self._entries[id(job)] = None
+
+                log.debug("_process_jobs process job %s" % job)
+                try:
                     if(isinstance(job, PolledIntervalJob)):
-                        next_polled_wakeup_time = self._process_polled_job(job, now, alias, jobstore)
+                        self._process_polled_job(job, now, entry[ENTRY_ALIAS], entry[ENTRY_STORE])
                     else:
-                        next_wakeup_time = self._process_original_job(job, now, alias, jobstore)
-
-            log.debug("_process_jobs loop complete")
-            log.debug("_process_jobs next polled wakeup %s" % next_polled_wakeup_time)
+                        self._process_original_job(job, now, entry[ENTRY_ALIAS], entry[ENTRY_STORE])
+                except Exception:
+                    log.error("_process_jobs failed to process job %s, unscheduling it" % job, exc_info=True)
+                finally:
+                    # a job neither pushed back nor removed would be lost to
+                    # the heap but never leave the job store
+                    if id(job) in self._entries and self._entries[id(job)] is None:
+                        self._remove_job(job, entry[ENTRY_ALIAS], entry[ENTRY_STORE])
+
+            next_wakeup_time = None
+            if self._heap:
+                next_wakeup_time = self._heap[0][ENTRY_TIME]
             log.debug("_process_jobs next wakeup %s" % next_wakeup_time)
-
-            if(next_polled_wakeup_time and next_wakeup_time):
-                return min(next_polled_wakeup_time, next_wakeup_time)
-            elif(next_wakeup_time == None):
-                return next_polled_wakeup_time
-            else:
-                return next_wakeup_time
+            return next_wakeup_time
         finally:
             self._jobstores_lock.release()
             log.debug("_process_jobs lock released")
@@ -223,8 +425,6 @@ class PolledScheduler(Scheduler):
         """
         Process jobs of class Job.  This mirrors the original code in the base class
         """
-        next_wakeup_time=None
-
         run_times = job.get_run_times(now)
         if run_times:
             if(not self._threadpool._shutdown):
@@ -236,47 +436,33 @@ class PolledScheduler(Scheduler):
             else:
                 job.runs += len(run_times)
 
-            # Update the job, but don't keep finished jobs around
-            if job.compute_next_run_time(now + timedelta(microseconds=1)):
-                jobstore.update_job(job)
-            else:
-                self._remove_job(job, alias, jobstore)
-
-        if not next_wakeup_time:
-            next_wakeup_time = job.next_run_time
-        elif job.next_run_time:
-            next_wakeup_time = min(next_wakeup_time, job.next_run_time)
-
-        return next_wakeup_time
+        # Update the job, but don't keep finished jobs around
+        if job.compute_next_run_time(now + timedelta(microseconds=1)):
+            jobstore.update_job(job)
+            self._push_job(job, alias, jobstore)
+        else:
+            self._remove_job(job, alias, jobstore)
 
     def _process_polled_job(self, job, now, alias, jobstore):
         """
         Process polled job which we created for this specialized scheduler
         """
-        next_wakeup_time=job.trigger.get_next_fire_time()
+        next_run_time=job.trigger.get_next_fire_time()
 
-        if not next_wakeup_time == None and next_wakeup_time <= now:
+        if not next_run_time == None and next_run_time <= now:
             log.debug("submit job to pool: %s" % job)
             if(not self._threadpool._shutdown):
-                self._threadpool.submit(self._run_job, job, [next_wakeup_time])
+                self._threadpool.submit(self._run_job, job, [next_run_time])
 
             # Increase the job's run count
-            if job.coalesce:
-                job.runs += 1
-            else:
-                job.runs += len(run_times)
+            job.runs += 1
 
             # Update the job.  We don't remove any polled jobs automatically
             job.trigger.pull_trigger()
-            job.compute_next_run_time(now + timedelta(microseconds=1))
-            jobstore.update_job(job)
-
-        if not next_wakeup_time:
-            next_wakeup_time = job.next_run_time
-        elif job.next_run_time:
-            next_wakeup_time = min(next_wakeup_time, job.next_run_time)
 
-        return next_wakeup_time
+        job.compute_next_run_time(now + timedelta(microseconds=1))
+        jobstore.update_job(job)
+        self._push_job(job, alias, jobstore)
 
     def _real_add_job(self, job, jobstore, wakeup):
         """
@@ -289,18 +475,19 @@ class PolledScheduler(Scheduler):
         if not isinstance(job, PolledIntervalJob) and not job.next_run_time:
             raise ValueError('Not adding job since it would never be run')
 
-        # We DO want to raise an exception if we already have a polled interval job
-        # with the same name as the one we are trying to add.
-        if isinstance(job, PolledIntervalJob) and self.get_polled_job(job.name):
-            raise ValueError("Not adding job since a job named '%s' already exists" % job.name)
-
         self._jobstores_lock.acquire()
         try:
+            # We DO want to raise an exception if we already have a polled interval job
+            # with the same name as the one we are trying to add.
+            if isinstance(job, PolledIntervalJob) and self.get_polled_job(job.name):
+                raise ValueError("Not adding job since a job named '%s' already exists" % job.name)
+
             try:
                 store = self._jobstores[jobstore]
             except KeyError:
                 raise KeyError('No such job store: %s' % jobstore)
             store.add_job(job)
+            self._index_job(job, jobstore, store)
         finally:
             self._jobstores_lock.release()
 
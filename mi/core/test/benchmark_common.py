@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.test.benchmark_common
+@file mi/core/test/benchmark_common.py
+@author Steve Foley
+@brief Compare BaseEnum list, dict and has with the values kept by the enum
+metaclass against walking dir(cls) on every call, as they did before, using
+the 300+ keys of the CG STC engineering particle.
+
+Usage: python -m mi.core.test.benchmark_common
+"""
+
+__author__ = 'Steve Foley'
+__license__ = 'Apache 2.0'
+
+import timeit
+
+from mi.dataset.parser.cg_stc_eng_stc import CgStcEngStcParserDataParticleKey
+
+ITERATIONS = 1000
+
+
+def dir_list(cls):
+    return [getattr(cls,attr) for attr in dir(cls) if\
+            not callable(getattr(cls,attr)) and not attr.startswith('__')]
+
+def dir_dict(cls):
+    result = {}
+    for attr in dir(cls):
+        if not callable(getattr(cls,attr)) and not attr.startswith('__'):
+            result[attr] = getattr(cls,attr)
+    return result
+
+def dir_has(cls, item):
+    return item in dir_list(cls)
+
+
+def run():
+    enum = CgStcEngStcParserDataParticleKey
+    item = enum.CG_ENG_PLATFORM_TIME
+    cases = [
+        ("list", lambda: dir_list(enum), enum.list),
+        ("dict", lambda: dir_dict(enum), enum.dict),
+        ("has", lambda: dir_has(enum, item), lambda: enum.has(item)),
+        ("has miss", lambda: dir_has(enum, 'missing'), lambda: enum.has('missing')),
+    ]
+
+    print "%d values, %d calls each" % (len(enum.list()), ITERATIONS)
+    print "%10s %12s %12s %9s" % ("call", "dir sec", "cached sec", "speedup")
+    for (name, old, new) in cases:
+        assert old() == new()
+        old_time = timeit.timeit(old, number=ITERATIONS)
+        new_time = timeit.timeit(new, number=ITERATIONS)
+        print "%10s %12.4f %12.4f %8.1fx" % (name, old_time, new_time, old_time / new_time)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.test.benchmark_scheduler
+@file mi/core/test/benchmark_scheduler.py
+@author Bill French
+@brief Compare the APScheduler scheduler, which scans every job each time it
+wakes, with the PolledScheduler job heap for many interval and date jobs.
+Reports the time to add the jobs, to wake with nothing due, to run the jobs
+that are due and to remove jobs.
+
+Usage: python -m mi.core.test.benchmark_scheduler
+"""
+
+__author__ = 'Bill French'
+__license__ = 'Apache 2.0'
+
+import time
+from datetime import datetime, timedelta
+
+from apscheduler.scheduler import Scheduler
+from apscheduler.jobstores.ram_store import RAMJobStore
+from apscheduler.job import Job
+from apscheduler.triggers import IntervalTrigger, SimpleTrigger
+
+from mi.core.scheduler import PolledScheduler, PolledJobStore
+
+JOBS = 10000
+
+# Jobs due in the run test, and removed in the remove test
+DUE = 100
+REMOVED = 1000
+
+# Wakeups with nothing due
+WAKEUPS = 100
+
+
+def callback():
+    pass
+
+
+def make_jobs(start):
+    """
+    Build half interval and half date jobs, one a second from start.
+    """
+    jobs = []
+    for i in range(JOBS):
+        run_date = start + timedelta(seconds=i)
+        if i % 2:
+            trigger = IntervalTrigger(timedelta(hours=1), run_date)
+        else:
+            trigger = SimpleTrigger(run_date)
+        jobs.append(Job(trigger, callback, [], {}, 1, True))
+    return jobs
+
+
+def timed(scheduler, jobstore):
+    """
+    Time each operation on a scheduler that has not been started, so its
+    thread is not waking up at the same time.
+    @retval Tuple of seconds to (add, wake, run, remove)
+    """
+    scheduler.add_jobstore(jobstore, 'default', True)
+    start = datetime.now() + timedelta(hours=1)
+    jobs = make_jobs(start)
+
+    begin = time.time()
+    for job in jobs:
+        scheduler._real_add_job(job, 'default', False)
+    add_time = time.time() - begin
+
+    now = datetime.now()
+    begin = time.time()
+    for i in range(WAKEUPS):
+        scheduler._process_jobs(now)
+    wake_time = (time.time() - begin) / WAKEUPS
+
+    begin = time.time()
+    scheduler._process_jobs(start + timedelta(seconds=DUE - 1))
+    run_time = time.time() - begin
+
+    begin = time.time()
+    for job in jobs[-REMOVED:]:
+        scheduler.unschedule_job(job)
+    remove_time = time.time() - begin
+
+    scheduler._threadpool.shutdown()
+    return (add_time, wake_time, run_time, remove_time)
+
+
+def run():
+    print "%d jobs, %d due, %d removed" % (JOBS, DUE, REMOVED)
+    print "%14s %12s %12s %12s %12s" % ("", "add s", "wake s", "run s", "remove s")
+    for (name, scheduler, jobstore) in (("apscheduler", Scheduler(), RAMJobStore()),
+                                        ("heap", PolledScheduler(), PolledJobStore())):
+        print "%14s %12.4f %12.4f %12.4f %12.4f" % ((name,) + timed(scheduler, jobstore))
+
+
+if __name__ == '__main__':
+    run()
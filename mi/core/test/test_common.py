@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.test.test_common
+@file mi/core/test/test_common.py
+@author Steve Foley
+@brief Unit tests for the common MI classes
+"""
+
+__author__ = 'Steve Foley'
+__license__ = 'Apache 2.0'
+
+from nose.plugins.attrib import attr
+
+from mi.core.unit_test import MiUnitTest
+from mi.core.common import BaseEnum
+
+
+class BaseFooEnum(BaseEnum):
+    VALUE1 = "Value 1"
+    VALUE2 = "Value 2"
+
+class ExtendedFooEnum(BaseFooEnum):
+    VALUE3 = "Value 3"
+    LIST_VALUE = ["a", "b"]
+
+    def method(self):
+        pass
+
+
+@attr('UNIT', group='mi')
+class TestBaseEnum(MiUnitTest):
+    """
+    Test the BaseEnum class methods
+    """
+    def test_values(self):
+        """
+        Test list, dict and has on an enum and an enum extending it
+        """
+        self.assertEqual(BaseFooEnum.list(), ["Value 1", "Value 2"])
+        self.assertEqual(BaseFooEnum.dict(), {"VALUE1": "Value 1", "VALUE2": "Value 2"})
+        self.assertTrue(BaseFooEnum.has("Value 1"))
+        self.assertFalse(BaseFooEnum.has("Value 3"))
+        self.assertFalse(BaseFooEnum.has({}))
+
+        self.assertEqual(ExtendedFooEnum.list(), [["a", "b"], "Value 1", "Value 2", "Value 3"])
+        self.assertEqual(sorted(ExtendedFooEnum.dict().keys()),
+                         ["LIST_VALUE", "VALUE1", "VALUE2", "VALUE3"])
+        self.assertTrue(ExtendedFooEnum.has("Value 1"))
+        self.assertTrue(ExtendedFooEnum.has("Value 3"))
+        self.assertTrue(ExtendedFooEnum.has(["a", "b"]))
+        self.assertFalse(ExtendedFooEnum.has("method"))
+
+        # the results are copies the caller may change
+        BaseFooEnum.list().append("Value 3")
+        BaseFooEnum.dict()["VALUE3"] = "Value 3"
+        self.assertEqual(BaseFooEnum.list(), ["Value 1", "Value 2"])
+        self.assertFalse(BaseFooEnum.has("Value 3"))
+
+    def test_set_attribute(self):
+        """
+        Test the values are found again after an enum changes
+        """
+        class FooEnum(BaseEnum):
+            VALUE1 = "Value 1"
+
+        class BarEnum(FooEnum):
+            VALUE2 = "Value 2"
+
+        self.assertEqual(BarEnum.list(), ["Value 1", "Value 2"])
+
+        FooEnum.VALUE0 = "Value 0"
+        self.assertEqual(FooEnum.list(), ["Value 0", "Value 1"])
+        self.assertEqual(BarEnum.list(), ["Value 0", "Value 1", "Value 2"])
+        self.assertTrue(BarEnum.has("Value 0"))
+
+        del FooEnum.VALUE0
+        self.assertFalse(FooEnum.has("Value 0"))
+        self.assertFalse(BarEnum.has("Value 0"))
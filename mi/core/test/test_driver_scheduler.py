@@ -195,6 +195,87 @@ class TestDriverScheduler(MiUnitTest):
         # Check the automatic trigger again
         self.assert_event_triggered()
 
+    def test_shared_scheduler(self):
+        """
+        Test drivers sharing a scheduler can use the same polled job names
+        """
+        test_name = 'polled_job'
+        second_triggered = []
+        config = {
+            test_name: {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.POLLED_INTERVAL,
+                    DriverSchedulerConfigKey.MINIMAL_INTERVAL: {DriverSchedulerConfigKey.SECONDS: 1},
+                },
+                DriverSchedulerConfigKey.CALLBACK: self._callback
+            }
+        }
+        self._scheduler = DriverScheduler(config, shared=True)
+
+        config[test_name][DriverSchedulerConfigKey.CALLBACK] = lambda: second_triggered.append(datetime.datetime.now())
+        second_scheduler = DriverScheduler(config, shared=True)
+        self.assertIs(self._scheduler._scheduler, second_scheduler._scheduler)
+
+        self.assertTrue(self._scheduler.run_job(test_name))
+        self.assert_event_triggered()
+        self.assertEqual(second_triggered, [])
+
+        self.assertTrue(second_scheduler.run_job(test_name))
+        self.assertFalse(self._scheduler.run_job(test_name))
+        time.sleep(.5)
+        self.assertEqual(len(second_triggered), 1)
+        self.assertEqual(self._triggered, [])
+
+        self._scheduler.remove_job(self._callback)
+        self.assertRaises(LookupError, self._scheduler.run_job, test_name)
+        self.assertFalse(second_scheduler.run_job(test_name))
+
+    def test_shutdown(self):
+        """
+        Test shutting down a scheduler sharing the process scheduler only
+        unschedules its own jobs, and shutting down one of its own stops it.
+        """
+        test_name = 'interval_job'
+        second_triggered = []
+        config = {
+            test_name: {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.INTERVAL,
+                    DriverSchedulerConfigKey.SECONDS: 1
+                },
+                DriverSchedulerConfigKey.CALLBACK: self._callback
+            },
+            'polled_job': {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.POLLED_INTERVAL,
+                    DriverSchedulerConfigKey.MINIMAL_INTERVAL: {DriverSchedulerConfigKey.SECONDS: 1},
+                },
+                DriverSchedulerConfigKey.CALLBACK: self._callback
+            }
+        }
+        first_scheduler = DriverScheduler(config, shared=True)
+        config[test_name][DriverSchedulerConfigKey.CALLBACK] = lambda: second_triggered.append(datetime.datetime.now())
+        second_scheduler = DriverScheduler(config, shared=True)
+        self.assertNotEqual(first_scheduler._name_prefix, second_scheduler._name_prefix)
+
+        first_scheduler.shutdown()
+        self.assertRaises(LookupError, first_scheduler.run_job, 'polled_job')
+        self.assertTrue(second_scheduler.run_job('polled_job'))
+        self.assertTrue(second_scheduler._scheduler.running)
+        time.sleep(2)
+        self.assertGreater(len(second_triggered), 0)
+        # only the polled job of the second scheduler calls this one
+        self.assertEqual(len(self._triggered), 1)
+        jobs = second_scheduler._jobs
+        self.assertEqual(len(jobs), 2)
+        second_scheduler.shutdown()
+        for job in jobs:
+            self.assertNotIn(job, second_scheduler._scheduler.get_jobs())
+
+        self._scheduler = DriverScheduler(config)
+        self._scheduler.shutdown()
+        self.assertFalse(self._scheduler._scheduler.running)
+
     ###
     #   Negative Testing For All Job Types
     ###
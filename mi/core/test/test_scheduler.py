@@ -367,3 +367,110 @@ class TestScheduler(MiUnitTest):
         self.assertFalse(job.ready_to_run())
         self.assert_datetime_close(next_time, now + max_interval)
 
+
+####################################################################################################
+#  Test the job heap
+####################################################################################################
+    def test_next_wakeup(self):
+        """
+        Verify the next wakeup is the earliest run time of any kind of job,
+        and moves out when that job is removed.
+        """
+        now = datetime.datetime.now()
+        date_time = now + datetime.timedelta(seconds=100)
+        interval_time = now + datetime.timedelta(seconds=50)
+
+        self._scheduler.add_date_job(self._callback, date_time)
+        interval_job = self._scheduler.add_interval_job(self._callback, seconds=50, start_date=interval_time)
+        polled_job = self._scheduler.add_polled_job(self._callback, 'polled', PolledScheduler.interval(seconds=1),
+                                                    PolledScheduler.interval(seconds=30))
+        polled_time = polled_job.next_run_time
+        self.assert_datetime_close(polled_time, now + datetime.timedelta(seconds=30))
+
+        self.assertEqual(self._scheduler._process_jobs(now), polled_time)
+        self.assertEqual(len(self._triggered), 0)
+
+        self._scheduler.unschedule_job(polled_job)
+        self.assertIsNone(self._scheduler.get_polled_job('polled'))
+        self.assertEqual(self._scheduler._process_jobs(now), interval_time)
+
+        self._scheduler.unschedule_func(self._callback)
+        self.assertEqual(self._scheduler.get_jobs(), [])
+        self.assertIsNone(self._scheduler._process_jobs(now))
+        self.assertRaises(KeyError, self._scheduler.unschedule_job, interval_job)
+
+    def test_due_jobs(self):
+        """
+        Verify only the jobs that are due are run, and a finished date job is
+        dropped while an interval job is rescheduled.
+        """
+        now = datetime.datetime.now()
+        later = now + datetime.timedelta(seconds=100)
+        self._scheduler.add_date_job(self._callback, later)
+        self._scheduler.add_interval_job(self._callback, seconds=10, start_date=later)
+        self._scheduler.add_date_job(self._callback, now + datetime.timedelta(seconds=200))
+
+        next_wakeup = self._scheduler._process_jobs(later)
+        self.assertEqual(next_wakeup, later + datetime.timedelta(seconds=10))
+        self.assertEqual(len(self._scheduler.get_jobs()), 2)
+        self.assert_event_triggered()
+        self.assert_event_triggered()
+
+    def test_removed_jobs_compacted(self):
+        """
+        Verify removed jobs do not pile up in the heap.
+        """
+        start = datetime.datetime.now() + datetime.timedelta(seconds=100)
+        jobs = [self._scheduler.add_interval_job(self._callback, seconds=i + 1, start_date=start)
+                for i in range(500)]
+        self.assertEqual(len(self._scheduler._heap), 500)
+
+        for job in jobs[1:]:
+            self._scheduler.unschedule_job(job)
+        self.assertEqual(len(self._scheduler.get_jobs()), 1)
+        self.assertLess(len(self._scheduler._heap), 200)
+        self.assertEqual(self._scheduler._process_jobs(datetime.datetime.now()), start)
+        self.assertEqual(self._scheduler._removed, len(self._scheduler._heap) - 1)
+
+        # removed entries are dropped as they reach the top of the heap
+        self._scheduler.unschedule_job(jobs[0])
+        self.assertIsNone(self._scheduler._process_jobs(datetime.datetime.now()))
+        self.assertEqual(self._scheduler._heap, [])
+        self.assertEqual(self._scheduler._removed, 0)
+
+    def test_failed_job_removed(self):
+        """
+        Verify a job whose trigger raises while it is processed is
+        unscheduled, and the other due jobs still run.
+        """
+        class FailingTrigger(object):
+            def __init__(self, run_date):
+                self.run_date = run_date
+
+            def get_next_fire_time(self, start_date):
+                if start_date > self.run_date:
+                    raise ValueError('trigger failed')
+                return self.run_date
+
+        now = datetime.datetime.now()
+        later = now + datetime.timedelta(seconds=100)
+        failing_job = self._scheduler.add_job(FailingTrigger(later), self._callback, [], {})
+        self._scheduler.add_date_job(self._callback, later)
+
+        self.assertIsNone(self._scheduler._process_jobs(later + datetime.timedelta(seconds=1)))
+        self.assertEqual(self._scheduler.get_jobs(), [])
+        self.assertRaises(KeyError, self._scheduler.unschedule_job, failing_job)
+        self.assert_event_triggered()
+
+    def test_shared_instance(self):
+        """
+        Verify the shared scheduler is started once, and replaced once it
+        has been shut down.
+        """
+        scheduler = PolledScheduler.instance()
+        self.assertTrue(scheduler.running)
+        self.assertIs(PolledScheduler.instance(), scheduler)
+
+        scheduler.shutdown()
+        self.assertIsNot(PolledScheduler.instance(), scheduler)
+        self.assertTrue(PolledScheduler.instance().running)
@@ -13,7 +13,6 @@ __license__ = 'Apache 2.0'
 import os
 import gevent
 import shutil
-import hashlib
 import copy
 import traceback
 
@@ -35,6 +34,8 @@ from mi.core.instrument.driver_dict import DriverDict
 from mi.core.instrument.protocol_param_dict import ParameterDictType
 from mi.core.instrument.protocol_param_dict import Parameter
 from mi.core.common import BaseEnum
+from mi.dataset.file_fingerprint import file_checksum
+from mi.dataset.ingest_pool import IngestPool, replay_parser_events
 
 class DataSourceConfigKey(BaseEnum):
     HARVESTER = 'harvester'
@@ -109,6 +110,11 @@ class DataSetDriverConfigKeys(BaseEnum):
     PATTERN = "pattern"
     FREQUENCY = "frequency"
     FILE_MOD_WAIT_TIME = "file_mod_wait_time"
+    CHANGE_DETECTION = "change_detection"
+    INGEST_WORKERS = "ingest_workers"
+    CHECKPOINT_RECORDS = "checkpoint_records"
+    CHECKPOINT_BYTES = "checkpoint_bytes"
+    CHECKPOINT_INTERVAL = "checkpoint_interval"
     HARVESTER = "harvester"
     PARSER = "parser"
     MODULE = "module"
@@ -139,6 +145,7 @@ class DataSetDriver(object):
             'pattern': '*.txt',
             'frequency': 1,
             'file_mod_wait_time': 30,
+            'ingest_workers': 4,
         },
         'parser': {}
         'driver': {
@@ -453,9 +460,7 @@ class DataSetDriver(object):
         to the payload of the event.
         """
         s = os.stat(name)
-        checksum = ""
-        with open(name, 'rb') as filehandle:
-            checksum = hashlib.md5(filehandle.read()).hexdigest()
+        checksum = file_checksum(name)
 
         stats = {
             'name': name,
@@ -540,6 +545,8 @@ class SimpleDataSetDriver(DataSetDriver):
             #    errors.append("harvester config missing 'storage_directory")
             if not self._harvester_config.get(DataSetDriverConfigKeys.PATTERN):
                 errors.append("harvester config missing 'pattern")
+            if not self._valid_ingest_workers(self._harvester_config):
+                errors.append("harvester config 'ingest_workers' must be an integer 1 or greater")
         else:
             errors.append("missing 'harvester' config")
 
@@ -549,6 +556,13 @@ class SimpleDataSetDriver(DataSetDriver):
 
         self._parser_config = self._config.get(DataSourceConfigKey.PARSER)
 
+    @staticmethod
+    def _valid_ingest_workers(harvester_config):
+        """
+        Check the optional number of files to parse at once in worker processes
+        """
+        workers = harvester_config.get(DataSetDriverConfigKeys.INGEST_WORKERS)
+        return workers is None or (isinstance(workers, int) and workers >= 1)
 
     def _poll(self):
         """
@@ -559,7 +573,13 @@ class SimpleDataSetDriver(DataSetDriver):
         log.trace("Checking for new files in queue, count: %d", count)
         if(count > 0):
             log.debug("New file detected, resource_id: %s, array addr: %s", self._resource_id, id(self._new_file_queue))
-            self._got_file(self._new_file_queue.pop(0))
+            if self._harvester_config.get(DataSetDriverConfigKeys.INGEST_WORKERS):
+                # parse all the queued files in worker processes
+                file_names = self._new_file_queue[:]
+                del self._new_file_queue[:]
+                self._got_files(file_names)
+            else:
+                self._got_file(self._new_file_queue.pop(0))
 
     def _stage_input_file(self, path):
         """
@@ -658,6 +678,64 @@ class SimpleDataSetDriver(DataSetDriver):
         finally:
             self._file_in_process = None
 
+    def _got_files(self, file_names):
+        """
+        We have several files that we want to parse.  Parse them at once in worker processes, then
+        publish the records and save the parser state one file at a time in the order they were found.
+        If that stops early, the files not started on go back on the new file queue.
+        @param file_names: names of the files to parse
+        """
+        directory = self._harvester_config.get(DataSetDriverConfigKeys.DIRECTORY)
+        workers = self._harvester_config.get(DataSetDriverConfigKeys.INGEST_WORKERS)
+
+        count = 1
+        delay = None
+
+        if self._generate_particle_count:
+            # Calculate the delay between grabbing records to publish.
+            delay = float(1) / float(self._particle_count_per_second) * float(self._generate_particle_count)
+            count = self._generate_particle_count
+
+        jobs = [(os.path.join(directory, file_name), (self._driver_state[file_name][DriverStateKey.PARSER_STATE],), count)
+                for file_name in file_names]
+        results = IngestPool(self, workers).parse(jobs)
+
+        started = 0
+        try:
+            for file_name in file_names:
+                started += 1
+                result = next(results)
+                if result is None:
+                    # the worker could not parse this file, parse it here
+                    self._got_file(file_name)
+                    continue
+
+                (events, error) = result
+                try:
+                    self._file_in_process = file_name
+                    self._raise_new_file_event(os.path.join(directory, file_name))
+                    replay_parser_events(events, self._data_callback, self._save_parser_state,
+                                         self._sample_exception_callback, delay)
+                    if error:
+                        # need to mark the bad file as ingested so we don't re-ingest it
+                        self._save_parser_state_after_error()
+                        self._sample_exception_callback(error)
+                finally:
+                    self._file_in_process = None
+        finally:
+            results.close()
+            # _poll took every file off the queue, put back the ones not started on
+            self._requeue_files(file_names[started:], self._new_file_queue)
+
+    @staticmethod
+    def _requeue_files(file_names, queue):
+        """
+        Put files back at the front of a new file queue, ahead of files found since
+        @param file_names: names of the files to put back, in order
+        @param queue: the new file queue
+        """
+        queue[0:0] = [file_name for file_name in file_names if file_name not in queue]
+
     def _save_parser_state(self, state, file_ingested):
         """
         Callback to store the parser state in the driver object.
@@ -710,8 +788,7 @@ class SimpleDataSetDriver(DataSetDriver):
             full_file_path = os.path.join(self._harvester_config[DataSetDriverConfigKeys.DIRECTORY], file_name)
             mod_time = os.path.getmtime(full_file_path)
             file_size = os.path.getsize(full_file_path)
-            with open(full_file_path, 'rb') as filehandle:
-                md5_checksum = hashlib.md5(filehandle.read()).hexdigest()
+            md5_checksum = file_checksum(full_file_path)
             self._driver_state[file_name] = {
                 DriverStateKey.FILE_SIZE: file_size,
                 DriverStateKey.FILE_MOD_DATE: mod_time,
@@ -1058,7 +1135,13 @@ class MultipleHarvesterDataSetDriver(SimpleDataSetDriver):
         if(count > 0):
             log.debug("New file detected, resource_id: %s, array addr: %s", self._resource_id,
                       id(self._new_file_queue[data_key]))
-            self._got_file(self._new_file_queue[data_key].pop(0), data_key)
+            if self._harvester_config[data_key].get(DataSetDriverConfigKeys.INGEST_WORKERS):
+                # parse all the queued files in worker processes
+                file_names = self._new_file_queue[data_key][:]
+                del self._new_file_queue[data_key][:]
+                self._got_files(file_names, data_key)
+            else:
+                self._got_file(self._new_file_queue[data_key].pop(0), data_key)
 
     def _poll_single_file(self, data_key, filename):
         """
@@ -1121,6 +1204,73 @@ class MultipleHarvesterDataSetDriver(SimpleDataSetDriver):
         finally:
             self._file_in_process[data_key] = None
 
+    def _got_files(self, file_names, data_key):
+        """
+        We have several files from the single directory harvester that we want to parse.  Parse them
+        at once in worker processes, then publish the records and save the parser state one file at
+        a time in the order they were found.  If that stops early, the files not started on go back
+        on the new file queue.
+        @param file_names names of the files to parse
+        @param data_key The key to index into the harvester and parser
+        """
+        directory = self._harvester_config[data_key].get(DataSetDriverConfigKeys.DIRECTORY)
+        workers = self._harvester_config[data_key].get(DataSetDriverConfigKeys.INGEST_WORKERS)
+
+        count = 1
+        delay = None
+
+        if self._generate_particle_count:
+            # Calculate the delay between grabbing records to publish.
+            delay = float(1) / float(self._particle_count_per_second) * float(self._generate_particle_count)
+            count = self._generate_particle_count
+
+        def jobs():
+            for file_name in file_names:
+                # pre_parse runs here, just before the worker for this file starts
+                self._file_in_process[data_key] = file_name
+                self.pre_parse(filename=file_name, data_key=data_key)
+                self._file_in_process[data_key] = None
+                parser_state = self._driver_state[data_key][file_name][DriverStateKey.PARSER_STATE]
+                yield (os.path.join(directory, file_name), (parser_state, data_key), count)
+        results = IngestPool(self, workers).parse(jobs())
+
+        started = 0
+        try:
+            for file_name in file_names:
+                started += 1
+                result = next(results)
+                if result is None:
+                    # the worker could not parse this file, parse it here
+                    self._file_in_process[data_key] = file_name
+                    try:
+                        self._get_parser_results(file_name, data_key)
+                    except SampleException as e:
+                        self._driver_state[data_key][file_name][DriverStateKey.INGESTED] = True
+                        self._state_callback(self._driver_state)
+                        self._sample_exception_callback(e)
+                    finally:
+                        self._file_in_process[data_key] = None
+                    continue
+
+                (events, error) = result
+                try:
+                    self._file_in_process[data_key] = file_name
+                    self._raise_new_file_event(os.path.join(directory, file_name))
+                    replay_parser_events(events, self._data_callback, self._save_parser_state,
+                                         self._sample_exception_callback, delay)
+                    if error:
+                        # need to mark the bad file as ingested so we don't re-ingest it
+                        log.debug("File %s fully parsed", file_name)
+                        self._driver_state[data_key][file_name][DriverStateKey.INGESTED] = True
+                        self._state_callback(self._driver_state)
+                        self._sample_exception_callback(error)
+                finally:
+                    self._file_in_process[data_key] = None
+        finally:
+            results.close()
+            # _poll took every file off the queue, put back the ones not started on
+            self._requeue_files(file_names[started:], self._new_file_queue[data_key])
+
     def _got_single_file(self, file_name, data_key):
         """
         We got a file from the single file harvester that we want to parse.  Initialize the
@@ -1252,8 +1402,7 @@ class MultipleHarvesterDataSetDriver(SimpleDataSetDriver):
             full_file_path = os.path.join(self._harvester_config[data_key][DataSetDriverConfigKeys.DIRECTORY], file_name)
             mod_time = os.path.getmtime(full_file_path)
             file_size = os.path.getsize(full_file_path)
-            with open(full_file_path, 'rb') as filehandle:
-                md5_checksum = hashlib.md5(filehandle.read()).hexdigest()
+            md5_checksum = file_checksum(full_file_path)
             self._driver_state[data_key][file_name] = {
                 DriverStateKey.FILE_SIZE: file_size,
                 DriverStateKey.FILE_MOD_DATE: mod_time,
@@ -1302,6 +1451,8 @@ class MultipleHarvesterDataSetDriver(SimpleDataSetDriver):
                     errors.append("harvester %s config missing 'directory" % key)
                 if not sub_config.get(DataSetDriverConfigKeys.PATTERN):
                     errors.append("harvester %s config missing 'pattern" % key)
+                if not self._valid_ingest_workers(sub_config):
+                    errors.append("harvester %s config 'ingest_workers' must be an integer 1 or greater" % key)
         else:
             errors.append("missing 'harvester' config")
 
@@ -17,7 +17,7 @@ import ntplib
 from mi.core.log import get_logger
 log = get_logger()
 from mi.core.instrument.chunker import StringChunker
-from mi.core.instrument.data_particle import DataParticleKey
+from mi.core.instrument.data_particle import DataParticleKey, ParticleBatch
 from mi.core.exceptions import RecoverableSampleException, SampleEncodingException
 from mi.core.exceptions import NotImplementedException, UnexpectedDataException
 from mi.dataset.dataset_driver import DataSetDriverConfigKeys
@@ -127,8 +127,9 @@ class Parser(object):
                 if self._new_sequence:
                     self._new_sequence = False
 
-                # need to actually parse the particle fields to find out of there are errors
-                particle.generate()
+                # need to actually parse the particle fields to find out of there are errors,
+                # the dict is kept by the particle so publishing does not parse them again
+                particle.generate_dict()
                 encoding_errors = particle.get_encoding_errors()
                 if encoding_errors:
                     log.warn("Failed to encode: %s", encoding_errors)
@@ -144,12 +145,84 @@ class Parser(object):
         return particle
 
 
+class StateCheckpointPolicy(object):
+    """
+    Decide when a parser passes its state on to the driver.  The driver
+    persists the state each time, so saving it after every record is costly
+    for large files.  A save is due once enough records have been published,
+    the byte offset in the state has moved far enough or enough time has
+    passed since the last save, whichever comes first.  With no limits configured every state is
+    saved.  The records published since the last save are the ones that
+    would be published again if the driver restarted now.
+    """
+    def __init__(self, records=None, byte_count=None, interval=None):
+        """
+        @param records Save after this many records have been published
+        @param byte_count Save after the byte offset has moved this many bytes
+        @param interval Save after this many seconds
+        """
+        self._records = records
+        self._byte_count = byte_count
+        self._interval = interval
+        self.unsaved_records = 0
+        self._saved_position = None
+        self._saved_time = time.time()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build the policy from the checkpoint keys of a parser configuration
+        """
+        return cls(config.get(DataSetDriverConfigKeys.CHECKPOINT_RECORDS),
+                   config.get(DataSetDriverConfigKeys.CHECKPOINT_BYTES),
+                   config.get(DataSetDriverConfigKeys.CHECKPOINT_INTERVAL))
+
+    def published(self, record_count, position=None):
+        """
+        Count newly published records and check if the state should be saved
+        @param record_count The number of records published
+        @param position The byte offset of the state, if known
+        @retval True if a save is due
+        """
+        self.unsaved_records += record_count
+        if self._records is None and self._byte_count is None and self._interval is None:
+            return True
+        if self._records is not None and self.unsaved_records >= self._records:
+            return True
+        if self._byte_count is not None and position is not None and \
+           position - (self._saved_position or 0) >= self._byte_count:
+            return True
+        if self._interval is not None and time.time() - self._saved_time >= self._interval:
+            return True
+        return False
+
+    def saved(self, position=None):
+        """
+        The state has been passed to the driver
+        @param position The byte offset of the saved state, if known
+        """
+        self.unsaved_records = 0
+        self._saved_position = position
+        self._saved_time = time.time()
+
+
 class BufferLoadingParser(Parser):
     """
     This class loads data values into a record buffer, then offers up
     records from this buffer as they are requested. Parsers dont have
     to operate this way, but it can keep memory in check and smooth out
     stream inputs if they dont all come at once.
+
+    The record buffer holds (particle, state) tuples.  A parser that decodes
+    many records at once may put a (ParticleBatch, state) tuple in it
+    instead, where state is the state after the last record of the batch.
+    A batch is yanked as a whole and expanded into particles only when it
+    is published.  Batches must be added with _buffer_records, so the
+    records they hold are counted.
+
+    The state is passed to the driver as the StateCheckpointPolicy built from
+    the config decides, and always when the file has been ingested, when
+    parsing stops on an exception and when no records are left.
     """
 
     def __init__(self, config, stream_handle, state, sieve_fn,
@@ -172,13 +245,28 @@ class BufferLoadingParser(Parser):
            be published into ION
         """
         self._record_buffer = []
+        # records held in the buffered batches past the first of each batch
+        self._batched_record_count = 0
         self._timestamp = 0.0
         self.file_complete = False
+        self._checkpoint = StateCheckpointPolicy.from_config(config)
+        # the state of the last published records, and if it is not saved yet
+        self._published_state = None
+        self._state_pending = False
 
         super(BufferLoadingParser, self).__init__(config, stream_handle, state,
                                                   sieve_fn, state_callback,
                                                   publish_callback,
                                                   exception_callback)
+        self._checkpoint.saved(self._state_position(state))
+
+    @property
+    def unsaved_record_count(self):
+        """
+        The number of published records whose state has not been passed to
+        the driver, which would be published again if the driver restarted
+        """
+        return self._checkpoint.unsaved_records
 
     def get_records(self, num_records):
         """
@@ -191,11 +279,48 @@ class BufferLoadingParser(Parser):
         if num_records <= 0:
             return []
         try:
-            while len(self._record_buffer) < num_records:
-                self._load_particle_buffer()        
-        except EOFError:
-            self._process_end_of_file()
-        return self._yank_particles(num_records)
+            try:
+                while self._buffered_record_count() < num_records:
+                    self._load_particle_buffer()
+            except EOFError:
+                self._process_end_of_file()
+            records = self._yank_particles(num_records)
+        except:
+            # parsing stops here, don't lose the state of what was published
+            self.save_state()
+            raise
+        if not records:
+            self.save_state()
+        return records
+
+    def save_state(self):
+        """
+        Pass the state of the published records to the driver if it has not
+        been passed yet
+        """
+        if self._state_pending:
+            self._send_state(False)
+
+    def _send_state(self, file_ingested):
+        log.trace("Sending parser state [%s] to driver, %d records since the last state",
+                  self._published_state, self._checkpoint.unsaved_records)
+        self._state_pending = False
+        self._checkpoint.saved(self._state_position(self._published_state))
+        self._state_callback(self._published_state, file_ingested)  # push new state to driver
+
+    def _state_position(self, state):
+        """
+        The byte offset into the file a state holds, used by the checkpoint
+        policy.  Most parser states hold it as their 'position', overload this
+        if it is kept differently.
+        @param state The parser state
+        @retval The byte offset, or None if the state has none
+        """
+        if isinstance(state, dict):
+            return state.get('position')
+        if isinstance(state, (int, long)):
+            return state
+        return None
 
     def _process_end_of_file(self):
         """
@@ -210,6 +335,26 @@ class BufferLoadingParser(Parser):
             log.warn("Have extra unexplained data chunk bytes at the end of the file:%s", chunk)
             raise UnexpectedDataException("Have extra unexplained data chunk bytes at the end of the file:%s" % chunk)
 
+    def _buffered_record_count(self):
+        """
+        @retval The number of records in the record buffer, counting every
+        record of a batch
+        """
+        if not self._record_buffer:
+            # parsers may empty the buffer themselves when their state is set
+            self._batched_record_count = 0
+        return len(self._record_buffer) + self._batched_record_count
+
+    def _buffer_records(self, records):
+        """
+        Add (record, state) tuples to the end of the record buffer
+        @param records A list of (particle, state) or (ParticleBatch, state) tuples
+        """
+        for (record, state) in records:
+            if isinstance(record, ParticleBatch):
+                self._batched_record_count += len(record) - 1
+        self._record_buffer.extend(records)
+
     def _yank_particles(self, num_records):
         """
         Get particles out of the buffer and publish them. Update the state
@@ -217,32 +362,46 @@ class BufferLoadingParser(Parser):
         @param num_records The number of particles to remove from the buffer
         @retval A list with num_records elements from the buffer. If num_records
         cannot be collected (perhaps due to an EOF), the list will have the
-        elements it was able to collect.
+        elements it was able to collect.  Batches are not split, so the list
+        may hold more than num_records elements when the last entry yanked
+        is a batch.
         """
-        if len(self._record_buffer) < num_records:
-            num_to_fetch = len(self._record_buffer)
-        else:
-            num_to_fetch = num_records
+        num_entries = 0
+        num_to_fetch = 0
+        for (record, state) in self._record_buffer:
+            if num_to_fetch >= num_records:
+                break
+            num_entries += 1
+            if isinstance(record, ParticleBatch):
+                num_to_fetch += len(record)
+                self._batched_record_count -= len(record) - 1
+            else:
+                num_to_fetch += 1
         log.trace("Yanking %s records of %s requested",
                   num_to_fetch,
                   num_records)
 
         return_list = []
-        records_to_return = self._record_buffer[:num_to_fetch]
-        self._record_buffer = self._record_buffer[num_to_fetch:]
+        records_to_return = self._record_buffer[:num_entries]
+        self._record_buffer = self._record_buffer[num_entries:]
         if len(records_to_return) > 0:
             self._state = records_to_return[-1][1]  # state side of tuple of last entry
             # strip the state info off of them now that we have what we need
             for item in records_to_return:
                 log.debug("Record to return: %s", item)
-                return_list.append(item[0])
+                if isinstance(item[0], ParticleBatch):
+                    return_list.extend(item[0])
+                else:
+                    return_list.append(item[0])
             self._publish_sample(return_list)
-            log.trace("Sending parser state [%s] to driver", self._state)
+            self._published_state = self._state
+            self._state_pending = True
             file_ingested = False
             if self.file_complete and len(self._record_buffer) == 0:
                 # file has been read completely and all records pulled out of the record buffer
                 file_ingested = True
-            self._state_callback(self._state, file_ingested)  # push new state to driver
+            if self._checkpoint.published(len(return_list), self._state_position(self._state)) or file_ingested:
+                self._send_state(file_ingested)
 
         return return_list
 
@@ -253,7 +412,7 @@ class BufferLoadingParser(Parser):
         """
         while self.get_block():
             result = self.parse_chunks()
-            self._record_buffer.extend(result)
+            self._buffer_records(result)
 
     def get_block(self, size=1024):
         """
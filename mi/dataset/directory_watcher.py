@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.directory_watcher
+@file mi/dataset/directory_watcher.py
+@author Emily Hahn
+@brief Change detection for the files of one directory that match a
+wildcard.  A watcher reports the files that are new or changed since they
+were last reported, so a harvester only looks at those instead of every
+file in the directory.  The stat watcher stats every file once per check
+and compares it to the (inode, size, mtime) it last reported.  The inotify
+watcher only stats the files the kernel reported events for.
+"""
+
+__author__ = 'Emily Hahn'
+__license__ = 'Apache 2.0'
+
+import os
+import glob
+import errno
+import struct
+import fnmatch
+import ctypes
+import ctypes.util
+
+from mi.core.log import get_logger ; log = get_logger()
+from mi.core.common import BaseEnum
+
+
+class DirectoryWatcherType(BaseEnum):
+    STAT = 'stat'
+    INOTIFY = 'inotify'
+
+
+class StatDirectoryWatcher(object):
+    """
+    Find changed files by listing the directory and comparing the
+    (inode, size, mtime) of each file to the one it had when it was last
+    reported.
+    """
+    def __init__(self, directory, wildcard):
+        """
+        @param directory The directory to watch
+        @param wildcard The glob pattern the file names must match
+        """
+        self._directory = directory
+        self._wildcard = wildcard
+        # file name -> (inode, size, mtime) when it was last reported
+        self._reported = {}
+
+    def changed_files(self):
+        """
+        Find the files that are new or changed since they were last reported
+        @retval A list of (file name, stat result) tuples
+        """
+        if not os.path.isdir(self._directory):
+            self._reported.clear()
+            return []
+
+        names = glob.glob1(self._directory, self._wildcard)
+        for name in set(self._reported).difference(names):
+            del self._reported[name]
+        return self._stat_files(names)
+
+    def forget(self, file_name):
+        """
+        Report the file again on the next check even if it has not changed,
+        for instance because it was too recently modified to be handled.
+        @param file_name The name of the file in the directory
+        """
+        self._reported.pop(file_name, None)
+
+    def close(self):
+        pass
+
+    def _stat_files(self, names):
+        changed = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self._directory, name))
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+                # removed since the directory was read
+                self._reported.pop(name, None)
+                continue
+
+            key = (stat.st_ino, stat.st_size, stat.st_mtime)
+            if self._reported.get(name) != key:
+                self._reported[name] = key
+                changed.append((name, stat))
+        return changed
+
+    def _matches(self, name):
+        """
+        Match a file name the way glob does, hidden files only match a
+        wildcard that starts with a dot
+        """
+        if name.startswith('.') and not self._wildcard.startswith('.'):
+            return False
+        return fnmatch.fnmatch(name, self._wildcard)
+
+
+class InotifyDirectoryWatcher(StatDirectoryWatcher):
+    """
+    Find changed files from the events Linux inotify queues for the
+    directory.  The directory is listed on the first check and again if the
+    event queue overflows or the watch is lost, otherwise only the files
+    named in events, and those forgotten, are looked at.
+    """
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = 02000000
+
+    WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | \
+                 IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+    EVENT_HEADER = struct.Struct('iIII')
+    READ_SIZE = 65536
+
+    _libc = None
+
+    def __init__(self, directory, wildcard):
+        """
+        @param directory The directory to watch
+        @param wildcard The glob pattern the file names must match
+        @throws OSError if inotify is not available
+        """
+        super(InotifyDirectoryWatcher, self).__init__(directory, wildcard)
+        libc = self._get_libc()
+        self._fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self._watch = -1
+        # names to look at on the next check
+        self._pending = set()
+        self._rescan = True
+
+    @classmethod
+    def _get_libc(cls):
+        if cls._libc is None:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            if not hasattr(libc, 'inotify_init1'):
+                raise OSError(errno.ENOSYS, "inotify is not available")
+            cls._libc = libc
+        return cls._libc
+
+    def changed_files(self):
+        """
+        Find the files that are new or changed since they were last reported
+        @retval A list of (file name, stat result) tuples
+        """
+        self._read_events()
+
+        if self._watch < 0:
+            if not os.path.isdir(self._directory):
+                self._reported.clear()
+                return []
+            self._watch = self._libc.inotify_add_watch(self._fd, self._directory, self.WATCH_MASK)
+            if self._watch < 0:
+                error = ctypes.get_errno()
+                raise OSError(error, os.strerror(error), self._directory)
+            # events before the watch was added were missed
+            self._rescan = True
+
+        if self._rescan:
+            self._rescan = False
+            self._pending.clear()
+            return super(InotifyDirectoryWatcher, self).changed_files()
+
+        names = sorted(self._pending)
+        self._pending.clear()
+        return self._stat_files(names)
+
+    def forget(self, file_name):
+        super(InotifyDirectoryWatcher, self).forget(file_name)
+        self._pending.add(file_name)
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _read_events(self):
+        while True:
+            try:
+                data = os.read(self._fd, self.READ_SIZE)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return
+                raise
+            if not data:
+                return
+
+            offset = 0
+            while offset < len(data):
+                (watch, mask, cookie, length) = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip('\0')
+                offset += length
+
+                if mask & self.IN_Q_OVERFLOW:
+                    self._rescan = True
+                elif mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF | self.IN_IGNORED):
+                    # the directory itself is gone, watch it again when it is back
+                    if watch == self._watch:
+                        self._libc.inotify_rm_watch(self._fd, self._watch)
+                        self._watch = -1
+                elif name and self._matches(name):
+                    self._pending.add(name)
+
+
+def get_directory_watcher(directory, wildcard, watcher_type=None):
+    """
+    Build a watcher for the files of a directory.
+    @param directory The directory to watch
+    @param wildcard The glob pattern the file names must match
+    @param watcher_type A DirectoryWatcherType, by default inotify is used
+       when it is available and the stat watcher otherwise
+    @retval A directory watcher
+    @throws ValueError if the watcher type is unknown
+    """
+    if watcher_type is not None and not DirectoryWatcherType.has(watcher_type):
+        raise ValueError("unknown directory watcher type %s" % watcher_type)
+
+    if watcher_type in (None, DirectoryWatcherType.INOTIFY):
+        try:
+            return InotifyDirectoryWatcher(directory, wildcard)
+        except (OSError, AttributeError) as e:
+            if watcher_type == DirectoryWatcherType.INOTIFY:
+                raise
+            log.debug("inotify not available, using the stat watcher: %s", e)
+
+    return StatDirectoryWatcher(directory, wildcard)
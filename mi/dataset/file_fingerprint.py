@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.file_fingerprint
+@file mi/dataset/file_fingerprint.py
+@author Emily Hahn
+@brief MD5 checksums of harvested files calculated in fixed size blocks so
+memory use does not grow with the file.  A fingerprint keeps the hash of the
+part of the file it has already read, so a file that is only ever appended
+to, like the file followed by a SingleFilePoller, is brought up to date by
+hashing the appended bytes.
+"""
+
+__author__ = 'Emily Hahn'
+__license__ = 'Apache 2.0'
+
+import os
+import hashlib
+
+# number of bytes read and hashed at a time
+BLOCK_SIZE = 65536
+
+# number of bytes in each block of the hashed prefix that is compared to
+# confirm the prefix has not changed
+SAMPLE_SIZE = 4096
+
+# number of blocks compared between the first and last blocks of the prefix
+SAMPLE_COUNT = 16
+
+
+def file_checksum(path):
+    """
+    Calculate the MD5 checksum of a file, reading it one block at a time
+    @param path The path of the file
+    @retval The hex digest of the file contents
+    """
+    md5 = hashlib.md5()
+    with open(path, 'rb') as filehandle:
+        _hash_blocks(filehandle, md5)
+    return md5.hexdigest()
+
+
+def _hash_blocks(filehandle, md5):
+    """
+    Hash the file from the current position to the end
+    @retval The number of bytes hashed
+    """
+    hashed = 0
+    while True:
+        data = filehandle.read(BLOCK_SIZE)
+        if not data:
+            return hashed
+        md5.update(data)
+        hashed += len(data)
+
+
+class FileFingerprint(object):
+    """
+    The MD5 checksum of a file that can be brought up to date after the file
+    grows by hashing only the new bytes.  The MD5 state of the prefix
+    already read is kept with the fingerprint, along with the digest of
+    sampled blocks of that prefix: the first and last SAMPLE_SIZE bytes and
+    SAMPLE_COUNT blocks spread evenly between them.  If the file is the same
+    inode, its modification time has not gone back, it has grown and the
+    sampled blocks are unchanged the file is treated as appended to,
+    otherwise the whole file is hashed again.
+
+    A prefix of up to (SAMPLE_COUNT + 2) * SAMPLE_SIZE bytes is compared in
+    full.  In a longer prefix a file truncated and written again, or
+    rewritten at its start or end, is caught, but a rewrite that falls only
+    between the sampled blocks is not, so only use a fingerprint for files
+    that are appended to.
+    """
+    def __init__(self):
+        # number of bytes hashed
+        self.size = 0
+        # hex digest of the first size bytes
+        self.checksum = None
+        self._md5 = None
+        self._sample_checksum = None
+        # inode and modification time of the file when it was hashed
+        self._inode = None
+        self._mod_time = None
+
+    def update(self, path):
+        """
+        Bring the checksum up to date with the contents of the file
+        @param path The path of the file
+        @retval The hex digest of the file contents
+        """
+        with open(path, 'rb') as filehandle:
+            if self._is_appended(filehandle):
+                filehandle.seek(self.size)
+            else:
+                self._md5 = hashlib.md5()
+                self.size = 0
+                filehandle.seek(0)
+
+            stat = os.fstat(filehandle.fileno())
+            self.size += _hash_blocks(filehandle, self._md5)
+            self.checksum = self._md5.hexdigest()
+            self._sample_checksum = self._read_samples(filehandle)
+            self._inode = stat.st_ino
+            self._mod_time = stat.st_mtime
+        return self.checksum
+
+    def _is_appended(self, filehandle):
+        """
+        Check if the same file has grown past the hashed prefix and the
+        sampled blocks of the prefix are unchanged
+        """
+        if self._md5 is None:
+            return False
+        stat = os.fstat(filehandle.fileno())
+        if stat.st_ino != self._inode or stat.st_mtime < self._mod_time:
+            # replaced by another file, or written with an older time
+            return False
+        if stat.st_size <= self.size:
+            # the same size may still have been rewritten, smaller has been
+            return False
+        return self._read_samples(filehandle) == self._sample_checksum
+
+    def _read_samples(self, filehandle):
+        """
+        Calculate the digest of the sampled blocks of the hashed prefix
+        """
+        last = max(self.size - SAMPLE_SIZE, 0)
+        offsets = set(last * i // (SAMPLE_COUNT + 1) for i in range(SAMPLE_COUNT + 2))
+
+        md5 = hashlib.md5()
+        for offset in sorted(offsets):
+            filehandle.seek(offset)
+            md5.update(filehandle.read(min(SAMPLE_SIZE, self.size - offset)))
+        return md5.hexdigest()
@@ -13,8 +13,6 @@ __author__ = 'Christopher Mueller, Jonathan Newbrough, Steve Foley'
 __license__ = 'Apache 2.0'
 
 import os
-import glob
-import hashlib
 import time
 import re
 
@@ -24,7 +22,9 @@ from gevent.event import Event
 from mi.core.log import get_logger ; log = get_logger()
 from mi.core.poller import DirectoryPoller, ConditionPoller
 from mi.core.common import BaseEnum
-from mi.dataset.dataset_driver import DriverStateKey
+from mi.dataset.dataset_driver import DriverStateKey, DataSetDriverConfigKeys
+from mi.dataset.directory_watcher import get_directory_watcher
+from mi.dataset.file_fingerprint import FileFingerprint, file_checksum
 
 
 class Harvester(object):
@@ -74,8 +74,10 @@ class SingleDirectoryPoller(ConditionPoller):
         log.debug("Start directory poller path: %s, pattern: %s", directory, wildcard)
         self._found_file_state = memento
         # driver state is not a new instance of memento, it is the same here as in the driver
+        self._directory = directory
         self._path = directory + '/' + wildcard
         log.debug("Starting harvester with directory pattern: %s", self._path)
+        self._watcher = get_directory_watcher(directory, wildcard, config.get(DataSetDriverConfigKeys.CHANGE_DETECTION))
 
         # this queue holds the names of the files that have been sent to the driver.  Each time the harvester
         # restarts, the queue is emptied so all files that have not been ingested can be added and sent again,
@@ -86,12 +88,13 @@ class SingleDirectoryPoller(ConditionPoller):
 
     def _check_for_files(self):
         """
-        Find any new or modified files and update the harvester state
+        Find any new or modified files and update the harvester state.  Only
+        the files the directory watcher reports as new or changed since the
+        last check, and the files not ingested yet, are looked at.
         """
-        filenames = []
-
-        if os.path.exists(os.path.dirname(self._path)):
-            filenames = glob.glob(self._path)
+        changed = dict((self._directory + '/' + file_name, stat)
+                       for (file_name, stat) in self._watcher.changed_files())
+        filenames = changed.keys()
 
         # if there are underscores in the filename, sort by ascii rather than 
         if len(filenames) > 0:
@@ -102,22 +105,21 @@ class SingleDirectoryPoller(ConditionPoller):
 
         new_files = []
         modified_state = {}
-        # loop over all files in the directory and compare their state to that in the harvester state dictionary
+        # loop over the changed files and compare their state to that in the harvester state dictionary
         for i_file in filenames:
-            mod_time = os.path.getmtime(i_file)
+            mod_time = changed[i_file].st_mtime
+            file_name = os.path.basename(i_file)
             # check if the file has not been modified in the last X seconds
             if (mod_time + self.file_mod_wait) < time.time():
-                file_name = os.path.basename(i_file)
                 # find if this file already exists in the found files
                 if file_name in self._found_file_state and self._found_file_state[file_name][DriverStateKey.INGESTED]:
                     # this file has been ingested (file size and date will only be available for ingested files)
-                    file_size = os.path.getsize(i_file)
+                    file_size = changed[i_file].st_size
                     if self._found_file_state[file_name][DriverStateKey.FILE_SIZE] != file_size or \
                     self._found_file_state[file_name][DriverStateKey.FILE_MOD_DATE] != mod_time:
                        # this file has been ingested, but the file size and times don't match, confirm that
                        # the checksum is different
-                        with open(i_file, 'rb') as filehandle:
-                            md5_checksum = hashlib.md5(filehandle.read()).hexdigest()
+                        md5_checksum = file_checksum(i_file)
                         if self._found_file_state[file_name][DriverStateKey.FILE_CHECKSUM] != md5_checksum:
                             # ingested file has been modified!
                             if DriverStateKey.MODIFIED_STATE in self._found_file_state[file_name]:
@@ -128,14 +130,14 @@ class SingleDirectoryPoller(ConditionPoller):
                                 old_state[DriverStateKey.FILE_CHECKSUM] != md5_checksum:
                                     # this file has changed since its previous modification, update the
                                     # modified state
-                                    modified_state[filename] = {
+                                    modified_state[file_name] = {
                                         DriverStateKey.FILE_SIZE: file_size,
                                         DriverStateKey.FILE_MOD_DATE: mod_time,
                                         DriverStateKey.FILE_CHECKSUM: md5_checksum,
                                     }
                             else:
                                 # this is the first time this file has been modified
-                                modified_state[filename] = {
+                                modified_state[file_name] = {
                                     DriverStateKey.FILE_SIZE: file_size,
                                     DriverStateKey.FILE_MOD_DATE: mod_time,
                                     DriverStateKey.FILE_CHECKSUM: md5_checksum,
@@ -147,10 +149,28 @@ class SingleDirectoryPoller(ConditionPoller):
                         # only send this file once
                         self.sent_to_driver_queue.append(file_name)
                         new_files.append(file_name)
+                    # look at the file again until it is ingested, a change made
+                    # after it was sent is only found against the ingested state
+                    self._watcher.forget(file_name)
+            else:
+                # too recently modified, look at it again on the next check
+                self._watcher.forget(file_name)
 
         log.debug('found new files: %r, modified_files: %r', new_files, modified_state)
         return (new_files, modified_state)
 
+    def run(self):
+        try:
+            super(SingleDirectoryPoller, self).run()
+        finally:
+            self._watcher.close()
+
+    def shutdown(self):
+        super(SingleDirectoryPoller, self).shutdown()
+        # a running poller closes the watcher when it stops
+        if not self.is_alive():
+            self._watcher.close()
+
     def sort_files(self, filenames):
         """
         Sorts files which have multiple indices separated by underscores in a file name.
@@ -268,6 +288,9 @@ class SingleFilePoller(ConditionPoller):
             }
         else:
             self._found_file_state = {}
+        # checksum of the file, kept so a growing file only hashes the appended data.  The
+        # file is a log that is only appended to, files in a directory may be rewritten
+        self._fingerprint = FileFingerprint()
         log.debug("Start file poller path: %s, initial state: %s", self._path, self._found_file_state)
         super(SingleFilePoller,self).__init__(self._check_for_changes, callback,
                                                    exception_callback, interval)
@@ -288,8 +311,7 @@ class SingleFilePoller(ConditionPoller):
                     if self._found_file_state[DriverStateKey.FILE_SIZE] != file_size or \
                         self._found_file_state[DriverStateKey.FILE_MOD_DATE] != mod_time:
                         # size or time is different, confirm with checksum
-                        with open(self._path, 'rb') as filehandle:
-                            md5_checksum = hashlib.md5(filehandle.read()).hexdigest()
+                        md5_checksum = self._fingerprint.update(self._path)
                         if self._found_file_state[DriverStateKey.FILE_CHECKSUM] != md5_checksum:
                             # file is different, update the state
                             self._found_file_state[DriverStateKey.FILE_SIZE] = file_size
@@ -305,8 +327,7 @@ class SingleFilePoller(ConditionPoller):
                             }
                 else:
                     # no driver state yet, first time opening this file
-                    with open(self._path, 'rb') as filehandle:
-                        md5_checksum = hashlib.md5(filehandle.read()).hexdigest()
+                    md5_checksum = self._fingerprint.update(self._path)
 
                     self._found_file_state[DriverStateKey.FILE_SIZE] = file_size
                     self._found_file_state[DriverStateKey.FILE_MOD_DATE] = mod_time
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.ingest_pool
+@file mi/dataset/ingest_pool.py
+@author Emily Hahn
+@brief Parse several data files at once in worker processes.  Each worker is
+forked from the driver, builds the parser with the driver's own
+_build_parser, and records what the parser published, the parser states and
+the sample exceptions in the order they happened.  The driver replays them
+file by file in the order the files were found, so the driver state advances
+exactly as if the files had been parsed one after the other.
+"""
+
+__author__ = 'Emily Hahn'
+__license__ = 'Apache 2.0'
+
+import gevent
+from collections import deque
+from multiprocessing import Process, Pipe
+
+from gevent.socket import wait_read
+
+from mi.core.log import get_logger ; log = get_logger()
+from mi.core.common import BaseEnum
+from mi.core.exceptions import InstrumentException, SampleException
+
+
+class ParserEvent(BaseEnum):
+    PUBLISH = 'publish'
+    STATE = 'state'
+    SAMPLE_EXCEPTION = 'sample_exception'
+
+
+def _pack_exception(exception):
+    """
+    Instrument exceptions do not survive pickling with their message, send
+    the class and message instead
+    """
+    if isinstance(exception, InstrumentException):
+        return (exception.__class__, (exception.msg,))
+    return (exception.__class__, exception.args)
+
+
+def _unpack_exception(packed):
+    (exception_class, args) = packed
+    return exception_class(*args)
+
+
+class ParserEventRecorder(object):
+    """
+    Stands in for the driver callbacks a parser is built with, keeping the
+    calls in order
+    """
+    def __init__(self):
+        self.events = []
+
+    def publish(self, particles):
+        self.events.append((ParserEvent.PUBLISH, particles))
+
+    def save_state(self, *args):
+        self.events.append((ParserEvent.STATE, args))
+
+    def sample_exception(self, exception):
+        self.events.append((ParserEvent.SAMPLE_EXCEPTION, _pack_exception(exception)))
+
+
+def replay_parser_events(events, publish_callback, state_callback, exception_callback, delay=None):
+    """
+    Pass the events recorded while parsing a file on to the driver callbacks
+    @param events The recorded (event, value) list
+    @param publish_callback Called with each list of published particles
+    @param state_callback Called with the arguments of each parser state save
+    @param exception_callback Called with each sample exception
+    @param delay Optional time to sleep after each publish
+    """
+    for (event, value) in events:
+        if event == ParserEvent.PUBLISH:
+            publish_callback(value)
+            if delay:
+                gevent.sleep(delay)
+        elif event == ParserEvent.STATE:
+            state_callback(*value)
+        else:
+            exception_callback(_unpack_exception(value))
+
+
+def _parse_file(driver, connection, path, parser_args, count):
+    """
+    Parse a whole file in a worker process and send back the recorded events
+    and the sample exception that stopped parsing, if any.  None is sent if
+    the file needs to be parsed by the driver itself, because parsing failed
+    unexpectedly or the results can't be sent between processes.
+    """
+    recorder = ParserEventRecorder()
+    driver._data_callback = recorder.publish
+    driver._save_parser_state = recorder.save_state
+    driver._sample_exception_callback = recorder.sample_exception
+
+    try:
+        error = None
+        with open(path) as handle:
+            parser = driver._build_parser(parser_args[0], handle, *parser_args[1:])
+            try:
+                while parser and parser.get_records(count):
+                    pass
+            except SampleException as e:
+                error = _pack_exception(e)
+        result = (recorder.events, error)
+    except Exception:
+        log.debug('failed to parse %s in a worker', path, exc_info=True)
+        result = None
+
+    try:
+        connection.send(result)
+    except Exception:
+        log.debug('results of %s can not be sent from the worker', path, exc_info=True)
+        connection.send(None)
+    finally:
+        connection.close()
+
+
+class IngestPool(object):
+    """
+    Parse files in at most workers processes at a time, returning the results
+    in the order the files were given
+    """
+    def __init__(self, driver, workers):
+        """
+        @param driver The data set driver the workers are forked from
+        @param workers The number of files to parse at once
+        """
+        self._driver = driver
+        self._workers = workers
+
+    def parse(self, jobs):
+        """
+        Parse files, yielding the result of each in order.  Each result is a
+        tuple of the recorded events and the sample exception that ended
+        parsing or None, or None if the driver must parse the file.
+        @param jobs An iterable of (path, parser args, record count) tuples,
+           the parser args are passed to _build_parser around the file handle
+        """
+        jobs = iter(jobs)
+        running = deque()
+        try:
+            while True:
+                while len(running) < self._workers:
+                    job = next(jobs, None)
+                    if job is None:
+                        break
+                    running.append(self._start(job))
+                if not running:
+                    return
+
+                (process, connection) = running.popleft()
+                try:
+                    yield self._finish(process, connection)
+                finally:
+                    connection.close()
+        finally:
+            for (process, connection) in running:
+                process.terminate()
+                connection.close()
+
+    def _start(self, job):
+        (path, parser_args, count) = job
+        (receiver, sender) = Pipe(duplex=False)
+        # the worker is forked, the driver is not pickled
+        process = Process(target=_parse_file, args=(self._driver, sender, path, parser_args, count))
+        process.daemon = True
+        process.start()
+        sender.close()
+        return (process, receiver)
+
+    def _finish(self, process, connection):
+        wait_read(connection.fileno())
+        try:
+            result = connection.recv()
+        except EOFError:
+            result = None
+        process.join()
+        if result is None:
+            log.warn('ingest worker %d exited with %s without parsing its file', process.pid, process.exitcode)
+            return None
+
+        (events, error) = result
+        if error:
+            error = _unpack_exception(error)
+        return (events, error)
@@ -6,10 +6,10 @@
 @author Emily Hahn
 @brief Extend the protocol param dict to handle dataset encoding exceptions
 """
-import re
 
 from mi.core.instrument.protocol_param_dict import ProtocolParameterDict, ParameterDescription
 from mi.core.instrument.protocol_param_dict import ParameterValue, ParameterDictVisibility
+from mi.core.instrument.protocol_param_dict import compile_regex
 
 from mi.core.log import get_logger ; log = get_logger()
 
@@ -99,13 +99,23 @@ class RegexParameter(Parameter):
         Parameter.__init__(self, name, f_format, value=value, expiration=expiration)
 
         self.pattern = pattern
-        if regex_flags == None:
-            self.regex = re.compile(pattern)
-        else:
-            self.regex = re.compile(pattern, regex_flags)
-            
+        (self.regex, self.prefix) = compile_regex(pattern, regex_flags)
         self.f_getval = f_getval
 
+    def search(self, input):
+        """
+        Search a string for the value regex, starting at the first occurrence
+        of its literal prefix since no match can start before that.
+        @param input The string to search.
+        @retval The match object, None if the regex does not match.
+        """
+        if not self.prefix:
+            return self.regex.search(input)
+        start = input.find(self.prefix)
+        if start == -1:
+            return None
+        return self.regex.search(input, start)
+
     def update(self, input):
         """
         Attempt to update a parameter value. If the input string matches the
@@ -114,10 +124,19 @@ class RegexParameter(Parameter):
         @retval True if an update was successful, False otherwise.
         """
         if not (isinstance(input, str)):
-            match = self.regex.search(str(input))
+            match = self.search(str(input))
         else:
-            match = self.regex.search(input)
+            match = self.search(input)
 
+        return self.update_from_match(match)
+
+    def update_from_match(self, match):
+        """
+        Update the parameter value from the result of searching for the value
+        regex, which may be shared with other parameters using the same regex.
+        @param match The match object, or None if the regex did not match.
+        @retval True if an update was successful, False otherwise.
+        """
         if match:
             self.value.set_value(self.f_getval(match))
             return True
@@ -151,21 +170,30 @@ class DatasetParameterDict(ProtocolParameterDict):
     def update(self, in_data):
         """
         Update the dictionaray with a line input. Iterate through all objects
-        and attempt to match and update a parameter. Only updates the first
-        match encountered. If we pass in a target params list then will will
-        only iterate through those allowing us to limit upstate to only specific
-        parameters.
+        and attempt to match and update a parameter. Parameters that share a
+        regex are updated from a single search of the input, so each distinct
+        regex is only run once however many values it holds.
         @param in_data A set of data to match to a dictionary object.
         @raise InstrumentParameterException on invalid target prams
         @raise KeyError on invalid parameter name
         """
-        params = self._param_dict.keys()
+        # search results by (pattern, flags), shared by parameters using the same regex
+        matches = {}
 
-        for name in params:
+        for name in self._param_dict.keys():
             log.trace("update param dict name: %s", name)
             try:
                 val = self._param_dict[name]
-                val.update(in_data)
+                if isinstance(val, RegexParameter):
+                    key = (val.regex.pattern, val.regex.flags)
+                    if key not in matches:
+                        if not isinstance(in_data, str):
+                            matches[key] = val.search(str(in_data))
+                        else:
+                            matches[key] = val.search(in_data)
+                    val.update_from_match(matches[key])
+                else:
+                    val.update(in_data)
             except Exception as e:
                 # set the value to None if we failed
                 val.clear_value()
@@ -28,6 +28,9 @@ from mi.dataset.dataset_parser import BufferLoadingParser
 # start the logger
 log = get_logger()
 
+# the value of NaN entries in a data row, whatever the column type
+NAN = float('nan')
+
 class StateKey(BaseEnum):
     POSITION = 'position'
     SENT_METADATA = 'sent_metadata'
@@ -103,7 +106,7 @@ class GliderParticle(DataParticle):
             # if the item from the particle is in the raw_data (row) we just sampled...
             if key in self.raw_data:
                 # read the value of the item from the dictionary
-                value = self.raw_data[key]['Data']
+                value = self.raw_data[key]
 
                 log.trace("Evaluating key= %s, value= %s", key, value)
                 # check if this value is a string, implying it is one of the three
@@ -898,6 +901,31 @@ class GliderParser(BufferLoadingParser):
 
         log.debug("End of header, position: %d", self._stream_handle.tell())
 
+        self._compile_column_converters()
+
+    def _compile_column_converters(self):
+        """
+        Choose the function that converts each column of a data row once
+        from the header, rather than for every value of every row.  Columns
+        of 1 or 2 bytes are ints, 4 or 8 bytes are floats and latitude or
+        longitude columns are converted to decimal degrees.
+        """
+        self._column_converters = []
+        # other byte sizes keep the conversion of the column before them
+        converter = None
+        for (label, num_bytes) in zip(self._header_dict['labels'], self._header_dict['num_of_bytes']):
+            if num_bytes in (1, 2):
+                converter = int
+            elif num_bytes in (4, 8):
+                converter = float
+
+            if ('_lat' in label) or ('_lon' in label):
+                self._column_converters.append(self._string_to_ddegrees)
+            else:
+                self._column_converters.append(converter)
+
+        # labels of the science parameters found in this file, by particle class
+        self._science_labels = {}
 
     def set_state(self, state_obj):
         """
@@ -934,18 +962,15 @@ class GliderParser(BufferLoadingParser):
 
     def _read_data(self, data_record):
         """
-        Read in the column labels, data type, number of bytes of each
-        data type, and the data from an ASCII glider data file.
+        Convert the values of an ASCII glider data row with the column
+        converters compiled from the header.
+        @param data_record The data row
+        @retval A dictionary of the values keyed by column label
+        @throws SampleException if the row does not have a value per column
         """
-
-        data_dict = {}
         num_columns = self._header_dict['sensors_per_cycle']
-        data_labels = self._header_dict['labels']
-        num_bytes = self._header_dict['num_of_bytes']
-
-        data = data_record.strip().split()
 
-        log.trace("Split data: %s", data)
+        data = data_record.split()
 
         if num_columns != len(data):
 
@@ -958,42 +983,10 @@ class GliderParser(BufferLoadingParser):
                                   'Described: %d, Actual: %d' %
                                   (num_columns, len(data)))
 
-        # extract record to dictionary
-        for ii in range(num_columns):
-            log.trace("_read_data: index: %d label: %s, value: %s", ii, data_labels[ii], data[ii])
-
-            valuePreConversion = data[ii]
-
-            if valuePreConversion == "NaN":
-                # data is NaN, convert it to a float
-                value = float(valuePreConversion)
-            else:
-
-                # determine what type of data the value is, based on the number of bytes attribute
-                if (num_bytes[ii] == 1) or (num_bytes[ii] == 2):
-                        stringConverter = int
-                elif (num_bytes[ii] == 4) or (num_bytes[ii] == 8):
-                        stringConverter = float
-
-                # check to see if this is a latitude/longitude string
-                if ('_lat' in data_labels[ii]) or ('_lon' in data_labels[ii]):
-                    # convert latitude/longitude strings to decimal degrees
-                    value = self._string_to_ddegrees(data[ii])
+        values = [NAN if value == 'NaN' else converter(value)
+                  for (converter, value) in zip(self._column_converters, data)]
 
-                    log.debug("Converted lat/lon %s from %s to %10.5f", data_labels[ii], data[ii], value)
-
-                else:
-                    # convert the string to and int or float
-                    value = stringConverter(data[ii])
-
-            data_dict[data_labels[ii]] = {
-                'Name': data_labels[ii],
-                'Data': value
-            }
-
-        log.trace("Data dict parsed: %s", data_dict)
-
-        return data_dict
+        return dict(zip(self._header_dict['labels'], values))
 
     def get_block(self, size=1024):
         """
@@ -1050,8 +1043,8 @@ class GliderParser(BufferLoadingParser):
                 # from the parsed data, m_present_time is the unix timestamp
                 try:
                     if not exception_detected:
-                        record_time = data_dict['m_present_time']['Data']
-                        timestamp = ntplib.system_to_ntp_time(data_dict['m_present_time']['Data'])
+                        record_time = data_dict['m_present_time']
+                        timestamp = ntplib.system_to_ntp_time(record_time)
                         log.debug("Converting record timestamp %f to ntp timestamp %f", record_time, timestamp)
                 except KeyError:
                     exception_detected = True
@@ -1096,23 +1089,39 @@ class GliderParser(BufferLoadingParser):
             # if it is not use the _exception_callback
             self._exception_callback(UnexpectedDataException("Found un-expected non-data: %s", non_data))
 
-    def _has_science_data(self, data_dict):
+    def _has_science_data(self, data_dict, particle_class=None):
         """
-        Examine the data_dict to see if it contains science data.
+        Examine the data_dict to see if it contains a science value that is
+        not NaN.
+        @param data_dict The values of a data row keyed by column label
+        @param particle_class The particle class whose science parameters are
+           checked, the parser particle class if None
         """
-        log.debug("Looking for data in science parameters: %s", self._particle_class.science_parameters)
-        for key in data_dict.keys():
-            if key in self._particle_class.science_parameters:
-                value = data_dict[key]['Data']
-                if not np.isnan(value):
-                    log.debug("Found science value for key: %s, value: %s", key, value)
-                    return True
-                else:
-                    log.debug("Science data value is nan: %s %s", key, value)
+        if particle_class is None:
+            particle_class = self._particle_class
+
+        for label in self._science_column_labels(particle_class):
+            value = data_dict.get(label)
+            if value is not None and not np.isnan(value):
+                log.debug("Found science value for key: %s, value: %s", label, value)
+                return True
 
         log.debug("No science data found!")
         return False
 
+    def _science_column_labels(self, particle_class):
+        """
+        The labels of the columns in this file that hold science parameters
+        of a particle class, found once per class
+        """
+        labels = self._science_labels.get(particle_class)
+        if labels is None:
+            science_parameters = set(particle_class.science_parameters)
+            labels = [label for label in self._header_dict['labels'] if label in science_parameters]
+            log.debug("Science parameters of %s in file: %s", particle_class.__name__, labels)
+            self._science_labels[particle_class] = labels
+        return labels
+
     def _string_to_ddegrees(self, pos_str):
         """
         Converts the given string from this data stream into a more
@@ -1216,17 +1225,17 @@ class GliderEngineeringParser(GliderParser):
             # we haven't sent it yet and we have a header, send it now
             data_dict = self.get_header_info_dict()
             try:
-                timestamp = self.fileopen_str_to_timestamp(data_dict['glider_eng_fileopen_time']['Data'])
+                timestamp = self.fileopen_str_to_timestamp(data_dict['glider_eng_fileopen_time'])
                 particle = self._extract_sample(EngineeringMetadataDataParticle, None, data_dict, timestamp)
                 self._read_state[StateKey.SENT_METADATA] = True
                 result_particles.append((particle, copy.copy(self._read_state)))
             except ValueError:
                 # converting fileopen string to timestamp will throw a ValueError if the time is not parseable
                 log.warn("Unable to parse timestamp from file open time %s, not returning metadata particle",
-                         data_dict['glider_eng_fileopen_time']['Data'])
+                         data_dict['glider_eng_fileopen_time'])
                 self._exception_callback(SampleException(
                     "Unable to parse timestamp from file open time %s , not returning metadata particle" % \
-                    data_dict['glider_eng_fileopen_time']['Data']))
+                    data_dict['glider_eng_fileopen_time']))
 
         # collect the non-data from the file
         (nd_timestamp, non_data, none_start, none_end) = self._chunker.get_next_non_data_with_index(clean=False)
@@ -1261,8 +1270,8 @@ class GliderEngineeringParser(GliderParser):
                 # from the parsed data, m_present_time is the unix timestamp
                 try:
                     if not exception_detected:
-                        record_time = data_dict['m_present_time']['Data']
-                        timestamp = ntplib.system_to_ntp_time(data_dict['m_present_time']['Data'])
+                        record_time = data_dict['m_present_time']
+                        timestamp = ntplib.system_to_ntp_time(record_time)
                         log.debug("Converting record timestamp %f to ntp timestamp %f", record_time, timestamp)
                 except KeyError:
                     exception_detected = True
@@ -1316,10 +1325,7 @@ class GliderEngineeringParser(GliderParser):
 
         # data_dict holds key, value pairs where
         # key = particle attribute name
-        # value = dictionary of 2 key value pairs:
-        #         K                 V
-        #       'Data':  value of particle data item
-        #       'Name':  name of the particle data item (same as top level data_dict key)
+        # value = value of particle data item
         #
         filename_label_value = self._header_dict.get('filename_label')
         mission_name_value = self._header_dict.get('mission_name')
@@ -1330,9 +1336,9 @@ class GliderEngineeringParser(GliderParser):
 
         # ADD the three dicts to the data dict
         data_dict = {}
-        data_dict['glider_eng_filename'] = {'Data': filename_label_value, 'Name': 'glider_eng_filename'}
-        data_dict['glider_mission_name'] = {'Data': mission_name_value, 'Name': 'glider_mission_name'}
-        data_dict['glider_eng_fileopen_time'] = {'Data': fileopen_time_value, 'Name': 'glider_eng_fileopen_time'}
+        data_dict['glider_eng_filename'] = filename_label_value
+        data_dict['glider_mission_name'] = mission_name_value
+        data_dict['glider_eng_fileopen_time'] = fileopen_time_value
 
         return data_dict
 
@@ -1357,15 +1363,4 @@ class GliderEngineeringParser(GliderParser):
         """
         Examine the data_dict to see if it contains data from the engineering telemetered particle being worked on
         """
-
-        for key in data_dict.keys():
-
-            # only check for particle params that do not include the two m_ time oriented attributes
-            if key in particle_class.science_parameters:
-                # return true as soon as the first particle non-NaN attribute from the data dict
-                value = data_dict[key]['Data']
-                if not np.isnan(value):
-                    return True
-
-        log.debug("No engineering attributes in the particle found!")
-        return False
\ No newline at end of file
+        return self._has_science_data(data_dict, particle_class)
@@ -12,7 +12,6 @@ __author__ = 'Emily Hahn'
 __license__ = 'Apache 2.0'
 
 import re
-import struct
 import gevent
 import time
 import ntplib
@@ -30,9 +29,37 @@ SIO_HEADER_REGEX = b'\x01(CT|AD|FL|DO|PH|PS|CS|WA|WC|WE|CO|PS|CS)[0-9]{7}_([0-9A
                '([0-9A-Fa-f]{8})_([0-9A-Fa-f]{2})_([0-9A-Fa-f]{4})\x02'
 SIO_HEADER_MATCHER = re.compile(SIO_HEADER_REGEX)
 
+# telemetered data escapes \x2b as \x18\x6b and \x18 as \x18\x58
+SIO_ESCAPE_MATCHER = re.compile(b'\x18[\x6b\x58]')
+SIO_UNESCAPED = {b'\x18\x6b': b'\x2b', b'\x18\x58': b'\x18'}
+
+# size of the blocks the file is read in
+SIO_READ_SIZE = 65536
+
+
+def _build_crc_table():
+    """
+    Build the table of the SIO header CRC (reflected polynomial 0x8408) of
+    every byte value
+    """
+    table = []
+    for byte in range(256):
+        crc = byte
+        for i in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0x8408
+            else:
+                crc >>= 1
+        table.append(crc)
+    return table
+
+SIO_CRC_TABLE = _build_crc_table()
+
 # blocks can be uniquely identified a combination of block number and timestamp,
 # since block numbers roll over after 255
 # each block may contain multiple data samples
+# the start and end positions are in the data with the escape sequences of
+# telemetered files replaced, not in the file itself
 class StateKey(BaseEnum):
     UNPROCESSED_DATA = "unprocessed_data" # holds an array of start and end of unprocessed blocks of data
     IN_PROCESS_DATA = "in_process_data" # holds an array of start and end of packets of data,
@@ -45,6 +72,42 @@ END_IDX = 1
 SAMPLES_PARSED = 2
 SAMPLES_RETURNED = 3
 
+class SioEscapeDecoder(object):
+    """
+    Replace the escape sequences in telemetered SIO data.  Data is decoded a
+    block at a time, an escape character at the end of a block is carried
+    over to the next block so an escape sequence split between blocks is
+    still replaced.
+    """
+    def __init__(self):
+        self._carry = b''
+
+    def decode(self, data):
+        """
+        Decode the next block of raw data
+        @param data The raw data following the previous block
+        @retval The decoded data, which may hold back a trailing escape character
+        """
+        data = self._carry + data
+        if data.endswith(b'\x18'):
+            # an escape character that may start a sequence finished in the next block
+            self._carry = data[-1:]
+            data = data[:-1]
+        else:
+            self._carry = b''
+
+        return SIO_ESCAPE_MATCHER.sub(lambda match: SIO_UNESCAPED[match.group(0)], data)
+
+    def finish(self):
+        """
+        Decode whatever is held back at the end of the data
+        @retval The remaining decoded data
+        """
+        decoded = self._carry
+        self._carry = b''
+        return decoded
+
+
 class SioMuleParser(Parser):
 
     def __init__(self, config, stream_handle, state, sieve_fn,
@@ -78,6 +141,7 @@ class SioMuleParser(Parser):
         self._record_buffer = [] # holds list of records
         self._recovered_flag = recovered_flag
         self.all_data = None
+        self._escape_decoder = None
         self._chunk_sample_count = []
         self._samples_to_throw_out = None
         self._mid_sample_packets = 0
@@ -126,36 +190,28 @@ class SioMuleParser(Parser):
                               end_packet_idx, match.group(0)[1:32])
         return return_list
 
+    @staticmethod
+    def calc_crc(data):
+        """
+        Calculate the SIO header CRC of data, one table lookup per byte
+        @param data The packet data
+        @retval The CRC as an integer
+        """
+        if len(data) == 0:
+            return 0
+        crc = 0xFFFF
+        table = SIO_CRC_TABLE
+        for byte in bytearray(data):
+            crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+        return ~crc & 0xFFFF
+
     @staticmethod
     def calc_checksum(data):
         """
         Calculate SIO header checksum of data
+        @retval The CRC as 4 upper case hex digits, as it appears in the header
         """
-        crc = 65535
-        if len(data) == 0:
-            return '0000'
-        for iData in range(0,len(data)):
-            short = struct.unpack('H', data[iData] + '\x00')
-            point = 255 & short[0]
-            crc = crc ^ point
-            for i in range(7, -1, -1):
-                if crc & 1:
-                    crc = (crc >> 1) ^ 33800
-                else:
-                    crc >>= 1
-        crc = ~crc
-        # convert to unsigned
-        if crc < 0:
-            crc += 65536
-        # get rid of the '0x' from the hex string
-        crc = "%s" % hex(crc)[2:].upper()
-        # make sure we have the right format for comparing, must be 4 hex digits
-        if len(crc) == 3:
-            crc = '0' + crc
-        elif len(crc) == 2:
-            crc = '00' + crc
-        elif len(crc) == 1:
-            crc = '000' + crc
+        crc = "%04X" % SioMuleParser.calc_crc(data)
         log.trace("calculated checksum %s", crc)
         return crc
 
@@ -326,22 +382,24 @@ class SioMuleParser(Parser):
         if self.all_data == None:
             # need to read in the entire data file first and store it because escape sequences shift position of
             # in process and unprocessed blocks
-            log.debug("Reading in all data in smaller blocks")
-            self.all_data = ''
-
-            eof = False
-            while not eof:
-                # read data in small blocks in order to not block processing
-                next_data = self._stream_handle.read(1024)
-                if next_data:
-                    if not self._recovered_flag:
-                        # if this is telemetered, need to replace escape chars, recovered does not
-                        next_data = next_data.replace(b'\x18\x6b', b'\x2b')
-                        next_data = next_data.replace(b'\x18\x58', b'\x18')
-                    self.all_data = self.all_data + next_data
-                    gevent.sleep(0)
-                else:
-                    eof = True
+            log.debug("Reading in all data in blocks")
+            if not self._recovered_flag:
+                # if this is telemetered, need to replace escape chars, recovered does not
+                self._escape_decoder = SioEscapeDecoder()
+
+            blocks = []
+            while True:
+                # read data in blocks in order to not block processing
+                next_data = self._stream_handle.read(SIO_READ_SIZE)
+                if not next_data:
+                    break
+                if self._escape_decoder:
+                    next_data = self._escape_decoder.decode(next_data)
+                blocks.append(next_data)
+                gevent.sleep(0)
+            if self._escape_decoder:
+                blocks.append(self._escape_decoder.finish())
+            self.all_data = b''.join(blocks)
             log.debug("length of all data %d", len(self.all_data))
 
         # if unprocessed data has not been initialized yet, set it to the entire file
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.parser.test.benchmark_sio_mule_common
+@file mi/dataset/parser/test/benchmark_sio_mule_common.py
+@author Emily Hahn
+@brief Compare the table driven SIO header checksum with the bit by bit one
+it replaced over every packet in the mflm resource files, timing both and
+checking they give the same checksum for every packet.
+
+Usage: python -m mi.dataset.parser.test.benchmark_sio_mule_common
+"""
+
+__author__ = 'Emily Hahn'
+__license__ = 'Apache 2.0'
+
+import time
+
+from mi.dataset.parser.sio_mule_common import SioMuleParser
+from mi.dataset.parser.test.test_sio_mule_common import mflm_packets, bitwise_checksum
+
+
+def timed(checksum, packets):
+    """
+    @retval A tuple of the seconds taken and the list of checksums
+    """
+    start = time.time()
+    checksums = [checksum(packet) for packet in packets]
+    return (time.time() - start, checksums)
+
+
+def run():
+    packets = mflm_packets()
+    print "%d packets, %d bytes" % (len(packets), sum(len(packet) for packet in packets))
+    (bitwise_time, expected) = timed(bitwise_checksum, packets)
+    (table_time, checksums) = timed(SioMuleParser.calc_checksum, packets)
+    print "%12s %12s" % ("bit by bit s", "table s")
+    print "%12.3f %12.3f" % (bitwise_time, table_time)
+
+    mismatched = [i for i in range(len(packets)) if checksums[i] != expected[i]]
+    if mismatched:
+        raise AssertionError("table checksum differs from the bit by bit one for %d of %d packets, first %r" %
+                             (len(mismatched), len(packets), packets[mismatched[0]]))
+    print "checksums match for all %d packets" % len(packets)
+
+
+if __name__ == '__main__':
+    run()
@@ -376,6 +376,32 @@ class CTDGVGliderTest(GliderParserUnitTestCase):
         records = self.parser.get_records(1)
         self.assertEqual(len(records), 0)
 
+    def test_read_data(self):
+        """
+        Verify data rows are converted with the column converters compiled
+        from the header and the science columns are found once
+        """
+        self.set_data(HEADER)
+        self.reset_parser()
+
+        # give the waypoint latitude and longitude columns values
+        record = CTDGV_RECORD.strip().split("\n")[0].replace("NaN NaN NaN", "NaN 4330.0 -7040.5", 1)
+        data_dict = self.parser._read_data(record)
+        self.assertTrue(np.isnan(data_dict['c_battpos']))
+        self.assertAlmostEqual(data_dict['c_wpt_lat'], 43.5)
+        self.assertAlmostEqual(data_dict['c_wpt_lon'], -70.675)
+        self.assertEqual(data_dict['m_present_time'], 1378349241.82962)
+        self.assertEqual(data_dict['sci_water_temp'], 15.3683)
+        self.assertEqual(len(data_dict), 29)
+
+        self.assertEqual(self.parser._science_column_labels(CtdgvDataParticle),
+                         ['sci_water_cond', 'sci_water_pressure', 'sci_water_temp'])
+        self.assertTrue(self.parser._has_science_data(data_dict))
+        self.assertFalse(self.parser._has_science_data(self.parser._read_data(ZERO_GPS_VALUE)))
+
+        with self.assertRaises(SampleException):
+            self.parser._read_data("NaN NaN")
+
 @attr('UNIT', group='mi')
 class DOSTATelemeteredGliderTest(GliderParserUnitTestCase):
     """
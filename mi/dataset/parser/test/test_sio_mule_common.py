@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.parser.test.test_sio_mule_common
+@file marine-integrations/mi/dataset/parser/test/test_sio_mule_common.py
+@author Emily Hahn
+@brief Test code for the escape sequence decoding and header checksum shared by
+the sio mule parsers
+"""
+
+from nose.plugins.attrib import attr
+
+import os
+import glob
+import struct
+from StringIO import StringIO
+
+from mi.core.log import get_logger
+log = get_logger()
+from mi.idk.config import Config
+
+from mi.dataset.test.test_parser import ParserUnitTestCase
+from mi.dataset.dataset_driver import DataSetDriverConfigKeys
+from mi.dataset.parser.sio_mule_common import SioEscapeDecoder, SioMuleParser, SIO_HEADER_MATCHER
+from mi.dataset.parser.sio_mule_common import SIO_ESCAPE_MATCHER, SIO_READ_SIZE
+from mi.dataset.parser.ctdmo import CtdmoParser
+
+MFLM_RESOURCE_PATH = os.path.join(Config().base_dir(), 'mi', 'dataset', 'driver', 'mflm')
+MFLM_RESOURCE_GLOB = os.path.join(MFLM_RESOURCE_PATH, '*', 'resource', '*.dat')
+
+
+@attr('UNIT', group='mi')
+class SioEscapeDecoderUnitTestCase(ParserUnitTestCase):
+    """
+    SioEscapeDecoder unit test suite
+    """
+    RAW = 'ab\x18\x6bcd\x18\x58\x18\x58ef\x18\x18\x6bg\x18'
+    DECODED = 'ab\x2bcd\x18\x18ef\x18\x2bg\x18'
+
+    def decode(self, block_size):
+        decoder = SioEscapeDecoder()
+        blocks = [decoder.decode(self.RAW[i:i + block_size]) for i in range(0, len(self.RAW), block_size)]
+        blocks.append(decoder.finish())
+        return ''.join(blocks)
+
+    def test_decode(self):
+        """
+        Verify escape sequences are replaced no matter where the blocks split them
+        """
+        for block_size in range(1, len(self.RAW) + 1):
+            self.assertEqual(self.decode(block_size), self.DECODED)
+
+    def test_escape_split_by_read(self):
+        """
+        Verify a telemetered file with an escape sequence split between two
+        of the blocks the parser reads gives the same records as the file
+        without it split
+        """
+        config = {
+            DataSetDriverConfigKeys.PARTICLE_MODULE: 'mi.dataset.parser.ctdmo',
+            DataSetDriverConfigKeys.PARTICLE_CLASS: ['CtdmoParserDataParticle',
+                                                     'CtdmoOffsetParserDataParticle'],
+            'inductive_id': 55
+            }
+        with open(os.path.join(MFLM_RESOURCE_PATH, 'ctd', 'resource', 'node59p1_step4.dat'), 'rb') as filehandle:
+            raw_data = filehandle.read()
+
+        def get_records(data):
+            parser = CtdmoParser(config, None, StringIO(data),
+                                 lambda state: None, lambda pub: None, lambda exception: None)
+            return parser.get_records(100)
+
+        expected = get_records(raw_data)
+        self.assertEqual(len(expected), 13)
+
+        # pad the file so the read block ends between the two bytes of the
+        # first escape sequence in a CT packet
+        escapes = [SIO_ESCAPE_MATCHER.search(raw_data, header.end(0), header.end(0) + int(header.group(2), 16))
+                   for header in SIO_HEADER_MATCHER.finditer(raw_data) if header.group(0)[1:3] == 'CT']
+        escape = [match for match in escapes if match][0].start()
+        padded = ' ' * (SIO_READ_SIZE - 1 - escape) + raw_data
+        self.assertEqual(padded[SIO_READ_SIZE - 1], '\x18')
+        self.assertEqual(get_records(padded), expected)
+
+
+def bitwise_checksum(data):
+    """
+    The original bit by bit SIO header checksum, kept to check the table
+    driven one against
+    """
+    crc = 65535
+    if len(data) == 0:
+        return '0000'
+    for iData in range(0,len(data)):
+        short = struct.unpack('H', data[iData] + '\x00')
+        point = 255 & short[0]
+        crc = crc ^ point
+        for i in range(7, -1, -1):
+            if crc & 1:
+                crc = (crc >> 1) ^ 33800
+            else:
+                crc >>= 1
+    crc = ~crc
+    # convert to unsigned
+    if crc < 0:
+        crc += 65536
+    return "%04X" % crc
+
+
+def mflm_packets():
+    """
+    The data of every packet with a header in the mflm resource files
+    """
+    packets = []
+    for path in sorted(glob.glob(MFLM_RESOURCE_GLOB)):
+        with open(path, 'rb') as filehandle:
+            raw_data = filehandle.read()
+        for match in SIO_HEADER_MATCHER.finditer(raw_data):
+            packets.append(raw_data[match.end(0):match.end(0) + int(match.group(2), 16)])
+    return packets
+
+
+@attr('UNIT', group='mi')
+class SioChecksumUnitTestCase(ParserUnitTestCase):
+    """
+    Test the table driven SIO header checksum
+    """
+    # number of resource file packets checked against the bit by bit checksum
+    SAMPLE_SIZE = 500
+
+    def test_checksum(self):
+        """
+        Verify the table driven checksum matches the bit by bit one on a
+        sample of the packets spread through the resource files.  The
+        benchmark_sio_mule_common module checks every packet.
+        """
+        self.assertEqual(SioMuleParser.calc_checksum(''), '0000')
+        self.assertEqual(SioMuleParser.calc_crc('123456789'), 0x906E)
+        self.assertEqual(SioMuleParser.calc_checksum('123456789'), '906E')
+
+        packets = mflm_packets()
+        self.assertGreater(len(packets), 0)
+        for packet in packets[::max(1, len(packets) // self.SAMPLE_SIZE)]:
+            self.assertEqual(SioMuleParser.calc_checksum(packet), bitwise_checksum(packet))
+            self.assertEqual(SioMuleParser.calc_crc(packet), int(bitwise_checksum(packet), 16))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.test.benchmark_param_dict
+@file mi/dataset/test/benchmark_param_dict.py
+@author Emily Hahn
+@brief Compare building and updating the cg_stc_eng_stc parameter dictionary
+for the status files in the cg_stc_eng resources with a regex compile and a
+search of the whole file per parameter, which is what was done before the
+compiled regexes were cached and shared.
+
+Usage: python -m mi.dataset.test.benchmark_param_dict
+"""
+
+__author__ = 'Emily Hahn'
+__license__ = 'Apache 2.0'
+
+import os
+import re
+import glob
+import timeit
+
+from mi.idk.config import Config
+from mi.core.instrument import protocol_param_dict
+from mi.dataset.parser.cg_stc_eng_stc import CgStcEngStcParserDataParticle
+
+RESOURCE_GLOB = os.path.join('mi', 'dataset', 'driver', 'cg_stc_eng', 'stc', 'resource', 'stc_status*.txt')
+
+# Build and update a dictionary for each file this many times
+REPEAT = 20
+
+
+def per_parameter(particles):
+    for particle in particles:
+        # a parameter dictionary holds more patterns than the re module caches
+        re.purge()
+        protocol_param_dict._compiled_regexes.clear()
+        param_dict = particle._build_param_dict()
+        for val in param_dict._param_dict.itervalues():
+            try:
+                match = val.regex.search(particle.raw_data)
+                if match:
+                    val.value.set_value(val.f_getval(match))
+            except Exception:
+                val.clear_value()
+
+
+def shared(particles):
+    for particle in particles:
+        param_dict = particle._build_param_dict()
+        param_dict.update(particle.raw_data)
+
+
+def run():
+    particles = []
+    for path in sorted(glob.glob(os.path.join(Config().base_dir(), RESOURCE_GLOB))):
+        with open(path, 'rb') as filehandle:
+            particles.append(CgStcEngStcParserDataParticle(filehandle.read()))
+
+    param_dict = particles[0]._build_param_dict()
+    patterns = set(val.regex.pattern for val in param_dict._param_dict.itervalues())
+    print "%d files, %d parameters, %d distinct patterns" % (len(particles), len(param_dict._param_dict),
+                                                             len(patterns))
+
+    legacy = timeit.timeit(lambda: per_parameter(particles), number=REPEAT)
+    current = timeit.timeit(lambda: shared(particles), number=REPEAT)
+    print "%16s %12s %9s" % ("per parameter s", "shared s", "speedup")
+    print "%16.4f %12.4f %8.1fx" % (legacy, current, legacy / current)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.test.test_directory_watcher
+@file mi/dataset/test/test_directory_watcher.py
+@author Emily Hahn
+@brief Test the directory watchers and the single directory poller changes
+found with them
+"""
+
+__author__ = 'Emily Hahn'
+__license__ = 'Apache 2.0'
+
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+
+from mock import patch
+from nose.plugins.attrib import attr
+
+from mi.core.unit_test import MiUnitTest
+from mi.dataset.dataset_driver import DriverStateKey, DataSetDriverConfigKeys
+from mi.dataset.harvester import SingleDirectoryPoller
+from mi.dataset.file_fingerprint import file_checksum
+from mi.dataset.directory_watcher import get_directory_watcher, DirectoryWatcherType
+from mi.dataset.directory_watcher import InotifyDirectoryWatcher
+
+
+@attr('UNIT', group='mi')
+class TestDirectoryWatcher(MiUnitTest):
+    watcher_type = DirectoryWatcherType.STAT
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.watcher = get_directory_watcher(self.directory, '*.txt', self.watcher_type)
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write_file(self, name, data, mode='w'):
+        with open(os.path.join(self.directory, name), mode) as filehandle:
+            filehandle.write(data)
+
+    def changed_names(self):
+        return sorted(name for (name, stat) in self.watcher.changed_files())
+
+    def test_changed_files(self):
+        """
+        Verify only new and changed files matching the wildcard are reported
+        """
+        self.write_file('a.txt', 'a')
+        self.write_file('b.txt', 'b')
+        self.write_file('c.dat', 'c')
+        self.write_file('.d.txt', 'd')
+        self.assertEqual(self.changed_names(), ['a.txt', 'b.txt'])
+        self.assertEqual(self.changed_names(), [])
+
+        self.write_file('b.txt', 'bb', 'a')
+        self.write_file('e.txt', 'e')
+        changed = dict(self.watcher.changed_files())
+        self.assertEqual(sorted(changed), ['b.txt', 'e.txt'])
+        self.assertEqual(changed['b.txt'].st_size, 3)
+
+        self.watcher.forget('a.txt')
+        self.assertEqual(self.changed_names(), ['a.txt'])
+
+        os.remove(os.path.join(self.directory, 'e.txt'))
+        self.assertEqual(self.changed_names(), [])
+        self.write_file('e.txt', 'e')
+        self.assertEqual(self.changed_names(), ['e.txt'])
+
+    def test_directory_removed(self):
+        """
+        Verify a removed directory has no files and its files are found
+        again once it is back
+        """
+        self.write_file('a.txt', 'a')
+        self.assertEqual(self.changed_names(), ['a.txt'])
+
+        shutil.rmtree(self.directory)
+        self.assertEqual(self.changed_names(), [])
+
+        os.mkdir(self.directory)
+        self.write_file('a.txt', 'a')
+        self.assertEqual(self.changed_names(), ['a.txt'])
+
+
+@attr('UNIT', group='mi')
+class TestInotifyDirectoryWatcher(TestDirectoryWatcher):
+    watcher_type = DirectoryWatcherType.INOTIFY
+
+    def test_type(self):
+        self.assertIsInstance(self.watcher, InotifyDirectoryWatcher)
+        self.assertIsInstance(get_directory_watcher(self.directory, '*'), InotifyDirectoryWatcher)
+        self.assertRaises(ValueError, get_directory_watcher, self.directory, '*', 'foo')
+
+    def test_events_only(self):
+        """
+        Verify files without events are not looked at after the first check
+        """
+        self.write_file('a.txt', 'a')
+        self.assertEqual(self.changed_names(), ['a.txt'])
+
+        self.write_file('b.txt', 'b')
+        with patch('os.stat', wraps=os.stat) as stat:
+            self.assertEqual(self.changed_names(), ['b.txt'])
+            self.assertEqual(stat.call_count, 1)
+
+
+@attr('UNIT', group='mi')
+class TestSingleDirectoryPollerChanges(MiUnitTest):
+    """
+    Test the changes the single directory poller finds with the watchers
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def build_poller(self, memento, watcher_type):
+        config = {DataSetDriverConfigKeys.DIRECTORY: self.directory,
+                  DataSetDriverConfigKeys.PATTERN: '*.txt',
+                  DataSetDriverConfigKeys.CHANGE_DETECTION: watcher_type}
+        poller = SingleDirectoryPoller(config, memento, None, file_mod_wait=0)
+        self.addCleanup(poller.shutdown)
+        return poller
+
+    def test_new_and_modified(self):
+        for watcher_type in DirectoryWatcherType.list():
+            self.check_new_and_modified(watcher_type)
+
+    def check_new_and_modified(self, watcher_type):
+        path = os.path.join(self.directory, 'unit_1.txt')
+        with open(path, 'w') as filehandle:
+            filehandle.write('abc')
+        past = time.time() - 10
+        os.utime(path, (past, past))
+
+        memento = {}
+        poller = self.build_poller(memento, watcher_type)
+        self.assertEqual(poller._check_for_files(), (['unit_1.txt'], {}))
+        self.assertEqual(poller._check_for_files(), ([], {}))
+
+        # ingested with a different modification time but the same contents,
+        # the checksum is only calculated once
+        memento['unit_1.txt'] = {DriverStateKey.INGESTED: True,
+                                 DriverStateKey.FILE_SIZE: 3,
+                                 DriverStateKey.FILE_MOD_DATE: past - 1,
+                                 DriverStateKey.FILE_CHECKSUM: hashlib.md5('abc').hexdigest()}
+        with patch('mi.dataset.harvester.file_checksum', wraps=file_checksum) as checksum:
+            self.assertEqual(poller._check_for_files(), ([], {}))
+            self.assertEqual(poller._check_for_files(), ([], {}))
+            self.assertEqual(checksum.call_count, 1)
+
+        with open(path, 'a') as filehandle:
+            filehandle.write('def')
+        os.utime(path, (past, past))
+        (new_files, modified_state) = poller._check_for_files()
+        self.assertEqual(new_files, [])
+        self.assertEqual(modified_state, {
+            'unit_1.txt': {DriverStateKey.FILE_SIZE: 6,
+                           DriverStateKey.FILE_MOD_DATE: os.path.getmtime(path),
+                           DriverStateKey.FILE_CHECKSUM: hashlib.md5('abcdef').hexdigest()}})
+
+        # too recent to report until the wait is over
+        poller.file_mod_wait = 3600
+        with open(os.path.join(self.directory, 'unit_2.txt'), 'w') as filehandle:
+            filehandle.write('abc')
+        self.assertEqual(poller._check_for_files(), ([], {}))
+        poller.file_mod_wait = 0
+        self.assertEqual(poller._check_for_files(), (['unit_2.txt'], {}))
+
+        poller.shutdown()
+        os.remove(path)
+        os.remove(os.path.join(self.directory, 'unit_2.txt'))
+
+    def test_modified_before_ingested(self):
+        for watcher_type in DirectoryWatcherType.list():
+            self.check_modified_before_ingested(watcher_type)
+
+    def check_modified_before_ingested(self, watcher_type):
+        """
+        Verify a file changed after it was sent to the driver but before it
+        was ingested is found modified once it is ingested
+        """
+        path = os.path.join(self.directory, 'unit_1.txt')
+        with open(path, 'w') as filehandle:
+            filehandle.write('abc')
+        past = time.time() - 10
+        os.utime(path, (past, past))
+
+        memento = {}
+        poller = self.build_poller(memento, watcher_type)
+        self.assertEqual(poller._check_for_files(), (['unit_1.txt'], {}))
+
+        with open(path, 'a') as filehandle:
+            filehandle.write('def')
+        os.utime(path, (past + 1, past + 1))
+        self.assertEqual(poller._check_for_files(), ([], {}))
+        self.assertEqual(poller._check_for_files(), ([], {}))
+
+        # the driver ingested the file as it was sent
+        memento['unit_1.txt'] = {DriverStateKey.INGESTED: True,
+                                 DriverStateKey.FILE_SIZE: 3,
+                                 DriverStateKey.FILE_MOD_DATE: past,
+                                 DriverStateKey.FILE_CHECKSUM: hashlib.md5('abc').hexdigest()}
+        (new_files, modified_state) = poller._check_for_files()
+        self.assertEqual(new_files, [])
+        self.assertEqual(modified_state, {
+            'unit_1.txt': {DriverStateKey.FILE_SIZE: 6,
+                           DriverStateKey.FILE_MOD_DATE: os.path.getmtime(path),
+                           DriverStateKey.FILE_CHECKSUM: hashlib.md5('abcdef').hexdigest()}})
+
+        poller.shutdown()
+        os.remove(path)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.test.test_file_fingerprint
+@file mi/dataset/test/test_file_fingerprint.py
+@author Emily Hahn
+@brief Test the block hashed file checksums and fingerprints
+"""
+
+__author__ = 'Emily Hahn'
+__license__ = 'Apache 2.0'
+
+import os
+import shutil
+import hashlib
+import tempfile
+
+from mock import patch
+from nose.plugins.attrib import attr
+
+from mi.core.unit_test import MiUnitTest
+from mi.dataset import file_fingerprint
+from mi.dataset.file_fingerprint import FileFingerprint, file_checksum
+
+
+@attr('UNIT', group='mi')
+class TestFileFingerprint(MiUnitTest):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'node58p1.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write_file(self, data, mode='wb'):
+        with open(self.path, mode) as filehandle:
+            filehandle.write(data)
+
+    @patch.object(file_fingerprint, 'BLOCK_SIZE', 7)
+    def test_file_checksum(self):
+        """
+        Verify the block hashed checksum matches hashing the whole file
+        """
+        data = ''.join(chr(i % 256) for i in range(100))
+        self.write_file(data)
+        self.assertEqual(file_checksum(self.path), hashlib.md5(data).hexdigest())
+
+        self.write_file('')
+        self.assertEqual(file_checksum(self.path), hashlib.md5('').hexdigest())
+
+    @patch.object(file_fingerprint, 'BLOCK_SIZE', 5)
+    @patch.object(file_fingerprint, 'SAMPLE_SIZE', 4)
+    @patch.object(file_fingerprint, 'SAMPLE_COUNT', 0)
+    def test_appended(self):
+        """
+        Verify an appended file only hashes the new data and a rewritten file
+        is hashed again from the start
+        """
+        fingerprint = FileFingerprint()
+        self.write_file('abcdefgh')
+        self.assertEqual(fingerprint.update(self.path), hashlib.md5('abcdefgh').hexdigest())
+        self.assertEqual(fingerprint.size, 8)
+
+        # only the appended data is hashed
+        starts = []
+        def hash_blocks(filehandle, md5):
+            starts.append(filehandle.tell())
+            return hash_from(filehandle, md5)
+        hash_from = file_fingerprint._hash_blocks
+        self.write_file('ijklmn', 'ab')
+        with patch.object(file_fingerprint, '_hash_blocks', hash_blocks):
+            self.assertEqual(fingerprint.update(self.path), hashlib.md5('abcdefghijklmn').hexdigest())
+        self.assertEqual(starts, [8])
+        self.assertEqual(fingerprint.size, 14)
+
+        # grown, but the end of the old data changed
+        self.write_file('abcdefghijkXmnop')
+        self.assertEqual(fingerprint.update(self.path), hashlib.md5('abcdefghijkXmnop').hexdigest())
+        self.assertEqual(fingerprint.size, 16)
+
+        # grown, but the start of the old data changed
+        self.write_file('Xbcdefghijklmnopq')
+        self.assertEqual(fingerprint.update(self.path), hashlib.md5('Xbcdefghijklmnopq').hexdigest())
+        self.assertEqual(fingerprint.size, 17)
+
+        # same size, rewritten
+        self.write_file('Xbcdefghijk12345')
+        self.assertEqual(fingerprint.update(self.path), hashlib.md5('Xbcdefghijk12345').hexdigest())
+
+        # truncated
+        self.write_file('abc')
+        self.assertEqual(fingerprint.update(self.path), hashlib.md5('abc').hexdigest())
+        self.assertEqual(fingerprint.size, 3)
+
+    @patch.object(file_fingerprint, 'SAMPLE_SIZE', 4)
+    @patch.object(file_fingerprint, 'SAMPLE_COUNT', 0)
+    def test_replaced(self):
+        """
+        Verify a file that grew with the same end of the old data is hashed
+        again from the start if it was replaced, or written with an older
+        modification time
+        """
+        fingerprint = FileFingerprint()
+        self.write_file('abcdefgh')
+        fingerprint.update(self.path)
+
+        replacement = self.path + '.new'
+        with open(replacement, 'wb') as filehandle:
+            filehandle.write('Xbcdefghij')
+        os.rename(replacement, self.path)
+        self.assertEqual(fingerprint.update(self.path), hashlib.md5('Xbcdefghij').hexdigest())
+
+        mod_time = os.path.getmtime(self.path)
+        self.write_file('abcdefghijkl')
+        os.utime(self.path, (mod_time - 10, mod_time - 10))
+        self.assertEqual(fingerprint.update(self.path), hashlib.md5('abcdefghijkl').hexdigest())
+        self.assertEqual(fingerprint.size, 12)
+
+
+    def test_rewritten_and_grown(self):
+        """
+        Verify a file rewritten in place and then grown is hashed again from
+        the start, whether the rewrite is sampled or the prefix is short
+        enough to be compared in full
+        """
+        data = ''.join(chr(i % 251) for i in range(50000))
+        self.write_file(data)
+        fingerprint = FileFingerprint()
+        fingerprint.update(self.path)
+
+        for offset in (0, 1234, 25000, 49999):
+            data = data[:offset] + 'X' + data[offset + 1:] + 'appended'
+            self.write_file(data)
+            self.assertEqual(fingerprint.update(self.path), hashlib.md5(data).hexdigest())
+
+    @patch.object(file_fingerprint, 'SAMPLE_SIZE', 2)
+    @patch.object(file_fingerprint, 'SAMPLE_COUNT', 2)
+    def test_sampled(self):
+        """
+        Verify a rewrite of a sampled block in the middle of a long prefix is
+        caught, and an unchanged prefix is taken as appended to
+        """
+        fingerprint = FileFingerprint()
+        self.write_file('abcdefghijklmnopqrst')
+        fingerprint.update(self.path)
+
+        starts = []
+        def hash_blocks(filehandle, md5):
+            starts.append(filehandle.tell())
+            return hash_from(filehandle, md5)
+        hash_from = file_fingerprint._hash_blocks
+
+        # the blocks at 0, 6, 12 and 18 are compared
+        with patch.object(file_fingerprint, '_hash_blocks', hash_blocks):
+            self.write_file('abcdefXhijklmnopqrstu')
+            self.assertEqual(fingerprint.update(self.path), hashlib.md5('abcdefXhijklmnopqrstu').hexdigest())
+            self.write_file('vw', 'ab')
+            self.assertEqual(fingerprint.update(self.path), hashlib.md5('abcdefXhijklmnopqrstuvw').hexdigest())
+        self.assertEqual(starts, [0, 21])
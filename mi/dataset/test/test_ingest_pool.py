@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.test.test_ingest_pool
+@file mi/dataset/test/test_ingest_pool.py
+@author Emily Hahn
+@brief Test parsing files in worker processes with the ingest pool
+"""
+
+__author__ = 'Emily Hahn'
+__license__ = 'Apache 2.0'
+
+import os
+import copy
+import shutil
+import tempfile
+
+from mock import Mock
+from nose.plugins.attrib import attr
+
+from mi.core.unit_test import MiUnitTest
+from mi.core.exceptions import SampleException, RecoverableSampleException
+from mi.dataset.dataset_driver import SimpleDataSetDriver, MultipleHarvesterDataSetDriver
+from mi.dataset.dataset_driver import DataSourceConfigKey, DataSetDriverConfigKeys, DriverStateKey
+from mi.dataset.ingest_pool import IngestPool, replay_parser_events
+
+
+class LineParser(object):
+    """
+    Publish one line of the file per record
+    """
+    def __init__(self, state, stream, state_callback, publish_callback, exception_callback):
+        self._lines = stream.read().split('\n')
+        self._position = state or 0
+        self._state_callback = state_callback
+        self._publish_callback = publish_callback
+        self._exception_callback = exception_callback
+
+    def get_records(self, count):
+        if self._position >= len(self._lines):
+            return []
+        line = self._lines[self._position]
+        self._position += 1
+        if line == 'bad':
+            raise SampleException('bad line')
+        if line == 'unexpected':
+            raise ValueError('unexpected line')
+        if line == 'recoverable':
+            self._exception_callback(RecoverableSampleException('recoverable line'))
+        self._publish_callback([line])
+        self._state_callback(self._position, self._position == len(self._lines))
+        return [line]
+
+
+class LineDriver(object):
+    def _save_parser_state(self, state, file_ingested):
+        pass
+
+    def _data_callback(self, particles):
+        pass
+
+    def _sample_exception_callback(self, exception):
+        pass
+
+    def _build_parser(self, parser_state, infile):
+        return LineParser(parser_state, infile, self._save_parser_state,
+                          self._data_callback, self._sample_exception_callback)
+
+
+class LineDataSetDriver(SimpleDataSetDriver):
+    def _build_parser(self, parser_state, infile):
+        return LineParser(parser_state, infile, self._save_parser_state,
+                          self._data_callback, self._sample_exception_callback)
+
+
+class LineMultipleHarvesterDriver(MultipleHarvesterDataSetDriver):
+    def _build_parser(self, parser_state, infile, data_key=None):
+        return LineParser(parser_state, infile,
+                          lambda state, ingested: self._save_parser_state(state, data_key, ingested),
+                          self._data_callback, self._sample_exception_callback)
+
+
+class IngestTestCase(MiUnitTest):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write_file(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as filehandle:
+            filehandle.write(data)
+        return path
+
+
+@attr('UNIT', group='mi')
+class TestIngestPool(IngestTestCase):
+    def test_parse(self):
+        """
+        Verify the results come back in order with the parser calls, the
+        sample exception that ended parsing, or None if the worker failed
+        """
+        jobs = [(self.write_file('a.txt', 'a\nb'), (None,), 1),
+                (self.write_file('b.txt', 'c\nbad\nd'), (None,), 1),
+                (self.write_file('c.txt', 'e\nf\nrecoverable'), (1,), 1),
+                (self.write_file('d.txt', 'unexpected'), (None,), 1)]
+        results = list(IngestPool(LineDriver(), 2).parse(jobs))
+        self.assertEqual(len(results), 4)
+
+        published = []
+        states = []
+        exceptions = []
+        for (events, error) in results[:3]:
+            replay_parser_events(events, published.extend, lambda *args: states.append(args), exceptions.append)
+
+        self.assertEqual(published, ['a', 'b', 'c', 'f', 'recoverable'])
+        self.assertEqual(states, [(1, False), (2, True), (1, False), (2, False), (3, True)])
+        self.assertEqual(len(exceptions), 1)
+        self.assertIsInstance(exceptions[0], RecoverableSampleException)
+        self.assertEqual(exceptions[0].msg, 'recoverable line')
+
+        self.assertEqual(results[0][1], None)
+        self.assertIsInstance(results[1][1], SampleException)
+        self.assertEqual(results[1][1].msg, 'bad line')
+        self.assertEqual(results[3], None)
+
+
+@attr('UNIT', group='mi')
+class TestIngestWorkersDriver(IngestTestCase):
+    """
+    Parse files in worker processes through the directory drivers
+    """
+    FILES = [('a.txt', 'a\nb'), ('b.txt', 'c\nbad\nd'), ('c.txt', 'e')]
+
+    # (PARSER_STATE, INGESTED) of each file after every state callback
+    PROGRESS = [[(1, False), (None, False), (None, False)],
+                [(2, True), (None, False), (None, False)],
+                [(2, True), (1, False), (None, False)],
+                [(2, True), (1, True), (None, False)],
+                [(2, True), (1, True), (1, True)]]
+
+    def setUp(self):
+        IngestTestCase.setUp(self)
+        self.published = []
+        self.states = []
+        self.harvester_config = {
+            DataSetDriverConfigKeys.DIRECTORY: self.directory,
+            DataSetDriverConfigKeys.PATTERN: '*.txt',
+            DataSetDriverConfigKeys.INGEST_WORKERS: 2
+        }
+
+    def publish(self, particles):
+        self.published.extend(particles)
+
+    def save_state(self, state):
+        self.states.append(copy.deepcopy(state))
+
+    def progress(self, file_states):
+        """
+        @param file_states A list of the driver states saved, indexed by file name
+        @retval The list of (PARSER_STATE, INGESTED) of each file in each state
+        """
+        return [[(state[name][DriverStateKey.PARSER_STATE], state[name][DriverStateKey.INGESTED])
+                 for (name, data) in self.FILES]
+                for state in file_states]
+
+    def test_simple_driver(self):
+        """
+        Verify the parser state and ingested flag advance one file at a time
+        """
+        config = {DataSourceConfigKey.HARVESTER: self.harvester_config,
+                  DataSourceConfigKey.PARSER: {}}
+        driver = LineDataSetDriver(config, None, self.publish, self.save_state, Mock(), Mock())
+        for (name, data) in self.FILES:
+            self.write_file(name, data)
+            driver._new_file_callback(name)
+        del self.states[:]
+
+        driver._poll()
+        self.assertEqual(self.published, ['a', 'b', 'c', 'e'])
+        self.assertEqual(self.progress(self.states), self.PROGRESS)
+        self.assertEqual(driver._new_file_queue, [])
+
+    def test_multiple_harvester_driver(self):
+        """
+        Verify the parser state and ingested flag advance one file at a time
+        """
+        config = {DataSourceConfigKey.HARVESTER: {'key': self.harvester_config},
+                  DataSourceConfigKey.PARSER: {'key': {}}}
+        driver = LineMultipleHarvesterDriver(config, None, self.publish, self.save_state, Mock(), Mock(),
+                                             ['key'])
+        for (name, data) in self.FILES:
+            self.write_file(name, data)
+            driver._new_file_callback(name, 'key')
+        del self.states[:]
+
+        driver._poll('key')
+        self.assertEqual(self.published, ['a', 'b', 'c', 'e'])
+        self.assertEqual(self.progress([state['key'] for state in self.states]), self.PROGRESS)
+        self.assertEqual(driver._new_file_queue['key'], [])
+
+    def test_requeue(self):
+        """
+        Verify the files not started on go back on the queue when publishing fails
+        """
+        def publish(particles):
+            if particles == ['c']:
+                raise ValueError('publish failed')
+            self.publish(particles)
+
+        config = {DataSourceConfigKey.HARVESTER: self.harvester_config,
+                  DataSourceConfigKey.PARSER: {}}
+        driver = LineDataSetDriver(config, None, publish, self.save_state, Mock(), Mock())
+        for (name, data) in self.FILES:
+            self.write_file(name, data)
+            driver._new_file_callback(name)
+
+        self.assertRaises(ValueError, driver._poll)
+        self.assertEqual(self.published, ['a', 'b'])
+        self.assertEqual(driver._new_file_queue, ['c.txt'])
+        self.assertEqual(driver._file_in_process, None)
+
+        driver._poll()
+        self.assertEqual(self.published, ['a', 'b', 'e'])
+        self.assertEqual(driver._new_file_queue, [])
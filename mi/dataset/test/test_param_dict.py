@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.test.test_param_dict
+@file mi/dataset/test/test_param_dict.py
+@author Emily Hahn
+@brief Test the dataset parameter dictionary's shared regex searches
+"""
+
+__author__ = 'Emily Hahn'
+__license__ = 'Apache 2.0'
+
+import os
+import re
+import glob
+
+from nose.plugins.attrib import attr
+
+from mi.core.unit_test import MiUnitTest
+from mi.idk.config import Config
+from mi.core.instrument.protocol_param_dict import regex_literal_prefix, compile_regex
+from mi.dataset.param_dict import DatasetParameterDict
+from mi.dataset.parser.cg_stc_eng_stc import CgStcEngStcParserDataParticle
+
+STC_RESOURCE_GLOB = os.path.join(Config().base_dir(), 'mi', 'dataset', 'driver', 'cg_stc_eng', 'stc',
+                                 'resource', 'stc_status*.txt')
+
+
+def search_each(param_dict, data):
+    """
+    Search for every parameter's regex separately, the way the dictionary
+    used to, and return the values or 'error' if the value could not be found
+    """
+    values = {}
+    for (name, val) in param_dict._param_dict.iteritems():
+        try:
+            match = val.regex.search(data)
+            values[name] = val.f_getval(match) if match else None
+        except Exception:
+            values[name] = 'error'
+    return values
+
+
+@attr('UNIT', group='mi')
+class TestDatasetParameterDict(MiUnitTest):
+
+    def test_literal_prefix(self):
+        """
+        Verify the literal prefix stops before anything that is not plain text
+        """
+        for (pattern, prefix) in ((r'abc(\d+)', 'abc'),
+                                  (r'DCL\.port\.1=(-?\d)', 'DCL.port.1='),
+                                  (r'ab*c', 'a'),
+                                  (r'ab?c', 'a'),
+                                  (r'^abc', ''),
+                                  (r'(abc)', ''),
+                                  (r'\d+abc', ''),
+                                  (r'(?i)abc', '')):
+            self.assertEqual(regex_literal_prefix(re.compile(pattern)), prefix)
+        self.assertEqual(regex_literal_prefix(re.compile('abc', re.IGNORECASE)), '')
+
+        (regex, prefix) = compile_regex(r'abc=(\d+)')
+        self.assertIs(compile_regex(r'abc=(\d+)'), compile_regex(r'abc=(\d+)'))
+        self.assertEqual(prefix, 'abc=')
+        self.assertRaises(TypeError, compile_regex, r'abc', 'bad flags')
+
+    def test_shared_regex(self):
+        """
+        Verify parameters sharing a regex are all updated, and a failed value
+        only clears its own parameter
+        """
+        param_dict = DatasetParameterDict()
+        pattern = r'count=(\d+),(\w+)'
+        param_dict.add('first', pattern, lambda match: int(match.group(1)), int)
+        param_dict.add('second', pattern, lambda match: int(match.group(2)), int)
+        param_dict.add('third', pattern, lambda match: match.group(2), str)
+        param_dict.add('missing', r'other=(\d+)', lambda match: int(match.group(1)), int)
+
+        param_dict.update('header\ncount=12,ab\n')
+        self.assertEqual(param_dict.get_all(), {'first': 12, 'second': None, 'third': 'ab', 'missing': None})
+        self.assertEqual(param_dict.get_encoding_errors(), [{'second': None}])
+
+    def test_stc_resources(self):
+        """
+        Verify the cg_stc_eng_stc values match searching for each parameter
+        separately
+        """
+        paths = glob.glob(STC_RESOURCE_GLOB)
+        self.assertGreater(len(paths), 0)
+        for path in paths:
+            with open(path, 'rb') as filehandle:
+                data = filehandle.read()
+            particle = CgStcEngStcParserDataParticle(data)
+            param_dict = particle._build_param_dict()
+            param_dict.update(data)
+
+            values = param_dict.get_all()
+            for error in param_dict.get_encoding_errors():
+                values.update(dict.fromkeys(error, 'error'))
+            self.assertEqual(values, search_each(particle._build_param_dict(), data))
@@ -7,11 +7,190 @@
 @brief Test code for the dataset parser base classes and common structures for
 testing parsers.
 """
+import re
+import time
+from StringIO import StringIO
+
+import numpy
+from mock import patch
+from nose.plugins.attrib import attr
+
 from mi.core.unit_test import MiUnitTestCase, MiIntTestCase
+from mi.core.instrument.data_particle import DataParticleKey, ParticleBatch, BatchParticle
+from mi.core.exceptions import SampleException
+from mi.dataset.dataset_parser import BufferLoadingParser
+from mi.dataset.dataset_driver import DataSetDriverConfigKeys
 
 # Make some stubs if we need to share among parser test suites
 class ParserUnitTestCase(MiUnitTestCase):
     pass
 
 class ParserIntTestCase(MiIntTestCase):
-    pass
\ No newline at end of file
+    pass
+
+@attr('UNIT', group='mi')
+class BufferLoadingParserUnitTestCase(ParserUnitTestCase):
+    """
+    Test the record buffer of the BufferLoadingParser with particle batches
+    """
+    class BatchParser(BufferLoadingParser):
+        """
+        Parse lines of comma separated counts into one batch per block
+        """
+        def __init__(self, stream_handle, state_callback, publish_callback):
+            super(BufferLoadingParserUnitTestCase.BatchParser, self).__init__(
+                {}, stream_handle, 0, self.sieve, state_callback, publish_callback)
+            self._read_state = 0
+
+        @staticmethod
+        def sieve(raw_data):
+            return [(match.start(), match.end()) for match in re.finditer(r'[^\n]*\n', raw_data)]
+
+        def parse_chunks(self):
+            lines = []
+            (timestamp, chunk) = self._chunker.get_next_data()
+            while chunk is not None:
+                lines.append(chunk)
+                self._read_state += len(chunk)
+                (timestamp, chunk) = self._chunker.get_next_data()
+            if not lines:
+                return []
+
+            counts = numpy.array([line.split(',') for line in lines], dtype='int32')
+            batch = ParticleBatch('counts', [('a', counts[:, 0]), ('b', counts[:, 1])])
+            return [(batch, self._read_state)]
+
+    def test_batches(self):
+        """
+        Verify batches count as their records and are published as
+        particles with the state after the batch
+        """
+        data = ''.join('%d,%d\n' % (i, i * 2) for i in range(300))
+        states = []
+        published = []
+        parser = self.BatchParser(StringIO(data),
+                                  lambda state, file_ingested: states.append((state, file_ingested)),
+                                  published.extend)
+
+        particles = parser.get_records(5)
+        self.assertGreater(len(particles), 5)
+        self.assertEqual(parser._buffered_record_count(), 300 - len(particles))
+        self.assertEqual(particles, published)
+        self.assertIsInstance(particles[0], BatchParticle)
+        self.assertEqual(particles[3].generate_dict()[DataParticleKey.VALUES],
+                         [{DataParticleKey.VALUE_ID: 'a', DataParticleKey.VALUE: 3},
+                          {DataParticleKey.VALUE_ID: 'b', DataParticleKey.VALUE: 6}])
+        self.assertEqual(states[-1][0], len(''.join('%d,%d\n' % (i, i * 2) for i in range(len(particles)))))
+
+        particles.extend(parser.get_records(1000))
+        self.assertEqual(len(particles), 300)
+        self.assertEqual(states[-1], (len(data), True))
+        self.assertEqual([p.generate_dict()[DataParticleKey.VALUES][0][DataParticleKey.VALUE]
+                          for p in particles], range(300))
+
+
+@attr('UNIT', group='mi')
+class StateCheckpointUnitTestCase(ParserUnitTestCase):
+    """
+    Test coalescing the state callbacks of the BufferLoadingParser
+    """
+    class LineParser(BufferLoadingParser):
+        """
+        Parse each line into a record, failing on a line of 'bad'.  The
+        file is read four bytes at a time.
+        """
+        def __init__(self, config, stream_handle, state_callback):
+            super(StateCheckpointUnitTestCase.LineParser, self).__init__(
+                config, stream_handle, 0, self.sieve, state_callback, lambda particles: None)
+            # position read up to, ahead of the state of the returned records
+            self._read_state = 0
+
+        @staticmethod
+        def sieve(raw_data):
+            return [(match.start(), match.end()) for match in re.finditer(r'[^\n]*\n', raw_data)]
+
+        def _load_particle_buffer(self):
+            if self.get_block(4):
+                self._record_buffer.extend(self.parse_chunks())
+
+        def parse_chunks(self):
+            result = []
+            (timestamp, chunk) = self._chunker.get_next_data()
+            while chunk is not None:
+                if chunk == 'bad\n':
+                    raise SampleException('bad line')
+                self._read_state += len(chunk)
+                result.append((chunk, self._read_state))
+                (timestamp, chunk) = self._chunker.get_next_data()
+            return result
+
+    def parse(self, config, data):
+        states = []
+        parser = self.LineParser(config, StringIO(data),
+                                 lambda state, file_ingested: states.append((state, file_ingested)))
+        return (parser, states)
+
+    def test_every_record(self):
+        """
+        Verify every state is saved without a checkpoint configuration
+        """
+        (parser, states) = self.parse({}, 'a\n' * 5)
+        while parser.get_records(1):
+            pass
+        self.assertEqual(states, [(2, False), (4, False), (6, False), (8, False), (10, False)])
+        self.assertEqual(parser.unsaved_record_count, 0)
+
+    def test_records(self):
+        """
+        Verify the state is saved every few records and when the file is ingested
+        """
+        (parser, states) = self.parse({DataSetDriverConfigKeys.CHECKPOINT_RECORDS: 3}, 'a\n' * 7)
+        parser.get_records(1)
+        parser.get_records(1)
+        self.assertEqual(states, [])
+        self.assertEqual(parser.unsaved_record_count, 2)
+        while parser.get_records(1):
+            pass
+        # the last state is saved when no records are left
+        self.assertEqual(states, [(6, False), (12, False), (14, False)])
+        self.assertEqual(parser.unsaved_record_count, 0)
+
+        (parser, states) = self.parse({DataSetDriverConfigKeys.CHECKPOINT_RECORDS: 3}, 'a\n' * 7)
+        parser.get_records(100)
+        self.assertEqual(states, [(14, True)])
+
+    def test_bytes(self):
+        """
+        Verify the state is saved once its position has moved far enough
+        """
+        (parser, states) = self.parse({DataSetDriverConfigKeys.CHECKPOINT_BYTES: 5}, 'a\n' * 7)
+        parser.get_records(1)
+        parser.get_records(1)
+        self.assertEqual(states, [])
+        parser.get_records(1)
+        self.assertEqual(states, [(6, False)])
+        parser.get_records(2)
+        self.assertEqual(states, [(6, False)])
+        parser.get_records(1)
+        self.assertEqual(states, [(6, False), (12, False)])
+
+    def test_interval(self):
+        """
+        Verify the state is saved when the interval has passed
+        """
+        (parser, states) = self.parse({DataSetDriverConfigKeys.CHECKPOINT_INTERVAL: 60}, 'a\n' * 5)
+        parser.get_records(1)
+        self.assertEqual(states, [])
+        with patch('time.time', return_value=time.time() + 60):
+            parser.get_records(1)
+        self.assertEqual(states, [(4, False)])
+
+    def test_exception(self):
+        """
+        Verify the state of the published records is saved before an exception is raised
+        """
+        (parser, states) = self.parse({DataSetDriverConfigKeys.CHECKPOINT_RECORDS: 100}, 'a\n' * 3 + 'bad\n')
+        self.assertEqual(len(parser.get_records(2)), 2)
+        self.assertEqual(states, [])
+        self.assertRaises(SampleException, parser.get_records, 2)
+        self.assertEqual(states, [(4, False)])
@@ -5,7 +5,6 @@
 @brief BOTPT
 Release notes:
 """
-import json
 import re
 import time
 import datetime
@@ -15,7 +14,7 @@ from mi.core.driver_scheduler import DriverSchedulerConfigKey, TriggerType
 from mi.core.instrument.data_particle import DataParticleKey, DataParticleValue
 from mi.core.instrument.protocol_param_dict import ParameterDictVisibility, ParameterDictType
 from mi.core.common import BaseEnum, Units, Prefixes
-from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import StringChunker, RegexSieve
 from mi.core.instrument.instrument_fsm import ThreadSafeFSM
 from mi.core.instrument.instrument_protocol import CommandResponseInstrumentProtocol, InitializationType
 from mi.core.instrument.instrument_driver import DriverEvent
@@ -60,6 +59,15 @@ NANO_RATE_RESPONSE = '*0001TH'
 
 MAX_BUFFER_SIZE = 2 ** 16
 
+# Single pass sieve over all autosample particles, in the order _got_chunk
+# has always tried them
+SAMPLE_SIEVE = RegexSieve([(particle.regex_compiled(), particle) for particle in [
+    particles.LilySampleParticle,
+    particles.LilyLevelingParticle,
+    particles.HeatSampleParticle,
+    particles.IrisSampleParticle,
+    particles.NanoSampleParticle]])
+
 
 class ScheduledJob(BaseEnum):
     """
@@ -329,6 +337,13 @@ class Protocol(CommandResponseInstrumentProtocol):
         # create chunker
         self._chunker = StringChunker(Protocol.sieve_function)
 
+        # post-processing of samples, by particle class
+        self._sample_handlers = {
+            particles.LilySampleParticle: self._check_for_autolevel,
+            particles.LilyLevelingParticle: self._check_completed_leveling,
+            particles.NanoSampleParticle: self._check_pps_sync,
+        }
+
         self._last_data_timestamp = 0
         self.has_pps = True
 
@@ -344,20 +359,7 @@ class Protocol(CommandResponseInstrumentProtocol):
         @param raw_data: Data to be searched for samples
         @return: list of (start,end) tuples
         """
-        matchers = []
-        return_list = []
-
-        matchers.append(particles.HeatSampleParticle.regex_compiled())
-        matchers.append(particles.IrisSampleParticle.regex_compiled())
-        matchers.append(particles.NanoSampleParticle.regex_compiled())
-        matchers.append(particles.LilySampleParticle.regex_compiled())
-        matchers.append(particles.LilyLevelingParticle.regex_compiled())
-
-        for matcher in matchers:
-            for match in matcher.finditer(raw_data):
-                return_list.append((match.start(), match.end()))
-
-        return return_list
+        return SAMPLE_SIEVE(raw_data)
 
     def _got_chunk(self, chunk, ts):
         """
@@ -367,17 +369,11 @@ class Protocol(CommandResponseInstrumentProtocol):
         @return sample
         @throws InstrumentProtocolException
         """
-        possible_particles = [
-            (particles.LilySampleParticle, self._check_for_autolevel),
-            (particles.LilyLevelingParticle, self._check_completed_leveling),
-            (particles.HeatSampleParticle, None),
-            (particles.IrisSampleParticle, None),
-            (particles.NanoSampleParticle, self._check_pps_sync),
-        ]
-
-        for particle_type, func in possible_particles:
+        particle_type = SAMPLE_SIEVE.classify(chunk)
+        if particle_type is not None:
             sample = self._extract_sample(particle_type, particle_type.regex_compiled(), chunk, ts)
             if sample:
+                func = self._sample_handlers.get(particle_type)
                 if func:
                     func(sample)
                 return sample
@@ -400,12 +396,10 @@ class Protocol(CommandResponseInstrumentProtocol):
                 particle = particle_class(line, port_timestamp=timestamp, quality_flag=DataParticleValue.OUT_OF_RANGE)
             else:
                 particle = particle_class(line, port_timestamp=timestamp)
-            parsed_sample = particle.generate()
+            sample = particle.generate_dict()
 
             if publish and self._driver_event:
-                self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
-
-            sample = json.loads(parsed_sample)
+                self._driver_event(DriverAsyncEvent.SAMPLE, particle.generate())
 
         return sample
 
@@ -598,27 +592,6 @@ class Protocol(CommandResponseInstrumentProtocol):
         Overriding _wakeup; does not apply to this instrument
         """
 
-    def add_to_buffer(self, data):
-        """
-        Overriding base class to reduce logging due to NANO high data rate
-        @param data: data to be added to buffers
-        """
-        # Update the line and prompt buffers.
-        self._linebuf += data
-        self._promptbuf += data
-        self._last_data_timestamp = time.time()
-
-        # If our buffer exceeds the max allowable size then drop the leading
-        # characters on the floor.
-        max_size = self._max_buffer_size()
-        if len(self._linebuf) > max_size:
-            self._linebuf = self._linebuf[max_size * -1:]
-
-        # If our buffer exceeds the max allowable size then drop the leading
-        # characters on the floor.
-        if len(self._promptbuf) > max_size:
-            self._promptbuf = self._linebuf[max_size * -1:]
-
     def _max_buffer_size(self):
         """
         Overriding base class to increase max buffer size
@@ -19,7 +19,7 @@ from mi.core.log import get_logger, get_logging_metaclass
 log = get_logger()
 
 from mi.core.instrument.instrument_fsm import InstrumentFSM
-from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import StringChunker, RegexSieve
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey, DataParticleValue
 from mi.core.instrument.data_particle import CommonDataParticleType
 from mi.core.instrument.instrument_protocol import CommandResponseInstrumentProtocol, DEFAULT_WRITE_DELAY
@@ -849,6 +849,18 @@ class NortekEngIdDataParticle(DataParticle):
         return result
 
 
+# The particles extracted from each structure found by the common regexes.
+# An ID + battery response holds both the ID and the battery voltage.
+NORTEK_COMMON_PARTICLES = {
+    USER_CONFIG_DATA_REGEX: [(NortekUserConfigDataParticle, USER_CONFIG_DATA_REGEX)],
+    HARDWARE_CONFIG_DATA_REGEX: [(NortekHardwareConfigDataParticle, HARDWARE_CONFIG_DATA_REGEX)],
+    HEAD_CONFIG_DATA_REGEX: [(NortekHeadConfigDataParticle, HEAD_CONFIG_DATA_REGEX)],
+    ID_BATTERY_DATA_REGEX: [(NortekEngIdDataParticle, ID_DATA_REGEX),
+                            (NortekEngBatteryDataParticle, ID_BATTERY_DATA_REGEX)],
+    CLOCK_DATA_REGEX: [(NortekEngClockDataParticle, CLOCK_DATA_REGEX)],
+}
+
+
 ###############################################################################
 # Param dictionary helpers
 ###############################################################################
@@ -1088,6 +1100,10 @@ class NortekInstrumentProtocol(CommandResponseInstrumentProtocol):
     velocity_data_regex = []
     velocity_sync_bytes = ''
 
+    # the sieve built by _get_sieve and the regexes it was built from
+    _sieve = None
+    _sieve_regexes = None
+
     # user configuration order of params, this needs to match the configuration order for setting params
     order_of_user_config = [
         Parameter.TRANSMIT_PULSE_LENGTH,
@@ -1219,31 +1235,31 @@ class NortekInstrumentProtocol(CommandResponseInstrumentProtocol):
         @param add_structs Additional structures to include in the structure search.
         Should be in the format [[structure_sync_bytes, structure_len]*]
         """
-        return_list = []
-        sieve_matchers = NORTEK_COMMON_REGEXES + cls.velocity_data_regex
+        return cls._get_sieve()(raw_data)
 
-        for matcher in sieve_matchers:
-            for match in matcher.finditer(raw_data):
-                return_list.append((match.start(), match.end()))
-                log.debug("sieve_function: regex found %r", raw_data[match.start():match.end()])
-
-        return return_list
+    @classmethod
+    def _get_sieve(cls):
+        """
+        The single pass sieve for the common and velocity structures.  The
+        velocity regexes are added by the instrument modules when they are
+        imported, so the sieve is built again when the regexes change.
+        @retval A RegexSieve reporting the list of (particle class, regex)
+        to extract for each common structure and [] for velocity structures
+        """
+        regex_list = NORTEK_COMMON_REGEXES + cls.velocity_data_regex
+        if regex_list != NortekInstrumentProtocol._sieve_regexes:
+            NortekInstrumentProtocol._sieve = RegexSieve([(regex, NORTEK_COMMON_PARTICLES.get(regex, []))
+                                                          for regex in regex_list])
+            NortekInstrumentProtocol._sieve_regexes = regex_list
+        return NortekInstrumentProtocol._sieve
 
     def _got_chunk_base(self, structure, timestamp):
         """
         The base class got_data has gotten a structure from the chunker.  Pass it to extract_sample
         with the appropriate particle objects and REGEXes.
         """
-        self._extract_sample(NortekUserConfigDataParticle, USER_CONFIG_DATA_REGEX, structure, timestamp)
-        self._extract_sample(NortekHardwareConfigDataParticle, HARDWARE_CONFIG_DATA_REGEX, structure, timestamp)
-        self._extract_sample(NortekHeadConfigDataParticle, HEAD_CONFIG_DATA_REGEX, structure, timestamp)
-
-        self._extract_sample(NortekEngClockDataParticle, CLOCK_DATA_REGEX, structure, timestamp)
-        self._extract_sample(NortekEngIdDataParticle, ID_DATA_REGEX, structure, timestamp)
-
-        # Note: This appears to be the same size and data structure as average interval & measurement interval
-        # need to copy over the exact value to match
-        self._extract_sample(NortekEngBatteryDataParticle, ID_BATTERY_DATA_REGEX, structure, timestamp)
+        for (particle_class, regex) in self._get_sieve().classify(structure) or []:
+            self._extract_sample(particle_class, regex, structure, timestamp)
 
     ########################################################################
     # overridden superclass methods
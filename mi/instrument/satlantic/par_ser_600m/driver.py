@@ -36,7 +36,7 @@ from mi.core.exceptions import InstrumentDataException
 from mi.core.exceptions import InstrumentParameterException
 from mi.core.exceptions import SampleException
 from mi.core.instrument.protocol_param_dict import ParameterDictVisibility
-from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import StringChunker, RegexSieve
 
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey, DataParticleValue
 
@@ -217,7 +217,12 @@ class SatlanticPARDataParticle(DataParticle):
                     DataParticleKey.VALUE: checksum}]
         
         return result
-        
+
+# Samples and the header streamed on reset, in a single pass.  Header chunks
+# are classified as None.
+SIEVE = RegexSieve([(SAMPLE_REGEX, SatlanticPARDataParticle),
+                    (HEADER_REGEX, None)])
+
 ####################################################################
 # Satlantic PAR Sensor Protocol
 ####################################################################
@@ -312,21 +317,7 @@ class SatlanticPARInstrumentProtocol(CommandResponseInstrumentProtocol):
     def sieve_function(raw_data):
         """ The method that splits samples
         """
-        patterns = []
-        matchers = []
-        return_list = []
-
-        patterns.append(SAMPLE_PATTERN)
-        patterns.append(HEADER_PATTERN)
-
-        for pattern in patterns:
-            matchers.append(re.compile(pattern))
-
-        for matcher in matchers:
-            for match in matcher.finditer(raw_data):
-                return_list.append((match.start(), match.end()))
-
-        return return_list
+        return SIEVE(raw_data)
 
 
     def _filter_capabilities(self, events):
@@ -1131,8 +1122,10 @@ class SatlanticPARInstrumentProtocol(CommandResponseInstrumentProtocol):
         extract samples from a chunk of data
         @param chunk: bytes to parse into a sample.
         '''
-        self._extract_sample(SatlanticPARDataParticle, SAMPLE_REGEX, chunk, timestamp)
-        self._extract_header(chunk)
+        if SIEVE.classify(chunk) is SatlanticPARDataParticle:
+            self._extract_sample(SatlanticPARDataParticle, SAMPLE_REGEX, chunk, timestamp)
+        else:
+            self._extract_header(chunk)
 
 
     def _extract_header(self, chunk):
@@ -15,7 +15,6 @@ from mi.core.log import get_logger
 log = get_logger()
 
 import re
-import json
 import time
 import pprint
 
@@ -770,11 +769,11 @@ class Protocol(CommandResponseInstrumentProtocol):
         sample = None
         if regex.match(line):
             particle = particle_class(line, port_timestamp=timestamp)
-            parsed_sample = particle.generate()
+            sample = particle.generate_dict()
             if publish and self._driver_event:
+                parsed_sample = particle.generate()
                 self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
                 log.info("Parsed sample %r", pprint.pformat(parsed_sample))
-            sample = json.loads(parsed_sample)
         return sample
 
     def _build_param_dict(self):
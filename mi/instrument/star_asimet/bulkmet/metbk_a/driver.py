@@ -14,7 +14,6 @@ __license__ = 'Apache 2.0'
 import re
 import time
 import string
-import json
 import time
 
 from mi.core.log import get_logger ; log = get_logger()
@@ -518,12 +517,11 @@ class Protocol(CommandResponseInstrumentProtocol):
                 self.last_sample = match.group(0)
             
             particle = particle_class(line, port_timestamp=timestamp)
-            parsed_sample = particle.generate()
+            sample = particle.generate_dict()
 
             if publish and self._driver_event:
-                self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
-    
-            sample = json.loads(parsed_sample)
+                self._driver_event(DriverAsyncEvent.SAMPLE, particle.generate())
+
             return sample
         return sample
 
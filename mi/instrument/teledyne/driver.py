@@ -474,7 +474,7 @@ class TeledyneProtocol(CommandResponseInstrumentProtocol):
         self._set_params(config, True)
 
     def _get_params(self):
-        return dir(TeledyneParameter)
+        return TeledyneParameter.dict().keys()
 
     def _getattr_key(self, attr):
         return getattr(TeledyneParameter, attr)
@@ -85,7 +85,7 @@ class Protocol(WorkhorseProtocol):
         WorkhorseProtocol.__init__(self, prompts, newline, driver_event)
 
     def _get_params(self):
-        return dir(Parameter)
+        return Parameter.dict().keys()
 
     def _getattr_key(self, attr):
         return getattr(Parameter, attr)
@@ -27,7 +27,13 @@ from mi.core.instrument.instrument_driver import DriverAsyncEvent
 
 from mi.instrument.teledyne.workhorse_monitor_300_khz.particles import *
 
-from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import Chunker, StringChunker
+from mi.core.instrument.pd0_framing import PD0_HEADER, MAX_ENSEMBLE_LENGTH, ensemble_length, find_ensembles
+
+# Every block the sieve finds starts with one of these
+SIEVE_START_MARKERS = ['Instrument S/N',
+                       'ACTIVE FLUXGATE CALIBRATION MATRICES in NVRAM',
+                       PD0_HEADER]
 
 from mi.core.instrument.protocol_param_dict import ParameterDictVisibility
 from mi.core.instrument.protocol_param_dict import ParameterDictType
@@ -123,7 +129,9 @@ class WorkhorseProtocol(TeledyneProtocol):
     def sieve_function(raw_data):
         """
         Chunker sieve method to help the chunker identify chunks.
-        @returns a list of chunks identified, if any.
+        @returns a SieveResult of the chunks identified, if any, that
+        also tells the chunker where the next block starts and how long a
+        partial ensemble is going to be.
         The chunks are all the same type.
         """
 
@@ -137,24 +145,37 @@ class WorkhorseProtocol(TeledyneProtocol):
             if matcher == ADCP_PD0_PARSED_REGEX_MATCHER:
                 #
                 # Have to cope with variable length binary records...
-                # lets grab the length, then write a proper query to
-                # snag it.
+                # frame them by the length in the header and keep the
+                # ones with a good checksum, so a corrupt header can't
+                # claim the ensembles behind it.
                 #
-                matcher2 = re.compile(r'\x7f\x7f(..)', re.DOTALL)
-                for match in matcher2.finditer(raw_data):
-                    l = unpack("H", match.group(1))
-                    outer_pos = match.start()
-                    ADCP_PD0_PARSED_TRUE_MATCHER = re.compile(r'\x7f\x7f(.{' + str(l[0]) + '})', re.DOTALL)
-                    for match in ADCP_PD0_PARSED_TRUE_MATCHER.finditer(raw_data, outer_pos):
-                        inner_pos = match.start()
-
-                        if (outer_pos == inner_pos):
-                            return_list.append((match.start(), match.end()))
+                return_list.extend(find_ensembles(raw_data))
             else:
                 for match in matcher.finditer(raw_data):
                     return_list.append((match.start(), match.end()))
-                    
-        return return_list
+
+        last_end = 0
+        for (start, end) in return_list:
+            last_end = max(last_end, end)
+
+        return Chunker.resume_at_marker(return_list, raw_data, last_end,
+                                        SIEVE_START_MARKERS,
+                                        WorkhorseProtocol.block_length)
+
+    @staticmethod
+    def block_length(raw_data, index):
+        """
+        Length of the block starting at index, for the resumable sieve.
+        Ensembles give their length in the header, the text responses
+        run up to the next prompt.  A header claiming more than any
+        ensemble can hold is stray or corrupt, and not waited for.
+        @retval The block length, None if not known
+        """
+        if raw_data.startswith(PD0_HEADER, index):
+            length = ensemble_length(raw_data, index)
+            if length is not None and length <= MAX_ENSEMBLE_LENGTH:
+                return length
+        return None
 
     def __init__(self, prompts, newline, driver_event):
         """
@@ -179,7 +200,7 @@ class WorkhorseProtocol(TeledyneProtocol):
     ########################################################################
 
     def _get_params(self):
-        return dir(WorkhorseParameter)
+        return WorkhorseParameter.dict().keys()
 
     def _getattr_key(self, attr):
         return getattr(WorkhorseParameter, attr)
@@ -429,7 +429,7 @@ class Protocol(WorkhorseProtocol):
         sock.close()
 
     def _get_params(self):
-        return dir(Parameter)
+        return Parameter.dict().keys()
 
     def _getattr_key(self, attr):
         return getattr(Parameter, attr)
@@ -7,6 +7,7 @@ __author__ = 'Roger Unwin'
 __license__ = 'Apache 2.0'
 
 import socket
+import struct
 
 import unittest
 import time as time
@@ -34,6 +35,7 @@ from mi.instrument.teledyne.test.test_driver import TeledyneQualificationTest
 from mi.instrument.teledyne.test.test_driver import TeledynePublicationTest
 
 from mi.instrument.teledyne.workhorse_monitor_75_khz.driver import WorkhorseInstrumentDriver
+from mi.instrument.teledyne.workhorse_monitor_75_khz.driver import WorkhorseProtocol
 
 from mi.instrument.teledyne.workhorse_monitor_75_khz.driver import DataParticleType
 from mi.instrument.teledyne.workhorse_monitor_75_khz.driver import TeledyneProtocolState
@@ -108,6 +110,25 @@ class WorkhorseDriverUnitTest(TeledyneUnitTest):
     def setUp(self):
         TeledyneUnitTest.setUp(self)
 
+    def test_sieve_stray_header(self):
+        """
+        Verify a stray ensemble header claiming more bytes than any ensemble
+        holds does not hold back the data behind it.
+        """
+        body = 'x' * 100
+        ensemble = '\x7f\x7f' + struct.pack('<H', len(body) + 4) + body
+        ensemble += struct.pack('<H', sum(bytearray(ensemble)) & 0xffff)
+        stray = '\x7f\x7f\xff\xff'
+        self.assertEqual(WorkhorseProtocol.block_length(ensemble, 0), len(ensemble))
+        self.assertIsNone(WorkhorseProtocol.block_length(stray, 0))
+
+        chunker = StringChunker(WorkhorseProtocol.sieve_function)
+        chunker.add_chunk(stray, 1.0)
+        for i in range(0, len(ensemble), 10):
+            chunker.add_chunk(ensemble[i:i + 10], 1.0)
+        (timestamp, data) = chunker.get_next_data()
+        self.assertEqual(data, ensemble)
+
 
 ###############################################################################
 #                            INTEGRATION TESTS                                #